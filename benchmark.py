@@ -0,0 +1,50 @@
+import argparse
+from src.simulation.config import SimulationConfig
+from src.simulation.simulation_data import SimulationData
+from src.benchmarks import micro_benchmarks, matching_benchmarks, lifecycle_benchmarks, end_to_end_benchmarks, \
+                           save_results, load_results, compare_results
+
+BENCHMARK_SUITES = ['micro', 'mid', 'e2e']
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Runs the benchmark suite and writes the results as JSON.')
+    parser.add_argument('--suites', nargs='+', choices=BENCHMARK_SUITES, default=BENCHMARK_SUITES,
+                        help='benchmark suites to run')
+    parser.add_argument('--output', default='benchmark.json', help='JSON file of the results')
+    parser.add_argument('--repeat', type=int, default=5, help='measured repetitions of micro and mid benchmarks')
+    parser.add_argument('--hours', type=float, nargs='+', default=[1, 24], help='simulated hours of end-to-end runs')
+    parser.add_argument('--compare', default=None, metavar='BASELINE', help='JSON file of results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative slowdown reported as a regression')
+    args = parser.parse_args()
+
+    # Parameters are read from params.py
+    config = SimulationConfig()
+
+    # Relevant data, loaded once on first access
+    data = SimulationData()
+
+    records = []
+    if 'micro' in args.suites:
+        print('Running micro benchmarks ...')
+        records += micro_benchmarks(data, args.repeat)
+    if 'mid' in args.suites:
+        print('Running matching benchmarks ...')
+        records += matching_benchmarks(config, data, args.repeat)
+        print('Running lifecycle benchmarks ...')
+        records += lifecycle_benchmarks(config, data, args.repeat)
+    if 'e2e' in args.suites:
+        print('Running end-to-end benchmarks ...')
+        records += end_to_end_benchmarks(config, data, args.hours)
+
+    for record in records:
+        params = ', '.join(f'{key}={value}' for key, value in record['params'].items())
+        print(f'{record["suite"]:>5} {record["name"]:<28} {params:<52} {record["seconds"]["median"]:>10.4f}s')
+
+    save_results(records, args.output)
+    print(f'Saved results to {args.output}')
+
+    if args.compare is not None:
+        comparison = compare_results(records, load_results(args.compare), args.threshold)
+        print(comparison.to_string(index=False))
+        if comparison['regression'].any():
+            print(f'{comparison["regression"].sum()} benchmarks are more than {100 * args.threshold:.0f}% slower.')
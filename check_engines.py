@@ -0,0 +1,32 @@
+import sys
+import json
+import argparse
+from src.simulation.config import SimulationConfig
+from src.simulation.simulation_data import SimulationData
+from src.simulation.engine_parity import compare_engines
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Checks that the fast engine reproduces the results of SimPy processes.')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the compared runs')
+    parser.add_argument('--set', action='append', default=[], metavar='PARAM=VALUE',
+                        help='overridden parameter and JSON value, e.g. RUN_DELTA=60')
+    parser.add_argument('--output', default=None, help='directory of the runs')
+    args = parser.parse_args()
+
+    # Parameters are read from params.py
+    overrides = {}
+    for item in args.set:
+        name, value = item.split('=', 1)
+        overrides[name] = json.loads(value)
+    config = SimulationConfig.from_overrides(dict(overrides, SEED=args.seed))
+
+    # Relevant data, loaded once on first access
+    data = SimulationData()
+
+    comparison = compare_engines(config, data, args.output)
+    print(comparison.to_string(index=False))
+    if not comparison['identical'].all():
+        print('The engines differ, the fast engine must not be used for this scenario.')
+        sys.exit(1)
+
+    print('The engines produce identical results.')
@@ -0,0 +1,22 @@
+import argparse
+from time import time
+from src.simulation.simulation_data import SimulationData
+from src.simulation.data_bundle import DataBundle, compile_bundle
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compiles the data files named in params.py into a memory-mapped bundle.')
+    parser.add_argument('output', help='directory of the bundle, set DATA_BUNDLE_PATH to it to use it')
+    args = parser.parse_args()
+
+    # Parse the source files
+    ts = time()
+    data = SimulationData(bundle_path=None)
+    manifest = compile_bundle(data, args.output)
+    print(f'Compiled {len(manifest["files"])} files into {args.output} in {time() - ts:.2f}s')
+
+    # Load the bundle
+    ts = time()
+    bundle = DataBundle(args.output, verify=True)
+    for dataset in ['arrival_df', 'num_driver_df', 'travel_times', 'endpoint_sampler', 'geo_df']:
+        getattr(bundle, dataset)
+    print(f'Verified and loaded the bundle in {time() - ts:.2f}s')
@@ -0,0 +1,28 @@
+import argparse
+from time import time
+from src.simulation.simulation_data import SimulationData
+from src.simulation.data_bundle import compile_bundle
+from src.simulation.synthetic_data import LAYOUTS, generate_synthetic_data
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generates the input datasets of a synthetic city.')
+    parser.add_argument('output', help='directory of the generated files')
+    parser.add_argument('--tazs', type=int, default=100, help='number of TAZs')
+    parser.add_argument('--layout', choices=LAYOUTS, default='grid', help='shape of the TAZs')
+    parser.add_argument('--demand', type=float, default=20.0, help='peak hourly requests per TAZ')
+    parser.add_argument('--supply', type=float, default=1.2, help='drivers per driver needed to serve the demand')
+    parser.add_argument('--taz-size', type=float, default=1.0, help='side length of an average TAZ in kilometres')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random layout and distributions')
+    parser.add_argument('--bundle', default=None, help='also compile the files into a bundle in this directory')
+    args = parser.parse_args()
+
+    ts = time()
+    paths = generate_synthetic_data(args.output, num_tazs=args.tazs, layout=args.layout, demand_per_taz=args.demand,
+                                    supply_ratio=args.supply, taz_size=args.taz_size, seed=args.seed)
+    print(f'Generated a city of {args.tazs} TAZs in {time() - ts:.2f}s, set the paths in params.py to:')
+    for name, path in paths.items():
+        print(f'  {name}: {path}')
+
+    if args.bundle is not None:
+        manifest = compile_bundle(SimulationData(**paths, bundle_path=None), args.bundle)
+        print(f'Compiled {len(manifest["files"])} files into {args.bundle}, set DATA_BUNDLE_PATH to it to use it')
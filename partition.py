@@ -0,0 +1,38 @@
+import os
+import argparse
+from time import time
+from src.simulation.config import SimulationConfig
+from src.simulation.simulation_data import SimulationData
+from src.simulation.runner import run_simulation
+from src.simulation.partitioning import run_partitioned, compare_runs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Runs one simulation split into regions simulated in parallel.')
+    parser.add_argument('--regions', type=int, required=True, help='number of regions (worker processes)')
+    parser.add_argument('--sync-interval', type=float, default=None,
+                        help='minutes between driver handoffs (default: BATCH_FREQUENCY)')
+    parser.add_argument('--compare', action='store_true',
+                        help='also run the same seed in a single process and compare the results')
+    parser.add_argument('--output', default=None, help='directory of the run')
+    args = parser.parse_args()
+
+    # Parameters are read from params.py
+    config = SimulationConfig().replace(partitions=args.regions, partition_sync_interval=args.sync_interval)
+    data = SimulationData()
+    if config.max_driver_job_queue > 1 and not args.compare:
+        print('Warning: partitioned runs with job queues are biased towards short driver waits, check them with --compare.')
+
+    start = time()
+    run_dir = run_partitioned(config, data, args.output)
+    partitioned_time = time() - start
+
+    if args.compare:
+        start = time()
+        reference_dir = run_simulation(config.replace(partitions=None), data, os.path.join(run_dir, 'reference'))
+        reference_time = time() - start
+
+        comparison = compare_runs(run_dir, reference_dir)
+        comparison.to_csv(os.path.join(run_dir, 'comparison.csv'), index=False)
+        print(comparison.to_string(index=False))
+        print(f'Wall time: {partitioned_time:.1f}s partitioned, {reference_time:.1f}s single process '
+              f'({reference_time / partitioned_time:.2f}x speedup)')
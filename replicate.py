@@ -0,0 +1,24 @@
+import json
+import argparse
+from src.simulation.params import DATA_BUNDLE_PATH
+from src.simulation.replications import run_replications
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Runs seeded replications of a scenario in parallel.')
+    parser.add_argument('-n', '--replications', type=int, default=10, help='number of replications')
+    parser.add_argument('--seed', type=int, default=0, help='root seed of all replications')
+    parser.add_argument('--set', action='append', default=[], metavar='PARAM=VALUE',
+                        help='overridden parameter and JSON value, e.g. BATCH_FREQUENCY=1')
+    parser.add_argument('--confidence', type=float, default=0.95, help='confidence level of the intervals')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--output', default=None, help='directory of the replications')
+    args = parser.parse_args()
+
+    overrides = {}
+    for item in args.set:
+        name, value = item.split('=', 1)
+        overrides[name] = json.loads(value)
+
+    replications, summary = run_replications(overrides, args.replications, args.seed, args.workers,
+                                             DATA_BUNDLE_PATH, args.output, args.confidence)
+    print(summary.to_string(index=False))
@@ -0,0 +1,5 @@
+from .harness import measure, save_results, load_results, compare_results
+from .micro import micro_benchmarks
+from .matching import matching_benchmarks, build_market
+from .lifecycles import lifecycle_benchmarks
+from .end_to_end import end_to_end_benchmarks
@@ -0,0 +1,57 @@
+import shutil
+import tempfile
+from time import perf_counter
+from contextlib import redirect_stdout
+from io import StringIO
+from typing import Dict, List
+from src.simulation.config import SimulationConfig
+from src.simulation.simulation_data import SimulationData
+from src.simulation.runner import Simulation
+from .harness import result
+
+END_TO_END_HOURS = [1, 24]
+
+def end_to_end_benchmarks(config: SimulationConfig, data: SimulationData, hours: List[float]=END_TO_END_HOURS,
+                          seed: int=0) -> List[Dict]:
+    """Benchmarks complete simulation runs.
+
+    Note:
+    Every run is measured once, from spawning the initial riders and drivers until the end of
+    the run, with output suppressed and results written to a temporary directory. The number
+    of events is the number of SimPy events and state machine records processed by the run.
+
+    Args:
+        config (SimulationConfig): parameters of the runs, RUN_DELTA and SEED are overridden.
+        data (SimulationData): input data.
+        hours (List[float], optional): simulated hours of the runs. Defaults to END_TO_END_HOURS.
+        seed (int, optional): root seed of the runs. Defaults to 0.
+
+    Returns:
+        List[Dict]: one record per run.
+    """
+    records = []
+    for duration in hours:
+        run_dir = tempfile.mkdtemp(prefix='benchmark_')
+        run_config = config.replace(run_delta=60 * duration, seed=seed, checkpoint_interval=None, warmup_dir=None,
+                                    partitions=None, verbose=False)
+        try:
+            with redirect_stdout(StringIO()):
+                ts = perf_counter()
+                simulation = Simulation(run_config, data, run_dir)
+                simulation.run()
+                elapsed = perf_counter() - ts
+                simulation.close(aggregate=False)
+        finally:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+        env = simulation.env
+        events = env.num_processed_events
+        seconds = {'min': elapsed, 'median': elapsed, 'mean': elapsed, 'max': elapsed, 'repeat': 1}
+        records.append(result('e2e', 'simulation', {'hours': duration, 'backend': run_config.solver_backend,
+                                                    'batch_frequency': run_config.batch_frequency,
+                                                    'engine': run_config.engine},
+                              seconds, events=events, events_per_sec=events / elapsed,
+                              sim_minutes_per_sec=run_config.run_delta / elapsed,
+                              riders=len(simulation.rider_store), drivers=len(simulation.driver_store)))
+
+    return records
@@ -0,0 +1,128 @@
+import os
+import sys
+import json
+import platform
+import subprocess
+import numpy as np
+import pandas as pd
+from time import perf_counter
+from datetime import datetime
+from typing import Callable, Dict, List
+
+def measure(function: Callable, setup: Callable=None, repeat: int=5, warmup: int=1) -> Dict[str, float]:
+    """Measures the wall time of a function.
+
+    Note:
+    Every repetition calls "setup" first, untimed, and passes its result to "function", so
+    functions which modify their input can be measured on fresh input every time. The first
+    "warmup" repetitions are discarded to exclude caches and lazy compilation.
+
+    Args:
+        function (Callable): function to measure.
+        setup (Callable, optional): function creating the arguments of "function". Defaults to None (no arguments).
+        repeat (int, optional): number of measured repetitions. Defaults to 5.
+        warmup (int, optional): number of discarded repetitions. Defaults to 1.
+
+    Returns:
+        Dict[str, float]: minimum, median, mean and maximum seconds per call.
+    """
+    times = []
+    for i in range(warmup + repeat):
+        args = () if setup is None else setup()
+        ts = perf_counter()
+        function(*args)
+        if i >= warmup:
+            times.append(perf_counter() - ts)
+
+    times = np.array(times)
+    return {'min': times.min(), 'median': np.median(times), 'mean': times.mean(), 'max': times.max(),
+            'repeat': repeat}
+
+
+def result(suite: str, name: str, params: Dict, seconds: Dict[str, float], **metrics) -> Dict:
+    """Creates the record of one benchmark.
+
+    Args:
+        suite (str): 'micro', 'mid' or 'e2e'.
+        name (str): benchmark name.
+        params (Dict): parameters of the benchmark, e.g. the matrix size.
+        seconds (Dict[str, float]): timing statistics from "measure".
+        **metrics: further metrics, e.g. throughputs.
+
+    Returns:
+        Dict: JSON-serializable record.
+    """
+    return {'suite': suite, 'name': name, 'params': params, 'seconds': seconds, 'metrics': metrics}
+
+
+def result_key(record: Dict) -> str:
+    """Identifies a benchmark across result files.
+    """
+    return f'{record["suite"]}/{record["name"]}' + ''.join(f'/{key}={value}' for key, value in
+                                                           sorted(record['params'].items()))
+
+
+def environment_info() -> Dict:
+    """Describes the machine, library versions and commit the benchmarks ran on.
+    """
+    import scipy
+    import simpy
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'scipy': scipy.__version__,
+        'simpy': simpy.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def save_results(records: List[Dict], file: str) -> Dict:
+    """Writes benchmark records with the environment to a JSON file.
+
+    Returns:
+        Dict: the written document.
+    """
+    document = {'created': datetime.now().isoformat(), 'environment': environment_info(), 'results': records}
+    with open(file, 'w') as f:
+        json.dump(document, f, indent=4, default=float)
+
+    return document
+
+
+def load_results(file: str) -> List[Dict]:
+    with open(file) as f:
+        return json.load(f)['results']
+
+
+def compare_results(records: List[Dict], baseline: List[Dict], threshold: float=0.1) -> pd.DataFrame:
+    """Compares the median times of benchmarks present in both result sets.
+
+    Args:
+        records (List[Dict]): current results.
+        baseline (List[Dict]): results to compare against, e.g. of the previous commit.
+        threshold (float, optional): relative slowdown reported as a regression. Defaults to 0.1.
+
+    Returns:
+        pd.DataFrame: baseline and current median seconds, their ratio and whether it is a regression.
+    """
+    baseline = {result_key(record): record['seconds']['median'] for record in baseline}
+    rows = []
+    for record in records:
+        key = result_key(record)
+        if key in baseline:
+            current = record['seconds']['median']
+            rows.append({'benchmark': key, 'baseline': baseline[key], 'current': current,
+                         'ratio': current / baseline[key], 'regression': current > (1 + threshold) * baseline[key]})
+
+    return pd.DataFrame(rows, columns=['benchmark', 'baseline', 'current', 'ratio', 'regression'])
@@ -0,0 +1,50 @@
+from typing import Dict, List
+from src.simulation.config import SimulationConfig
+from src.simulation.simulation_data import SimulationData
+from src.simulation.event_kernel import CountingEnvironment, ENGINES
+from .matching import build_market
+from .harness import measure, result
+
+LIFECYCLE_SIZES = [1_000, 5_000]
+LIFECYCLE_MINUTES = 60
+
+def lifecycle_benchmarks(config: SimulationConfig, data: SimulationData, repeat: int=5,
+                         sizes: List[int]=LIFECYCLE_SIZES, minutes: float=LIFECYCLE_MINUTES) -> List[Dict]:
+    """Benchmarks the events of riders and drivers following one batch matching round, by engine.
+
+    Note:
+    A market of "size" entities is built as for "matching_benchmarks" and matched once, both
+    untimed. The measured run processes the pickups, trips and cancellations which follow
+    within "minutes" without any further matching, so it measures the event engine and the
+    state updates of riders and drivers only.
+
+    Args:
+        config (SimulationConfig): parameters of the market, the engine is overridden.
+        data (SimulationData): input data.
+        repeat (int, optional): number of measured repetitions. Defaults to 5.
+        sizes (List[int], optional): numbers of entities. Defaults to LIFECYCLE_SIZES.
+        minutes (float, optional): simulated minutes of every run. Defaults to LIFECYCLE_MINUTES.
+
+    Returns:
+        List[Dict]: one record per size and engine.
+    """
+    records = []
+    for size in sizes:
+        for engine in ENGINES:
+            engine_config = config.replace(engine=engine)
+            def setup():
+                matcher = build_market(engine_config, data, size // 2, size - size // 2)
+                matcher.match()
+                return (matcher.env,)
+
+            events = []
+            def run(env: CountingEnvironment):
+                start = env.num_processed_events
+                env.run(until=env.now + minutes)
+                events.append(env.num_processed_events - start)
+
+            seconds = measure(run, setup=setup, repeat=repeat)
+            records.append(result('mid', 'entity_lifecycles', {'entities': size, 'engine': engine}, seconds,
+                                  events=events[-1], events_per_sec=events[-1] / seconds['median']))
+
+    return records
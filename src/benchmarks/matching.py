@@ -0,0 +1,70 @@
+from typing import Dict, List
+from src.simulation.config import SimulationConfig
+from src.simulation.simulation_data import SimulationData
+from src.simulation.event_kernel import CountingEnvironment, EventKernel
+from src.simulation.runner import create_algorithm
+from src.simulation.matcher import BatchMatcher
+from src.simulation.arrivals import RiderProcess, DriverProcess
+from src.simulation.elements import AvailabilityRegistry, DriverStore, RiderStore
+from src.utils import RandomStreams
+from .harness import measure, result
+
+MATCHING_SIZES = [100, 1_000, 5_000]
+
+def build_market(config: SimulationConfig, data: SimulationData, num_drivers: int, num_riders: int,
+                 seed: int=0) -> BatchMatcher:
+    """Creates a batch matcher with idle drivers and waiting riders at the start of a run.
+
+    Args:
+        config (SimulationConfig): parameters of the run.
+        data (SimulationData): input data.
+        num_drivers (int): number of available drivers.
+        num_riders (int): number of waiting riders.
+        seed (int, optional): root seed of the market. Defaults to 0.
+
+    Returns:
+        BatchMatcher: matcher of the market.
+    """
+    environment = EventKernel if config.engine == 'fast' else CountingEnvironment
+    env = environment(initial_time=config.initial_time)
+    streams = RandomStreams(seed)
+    registry = AvailabilityRegistry(env)
+    num_active_requests, num_active_drivers = [0], [0]
+    riders = RiderProcess(env, registry, None, RiderStore(), data, config, streams, num_active_requests, False)
+    drivers = DriverProcess(env, registry, None, DriverStore(), 0, num_active_drivers, num_active_requests, data,
+                            config, streams, False)
+    drivers.dispatch_drivers(num_drivers)
+    riders.spawn_riders(num_riders)
+
+    # Let all drivers and riders register
+    env.run(until=env.now + 1e-6)
+    return BatchMatcher(env, create_algorithm(config, data), config.batch_frequency, registry, None, False)
+
+
+def matching_benchmarks(config: SimulationConfig, data: SimulationData, repeat: int=5,
+                        sizes: List[int]=MATCHING_SIZES) -> List[Dict]:
+    """Benchmarks one batch matching round including the trips it creates.
+
+    Note:
+    A market of "size" entities has size / 2 idle drivers and size / 2 waiting riders, all
+    created fresh and untimed before every repetition.
+
+    Args:
+        config (SimulationConfig): parameters of the matcher, e.g. the solver backend.
+        data (SimulationData): input data.
+        repeat (int, optional): number of measured repetitions. Defaults to 5.
+        sizes (List[int], optional): numbers of entities. Defaults to MATCHING_SIZES.
+
+    Returns:
+        List[Dict]: one record per size.
+    """
+    records = []
+    for size in sizes:
+        seconds = measure(lambda matcher: matcher.match(),
+                          setup=lambda: (build_market(config, data, size // 2, size - size // 2),), repeat=repeat)
+        records.append(result('mid', 'batch_matching_round',
+                              {'entities': size, 'backend': config.solver_backend,
+                               'algorithm': 'PrioritizeWaitTimes' if config.prioritize_wait_times else 'ShortestDistance'},
+                              seconds, entities_per_sec=size / seconds['median']))
+
+    return records
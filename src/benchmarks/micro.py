@@ -0,0 +1,70 @@
+import numpy as np
+from typing import Dict, List
+from src.simulation.simulation_data import SimulationData
+from src.simulation.algorithms import LinearSolver
+from src.utils import sample_random_trip_time, sample_point_in_geometry
+from .harness import measure, result
+
+SOLVER_SIZES = [(10, 10), (100, 120), (500, 600), (1000, 1200)]
+MICRO_BACKENDS = ['hungarian', 'jv', 'auction']
+COST_MATRIX_SIZES = [100, 1000, 2000]
+
+def micro_benchmarks(data: SimulationData, repeat: int=5, seed: int=0) -> List[Dict]:
+    """Benchmarks the functions called most often per simulated event.
+
+    Note:
+    Trip times and points are drawn for random TAZs of the data, so the numbers reflect the
+    lookups in the real tables. Solver and cost-matrix sizes are numbers of drivers x requests.
+
+    Args:
+        data (SimulationData): input data.
+        repeat (int, optional): number of measured repetitions. Defaults to 5.
+        seed (int, optional): seed of the random inputs. Defaults to 0.
+
+    Returns:
+        List[Dict]: one record per benchmark.
+    """
+    rng = np.random.default_rng(seed)
+    taz_ids = data.geo_df.index.values
+    records = []
+
+    # Trip times of random TAZ pairs
+    n = 10_000
+    origins, destinations = rng.choice(taz_ids, n), rng.choice(taz_ids, n)
+    def sample_trip_times():
+        for origin, destination in zip(origins, destinations):
+            sample_random_trip_time(data.travel_times, 8, origin, destination, is_trip=True, get_expected=True, rng=rng)
+    seconds = measure(sample_trip_times, repeat=repeat)
+    records.append(result('micro', 'sample_random_trip_time', {'calls': n}, seconds,
+                          calls_per_sec=n / seconds['median']))
+
+    # Rejection sampling of points within TAZs
+    n = 1_000
+    geometries = data.geo_df['geometry'].loc[rng.choice(taz_ids, n)].values
+    def sample_points():
+        for geometry in geometries:
+            sample_point_in_geometry(geometry, 1)
+    seconds = measure(sample_points, repeat=repeat)
+    records.append(result('micro', 'sample_point_in_geometry', {'calls': n}, seconds,
+                          calls_per_sec=n / seconds['median']))
+
+    # Dense assignment problems
+    for shape in SOLVER_SIZES:
+        matrix = rng.random(shape) * 30
+        for backend in MICRO_BACKENDS:
+            solver = LinearSolver(backend=backend)
+            seconds = measure(lambda: solver.solve_matching(matrix), repeat=repeat)
+            records.append(result('micro', 'solve_matching', {'backend': backend, 'shape': list(shape)}, seconds))
+
+    # Cost matrix of a matching round as built by create_matches
+    for size in COST_MATRIX_SIZES:
+        driver_pos, request_pos = rng.choice(taz_ids, size), rng.choice(taz_ids, size)
+        exp_times = rng.random((size, 1)) * 10
+        def build_cost_matrix():
+            travel_times = data.travel_times.cost_matrix(8, driver_pos, request_pos) / 60
+            travel_times += exp_times
+        seconds = measure(build_cost_matrix, repeat=repeat)
+        records.append(result('micro', 'create_matches_cost_matrix', {'shape': [size, size]}, seconds,
+                              entries_per_sec=size * size / seconds['median']))
+
+    return records
@@ -1,3 +1,5 @@
 from .rideshare_algorithm import RideShareMatchingAlgorithm
 from .shortest_distance import ShortestDistance
-from .prioritize_wait_times import PrioritizeWaitTimes
\ No newline at end of file
+from .prioritize_wait_times import PrioritizeWaitTimes
+from .candidate_graph import CandidateGenerator, CandidateGraph
+from .linear_solver import LinearSolver
\ No newline at end of file
@@ -0,0 +1,113 @@
+import numpy as np
+from typing import Tuple
+
+def auction_assignment(benefit: np.ndarray, eps_final: float, scaling: float=5.) -> Tuple[np.ndarray, np.ndarray]:
+    """Solves an assignment problem (maximization) with the epsilon-scaling auction algorithm.
+
+    Note:
+    Every person (row) is assigned to one object (column), so there must be at least as many
+    objects as persons. All unassigned persons bid simultaneously (Jacobi auction). For
+    asymmetric problems, a final reverse auction lowers the prices of unassigned objects.
+    The assignment is within n * eps_final of the optimum.
+
+    Args:
+        benefit (np.ndarray): matrix of shape (persons, objects).
+        eps_final (float): epsilon of the last auction phase.
+        scaling (float, optional): factor by which epsilon is reduced each phase. Defaults to 5.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: object assigned to every person and final object prices.
+    """
+    n, m = benefit.shape
+    assert n <= m, 'Auction requires at least as many objects as persons.'
+    prices = np.zeros(m)
+    assigned = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return assigned, prices
+
+    eps = max((benefit.max() - benefit.min()) / 2, eps_final)
+
+    while True:
+        __forward_auction(benefit, assigned, prices, eps)
+        if eps <= eps_final:
+            break
+
+        eps = max(eps / scaling, eps_final)
+
+    if n < m:
+        __reverse_auction(benefit, assigned, prices, eps)
+
+    return assigned, prices
+
+
+def __forward_auction(benefit: np.ndarray, assigned: np.ndarray, prices: np.ndarray, eps: float):
+    """Runs one forward auction phase, starting without assignments. Updates "assigned" and "prices" in place.
+    """
+    n, m = benefit.shape
+    owner = np.full(m, -1, dtype=np.int64)
+    assigned[:] = -1
+    unassigned = np.arange(n)
+
+    while unassigned.size > 0:
+        # Bidding: best and second best object of every unassigned person
+        values = benefit[unassigned] - prices
+        rows = np.arange(len(unassigned))
+        best = np.argmax(values, axis=1)
+        best_value = values[rows, best]
+        if m > 1:
+            values[rows, best] = -np.inf
+            second_value = values.max(axis=1)
+            bids = prices[best] + best_value - second_value + eps
+        else:
+            bids = prices[best] + eps
+
+        # Assignment: highest bid per object wins
+        order = np.lexsort((-bids, best))
+        sorted_objects = best[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = sorted_objects[1:] != sorted_objects[:-1]
+        winners = order[first]
+
+        objects = best[winners]
+        previous_owners = owner[objects]
+        assigned[previous_owners[previous_owners >= 0]] = -1
+        owner[objects] = unassigned[winners]
+        assigned[unassigned[winners]] = objects
+        prices[objects] = bids[winners]
+
+        unassigned = np.flatnonzero(assigned < 0)
+
+
+def __reverse_auction(benefit: np.ndarray, assigned: np.ndarray, prices: np.ndarray, eps: float):
+    """Lowers the prices of unassigned objects to the lowest price of any assigned object,
+    which makes the assignment of an asymmetric problem optimal. Updates "assigned" and "prices" in place.
+    """
+    n, m = benefit.shape
+    persons = np.arange(n)
+    owner = np.full(m, -1, dtype=np.int64)
+    owner[assigned] = persons
+    profits = benefit[persons, assigned] - prices[assigned]
+    lowest_price = prices[assigned].min()
+
+    queue = list(np.flatnonzero((owner < 0) & (prices > lowest_price)))
+    while queue:
+        j = queue.pop()
+        values = benefit[:, j] - profits
+        i = np.argmax(values)
+        best_value = values[i]
+        values[i] = -np.inf
+        second_value = values.max() if n > 1 else -np.inf
+
+        if lowest_price >= best_value - eps:
+            prices[j] = lowest_price
+            continue
+
+        # Object j takes person i, whose previous object becomes unassigned
+        prices[j] = max(lowest_price, second_value - eps)
+        previous = assigned[i]
+        owner[previous] = -1
+        owner[j] = i
+        assigned[i] = j
+        profits[i] = benefit[i, j] - prices[j]
+        if prices[previous] > lowest_price:
+            queue.append(previous)
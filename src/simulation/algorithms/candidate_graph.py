@@ -0,0 +1,129 @@
+import numpy as np
+from typing import Tuple
+from src.utils.profiling import profiled
+from src.utils.travel_times import TravelTimeOracle
+
+class CandidateGraph(object):
+    def __init__(self, shape: Tuple[int, int], drivers: np.ndarray, requests: np.ndarray, costs: np.ndarray):
+        """Sparse bipartite graph of driver-request candidate pairs.
+
+        Args:
+            shape (Tuple[int, int]): number of drivers and requests.
+            drivers (np.ndarray): driver index of every edge.
+            requests (np.ndarray): request index of every edge.
+            costs (np.ndarray): cost of every edge.
+        """
+        self.shape = shape
+        self.drivers = drivers
+        self.requests = requests
+        self.costs = costs
+
+    @property
+    def num_edges(self):
+        return len(self.costs)
+
+    @property
+    def uncovered(self) -> np.ndarray:
+        """Indices of requests without any candidate driver.
+        """
+        degree = np.bincount(self.requests, minlength=self.shape[1])
+        return np.flatnonzero(degree == 0)
+
+
+class CandidateGenerator(object):
+    def __init__(self, travel_times: TravelTimeOracle, max_travel_time: float=None, k_nearest: int=None):
+        """Generates sparse driver-request candidate graphs instead of dense cost matrices.
+
+        Note:
+        Costs are computed once per pair of distinct driver and request TAZs, so memory is bounded
+        by the number of edges plus the number of TAZ pairs. If both criteria are set, a pair must
+        satisfy both.
+
+        Args:
+            travel_times (TravelTimeOracle): travel time oracle.
+            max_travel_time (float, optional): maximum cost in minutes of a candidate pair. Defaults to None.
+            k_nearest (int, optional): number of cheapest drivers kept per request. Defaults to None.
+        """
+        assert max_travel_time is not None or k_nearest is not None, 'Candidate generation requires a criterion.'
+        self.travel_times = travel_times
+        self.max_travel_time = max_travel_time
+        self.k_nearest = k_nearest
+
+    @profiled('candidate_graph')
+    def generate(self, hour_of_day: int, driver_pos: np.ndarray, driver_exp_times: np.ndarray,
+                 request_pos: np.ndarray) -> CandidateGraph:
+        """Generates the candidate graph of one matching round.
+
+        Args:
+            hour_of_day (int): hour of the day.
+            driver_pos (np.ndarray): anticipated TAZ of every driver.
+            driver_exp_times (np.ndarray): expected time in minutes until every driver is available.
+            request_pos (np.ndarray): TAZ of every request.
+
+        Returns:
+            CandidateGraph: candidate pairs and their costs (travel time plus expected time to availability).
+        """
+        driver_exp_times = np.asarray(driver_exp_times, dtype=np.float64).ravel()
+        driver_taz, driver_group = np.unique(driver_pos, return_inverse=True)
+        request_taz, request_group = np.unique(request_pos, return_inverse=True)
+        taz_costs = self.travel_times.cost_matrix(hour_of_day, driver_taz, request_taz) / 60
+
+        if self.k_nearest is not None:
+            drivers, requests = self.__k_nearest_pairs(taz_costs, driver_group, driver_exp_times, request_group)
+        else:
+            drivers, requests = self.__radius_pairs(taz_costs, driver_group, driver_exp_times, request_group)
+
+        costs = taz_costs[driver_group[drivers], request_group[requests]] + driver_exp_times[drivers]
+        if self.max_travel_time is not None:
+            keep = costs <= self.max_travel_time
+            drivers, requests, costs = drivers[keep], requests[keep], costs[keep]
+
+        return CandidateGraph((len(driver_pos), len(request_pos)), drivers, requests, costs)
+
+    def __radius_pairs(self, taz_costs: np.ndarray, driver_group: np.ndarray, driver_exp_times: np.ndarray,
+                       request_group: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Expands all TAZ pairs which can be within the travel time cutoff into driver-request pairs.
+        """
+        # Drivers and requests sorted by TAZ
+        driver_order, driver_start, driver_count = self.__group_members(driver_group, taz_costs.shape[0])
+        request_order, request_start, request_count = self.__group_members(request_group, taz_costs.shape[1])
+
+        # TAZ pairs with at least one driver within the cutoff
+        min_exp_times = np.full(taz_costs.shape[0], np.inf)
+        np.minimum.at(min_exp_times, driver_group, driver_exp_times)
+        a, b = np.nonzero(taz_costs + min_exp_times[:, None] <= self.max_travel_time)
+
+        # Cartesian product of the members of every TAZ pair
+        sizes = driver_count[a] * request_count[b]
+        pair = np.repeat(np.arange(len(a)), sizes)
+        local = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        width = request_count[b[pair]]
+        drivers = driver_order[driver_start[a[pair]] + local // width]
+        requests = request_order[request_start[b[pair]] + local % width]
+        return drivers, requests
+
+    def __k_nearest_pairs(self, taz_costs: np.ndarray, driver_group: np.ndarray, driver_exp_times: np.ndarray,
+                          request_group: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Selects the k cheapest drivers for every request TAZ and connects them to all its requests.
+        """
+        k = min(self.k_nearest, len(driver_group))
+        request_order, request_start, request_count = self.__group_members(request_group, taz_costs.shape[1])
+
+        drivers, requests = [], []
+        for b in range(taz_costs.shape[1]):
+            costs = taz_costs[driver_group, b] + driver_exp_times
+            nearest = np.argpartition(costs, k - 1)[:k] if k < len(costs) else np.arange(len(costs))
+            members = request_order[request_start[b]:request_start[b] + request_count[b]]
+            drivers.append(np.tile(nearest, len(members)))
+            requests.append(np.repeat(members, len(nearest)))
+
+        return np.concatenate(drivers), np.concatenate(requests)
+
+    @staticmethod
+    def __group_members(group: np.ndarray, num_groups: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns members sorted by group, start offset and size of every group.
+        """
+        order = np.argsort(group, kind='stable')
+        count = np.bincount(group, minlength=num_groups)
+        start = np.cumsum(count) - count
+        return order, start, count
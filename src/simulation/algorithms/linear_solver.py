@@ -1,19 +1,148 @@
-import cvxpy as cp
 import numpy as np
-from src.utils.timing import timing
+from typing import Tuple
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching, connected_components
+from src.utils.profiling import profiled
+from .auction import auction_assignment
+from .candidate_graph import CandidateGraph
+
+SOLVER_BACKENDS = ['cvxpy', 'hungarian', 'jv', 'auction']
 
 class LinearSolver(object):
-    @timing
+    def __init__(self, backend: str='hungarian', resolution: float=1e-4):
+        """Solves rectangular driver-rider assignment problems.
+
+        Note:
+        Available backends are
+            - 'cvxpy': boolean linear program (reference implementation).
+            - 'hungarian': scipy.optimize.linear_sum_assignment.
+            - 'jv': sparse Jonker-Volgenant (scipy.sparse.csgraph.min_weight_full_bipartite_matching).
+            - 'auction': epsilon-scaling auction algorithm.
+        All backends assign every row or column of the smaller dimension exactly once.
+
+        Args:
+            backend (str, optional): assignment backend. Defaults to 'hungarian'.
+            resolution (float, optional): cost resolution up to which the auction backend is optimal. Defaults to 1e-4.
+        """
+        if backend not in SOLVER_BACKENDS:
+            raise ValueError(f'Unknown solver backend "{backend}". Choose from {SOLVER_BACKENDS}.')
+
+        self.backend = backend
+        self.resolution = resolution
+
     def solve_matching(self, matrix: np.ndarray, minimize: bool=True) -> np.ndarray:
-        """Solves a linear program to minimize travel times in driver-rider assignments.
+        """Solves the assignment problem to minimize travel times in driver-rider assignments.
+
+        Args:
+            matrix (np.ndarray): cost (or benefit) matrix
+            minimize (bool, optional): whether to minimize or maximize. Defaults to True.
+
+        Returns:
+            np.ndarray: binary assignment matrix of the same shape as "matrix"
+        """
+        rows, cols = self.solve_assignment(matrix, minimize)
+        assignment = np.zeros(matrix.shape)
+        assignment[rows, cols] = 1
+        return assignment
+
+    @profiled('solver')
+    def solve_assignment(self, matrix: np.ndarray, minimize: bool=True) -> Tuple[np.ndarray, np.ndarray]:
+        """Solves the assignment problem and returns the assigned entries.
+
+        Args:
+            matrix (np.ndarray): cost (or benefit) matrix
+            minimize (bool, optional): whether to minimize or maximize. Defaults to True.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: row and column indices of assignments, sorted by row
+        """
+        if matrix.size == 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+
+        solve = getattr(self, f'_solve_{self.backend}')
+        rows, cols = solve(np.asarray(matrix, dtype=np.float64), minimize)
+        order = np.argsort(rows)
+        return rows[order], cols[order]
+
+    @profiled('solver')
+    def solve_sparse_assignment(self, graph: CandidateGraph) -> Tuple[np.ndarray, np.ndarray]:
+        """Solves the assignment problem on a sparse candidate graph.
+
+        Note:
+        Pairs without an edge cannot be assigned, so not every driver or request of the smaller
+        side is necessarily matched. The assignment has maximum cardinality and, among those,
+        minimum cost. The 'jv' backend solves the sparse graph directly, all other backends solve
+        every connected component of the graph as a dense problem.
 
         Args:
-            matrix (np.ndarray): _description_
-            minimize (bool, optional): _description_. Defaults to True.
+            graph (CandidateGraph): candidate driver-request pairs and their costs.
 
         Returns:
-            np.ndarray: assignment
+            Tuple[np.ndarray, np.ndarray]: driver and request indices of assignments, sorted by driver
+        """
+        if graph.num_edges == 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+
+        if self.backend == 'jv':
+            rows, cols = self.__solve_sparse_jv(graph)
+        else:
+            rows, cols = self.__solve_sparse_components(graph)
+
+        order = np.argsort(rows)
+        return rows[order], cols[order]
+
+    def __solve_sparse_jv(self, graph: CandidateGraph) -> Tuple[np.ndarray, np.ndarray]:
+        """Solves the sparse graph augmented with one dummy node per driver and request.
+        """
+        # Every node can be matched to its dummy at a penalty exceeding the cost of any assignment,
+        # dummies are matched to each other along the transposed candidate edges.
+        n, m = graph.shape
+        costs = graph.costs - graph.costs.min() + 1
+        penalty = costs.max() * (min(n, m) + 1)
+        drivers, requests = np.arange(n), np.arange(m)
+        rows = np.concatenate([graph.drivers, drivers, n + requests, n + graph.requests])
+        cols = np.concatenate([graph.requests, m + drivers, requests, m + graph.drivers])
+        data = np.concatenate([costs, np.full(n + m, penalty), np.zeros(graph.num_edges)]) + 1
+
+        augmented = csr_matrix((data, (rows, cols)), shape=(n + m, m + n))
+        rows, cols = min_weight_full_bipartite_matching(augmented)
+        real = (rows < n) & (cols < m)
+        return rows[real], cols[real]
+
+    def __solve_sparse_components(self, graph: CandidateGraph) -> Tuple[np.ndarray, np.ndarray]:
+        """Solves every connected component of the graph as a dense problem with penalized non-edges.
+        """
+        n, m = graph.shape
+        adjacency = csr_matrix((np.ones(graph.num_edges), (graph.drivers, n + graph.requests)), shape=(n + m, n + m))
+        _, labels = connected_components(adjacency, directed=False)
+
+        # Edges sorted by component
+        component = labels[graph.drivers]
+        order = np.argsort(component, kind='stable')
+        bounds = np.flatnonzero(np.diff(component[order])) + 1
+
+        rows, cols = [], []
+        for edges in np.split(order, bounds):
+            drivers, local_drivers = np.unique(graph.drivers[edges], return_inverse=True)
+            requests, local_requests = np.unique(graph.requests[edges], return_inverse=True)
+            costs = graph.costs[edges]
+            penalty = (costs.max() - min(costs.min(), 0) + 1) * (min(len(drivers), len(requests)) + 1)
+
+            matrix = np.full((len(drivers), len(requests)), penalty)
+            matrix[local_drivers, local_requests] = costs
+            component_rows, component_cols = self.solve_assignment(matrix, minimize=True)
+            real = matrix[component_rows, component_cols] < penalty
+            rows.append(drivers[component_rows[real]])
+            cols.append(requests[component_cols[real]])
+
+        return np.concatenate(rows), np.concatenate(cols)
+
+    def _solve_cvxpy(self, matrix: np.ndarray, minimize: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """Solves a boolean linear program with cvxpy.
         """
+        import cvxpy as cp
+
         X = cp.Variable(shape=matrix.shape, name='X', boolean=True)
         action = cp.Minimize if minimize else cp.Maximize
         objective = action(cp.sum(cp.multiply(X, matrix)))
@@ -24,15 +153,66 @@ class LinearSolver(object):
             cp.sum(X, axis=min_axis) <= 1,
             X >= 0
         ]
-        
+
         lp = cp.Problem(objective, constraints)
         _ = lp.solve()
-        return X.value
+        return np.nonzero(X.value > 0.5)
+
+    def _solve_hungarian(self, matrix: np.ndarray, minimize: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """Solves the assignment with scipy's linear_sum_assignment.
+        """
+        return linear_sum_assignment(matrix, maximize=not minimize)
+
+    def _solve_jv(self, matrix: np.ndarray, minimize: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """Solves the assignment with the sparse Jonker-Volgenant algorithm (LAPJVsp).
+        """
+        # Costs must be strictly positive as zero entries are no edges in sparse matrices.
+        # All assignments have the same cardinality, so shifting costs does not change the optimum.
+        costs = matrix if minimize else -matrix
+        costs = costs - costs.min() + 1
+        return min_weight_full_bipartite_matching(csr_matrix(costs))
+
+    def _solve_auction(self, matrix: np.ndarray, minimize: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """Solves the assignment with the epsilon-scaling auction algorithm.
+        """
+        # Persons are the smaller dimension
+        transposed = matrix.shape[0] > matrix.shape[1]
+        benefit = (-matrix if minimize else matrix) / self.resolution
+        if transposed:
+            benefit = benefit.T
+
+        assigned, _ = auction_assignment(benefit, eps_final=1. / (benefit.shape[0] + 1))
+        persons = np.arange(benefit.shape[0])
+        return (assigned, persons) if transposed else (persons, assigned)
 
 if __name__ == '__main__':
-    lp_solver = LinearSolver()
-    test_matrix = np.random.rand(4, 6)
-    print(test_matrix)
-    assignment = lp_solver.solve_matching(test_matrix)
-    print(assignment)
-    print(test_matrix[assignment.astype(bool)])
\ No newline at end of file
+    from time import time
+
+    # Parity between backends
+    lp_solver = LinearSolver(backend='cvxpy')
+    for shape in [(4, 6), (6, 4), (20, 35), (50, 40)]:
+        test_matrix = np.random.rand(*shape) * 30
+        reference = test_matrix[lp_solver.solve_assignment(test_matrix)].sum()
+        for backend in SOLVER_BACKENDS:
+            rows, cols = LinearSolver(backend=backend).solve_assignment(test_matrix)
+            assert len(rows) == min(shape) and len(np.unique(rows)) == len(np.unique(cols)) == min(shape)
+            assert abs(test_matrix[rows, cols].sum() - reference) < 1e-3, f'{backend} differs from cvxpy for {shape}'
+
+    print('All backends agree with the cvxpy reference.')
+
+    # Timing per size
+    sizes = [(10, 10), (100, 120), (500, 600), (1000, 1200), (2000, 2000)]
+    print(f'{"size":>12}' + ''.join(f'{backend:>12}' for backend in SOLVER_BACKENDS))
+    for shape in sizes:
+        test_matrix = np.random.rand(*shape) * 30
+        row = f'{shape[0]:>5} x {shape[1]:<5}'
+        for backend in SOLVER_BACKENDS:
+            if backend == 'cvxpy' and shape[0] > 100:
+                row += f'{"-":>12}'
+                continue
+
+            ts = time()
+            LinearSolver(backend=backend).solve_assignment(test_matrix)
+            row += f'{time() - ts:>11.4f}s'
+
+        print(row)
@@ -3,6 +3,9 @@ from abc import ABC, abstractmethod
 class RideShareMatchingAlgorithm(ABC):
     """Abstract class for a ridesharing matching algorithm.
     """
+    # Requests of the last matching round which had no candidate driver
+    uncovered_requests = []
+
     @staticmethod
     def is_match_possible(requests, drivers):
         if len(requests) == 0 or len(drivers) == 0:
@@ -1,20 +1,23 @@
 import numpy as np
-import pandas as pd
 from typing import List, Tuple
-from itertools import product
-from src.utils.timing import timing
+from src.utils.profiling import profiled, span
+from src.utils.travel_times import TravelTimeOracle
 from .rideshare_algorithm import RideShareMatchingAlgorithm
 from .linear_solver import LinearSolver
+from .candidate_graph import CandidateGenerator
 
 class ShortestDistance(RideShareMatchingAlgorithm):
-    def __init__(self, uber_data: pd.DataFrame):
+    def __init__(self, travel_times: TravelTimeOracle, solver_backend: str='hungarian',
+                 candidates: CandidateGenerator=None):
         """
         Matches riders with drivers minimizing the driver OOS travel time.
         """
-        self.uber_data = uber_data
-        self.solver = LinearSolver()
+        self.travel_times = travel_times
+        self.solver = LinearSolver(backend=solver_backend)
+        self.candidates = candidates
+        self.uncovered_requests = []
     
-    @timing
+    @profiled('create_matches')
     def create_matches(self, time: float, requests: List, drivers: List) -> List:
         """Generates matches to minimize OOS driving time.
 
@@ -26,30 +29,35 @@ class ShortestDistance(RideShareMatchingAlgorithm):
         Returns:
             List: list of tuples of (rider, driver) matches
         """
+        self.uncovered_requests = []
         if not ShortestDistance.is_match_possible(requests, drivers):
             return []
         
         # Determine hour of day and weekday
         hour = time / 60
-        hour_of_day = [int(hour % 24)]
+        hour_of_day = int(hour % 24)
         
-        # Get driver and rider positions
-        driver_pos = [x.anticipated_pos for x in drivers]
-        driver_exp_times = np.array([x.exp_time_to_availability for x in drivers]).reshape((len(drivers), 1))
-        request_pos = [x.pos for x in requests]
+        # Identify drivers and requests by their numbers in the stores
+        driver_keys = np.fromiter((x.num for x in drivers), dtype=np.int64, count=len(drivers))
+        request_keys = np.fromiter((x.num for x in requests), dtype=np.int64, count=len(requests))
+
+        # Get driver and rider positions as slices of their stores
+        driver_store, request_store = drivers[0].store, requests[0].store
+        driver_pos = driver_store.anticipated_pos[driver_keys]
+        driver_exp_times = driver_store.exp_time_to_availability(driver_keys, time).reshape((len(drivers), 1))
+        request_pos = request_store.pos[request_keys]
 
         # Find best matches
-        multi_index = list(product(hour_of_day, driver_pos, request_pos))
-        travel_times = self.uber_data.loc[multi_index, 'mean_travel_time'].values / 60
-        travel_times = travel_times.reshape((len(drivers), len(requests)))
-        travel_times += driver_exp_times
-        assignments = self.solver.solve_matching(travel_times, minimize=True)
+        if self.candidates is None:
+            with span('cost_matrix'):
+                travel_times = self.travel_times.cost_matrix(hour_of_day, driver_pos, request_pos) / 60
+                travel_times += driver_exp_times
+            rows, cols = self.solver.solve_assignment(travel_times, minimize=True)
+        else:
+            graph = self.candidates.generate(hour_of_day, driver_pos, driver_exp_times, request_pos)
+            self.uncovered_requests = [requests[j] for j in graph.uncovered]
+            rows, cols = self.solver.solve_sparse_assignment(graph)
 
         # Update lists
-        matches = []
-        for i, driver in enumerate(drivers):
-            for j, request in enumerate(requests):
-                if assignments[i, j] == 1:
-                    matches.append((request, driver))
-        
+        matches = [(requests[j], drivers[i]) for i, j in zip(rows, cols)]
         return matches
\ No newline at end of file
@@ -1,2 +1,3 @@
 from .driver_process import DriverProcess
-from .rider_process import RiderProcess
\ No newline at end of file
+from .rider_process import RiderProcess
+from .arrival_stream import PoissonArrivalStream
\ No newline at end of file
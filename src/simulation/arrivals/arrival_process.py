@@ -1,16 +1,16 @@
 from typing import List
 from abc import ABC, abstractmethod
 from simpy.core import Environment
-from simpy.resources.store import FilterStore
+from src.simulation.elements import AvailabilityRegistry
 
 class ArrivalProcess(ABC):
     """
     Abstract class for an arrival processes.
     """
-    def __init__(self, env: Environment, store: FilterStore, collection: List,
+    def __init__(self, env: Environment, registry: AvailabilityRegistry, collection: List,
                  verbose: bool=True, debug: bool=False):
         self.env = env
-        self.store = store
+        self.registry = registry
         self.collection = collection
         self.verbose = verbose
         self.debug = debug
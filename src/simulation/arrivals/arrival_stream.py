@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+from typing import Iterator
+from src.utils.profiling import profiled
+
+MINUTES_PER_WEEK = 7 * 24 * 60
+
+class PoissonArrivalStream(object):
+    def __init__(self, arrival_df: pd.Series, start: float, chunk_minutes: int=24 * 60,
+                 rng: np.random.Generator=None):
+        """Generates the arrival times of a non-homogeneous Poisson process in chunks.
+
+        Note:
+        The arrival rate is piecewise constant per minute of the week. The number of arrivals
+        during every minute is drawn from a Poisson distribution and the arrivals are spread
+        uniformly within their minute, which is exact for piecewise constant rates. Whole
+        chunks of "chunk_minutes" minutes are generated at once, so multi-week runs never
+        hold more than one chunk in memory.
+
+        Args:
+            arrival_df (pd.Series): hourly arrival rates indexed by ['day_of_week', 'hour', 'minute'].
+            start (float): simulation time (in minutes) of the first possible arrival.
+            chunk_minutes (int, optional): minutes generated per chunk. Defaults to one day.
+            rng (np.random.Generator, optional): random stream. Defaults to None (global NumPy random state).
+        """
+        week_index = pd.MultiIndex.from_product([range(7), range(24), range(60)])
+        rates = arrival_df.reindex(week_index, fill_value=0).to_numpy(dtype=np.float64)
+        self.rates = rates / 60 # arrivals per minute
+        self.start = start
+        self.chunk_start = start
+        self.chunk_minutes = chunk_minutes
+        self.rng = np.random if rng is None else rng
+
+    def generate(self, start: float, end: float) -> np.ndarray:
+        """Generates all arrival times in [start, end).
+
+        Args:
+            start (float): start time in minutes.
+            end (float): end time in minutes.
+
+        Returns:
+            np.ndarray: sorted arrival times.
+        """
+        minutes = np.arange(int(np.floor(start)), int(np.ceil(end)))
+        counts = self.rng.poisson(self.rates[minutes % MINUTES_PER_WEEK])
+        times = np.repeat(minutes, counts) + self.rng.uniform(size=counts.sum())
+        times.sort()
+        return times[(times >= start) & (times < end)]
+
+    @profiled('arrival_generation')
+    def next_chunk(self) -> np.ndarray:
+        """Generates the arrival times of the next chunk, starting at "chunk_start".
+        """
+        chunk_end = self.chunk_start + self.chunk_minutes
+        times = self.generate(self.chunk_start, chunk_end)
+        self.chunk_start = chunk_end
+        return times
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        """Yields consecutive chunks of arrival times, starting at "chunk_start".
+        """
+        while True:
+            yield self.next_chunk()
+
+if __name__ == '__main__':
+    from time import time
+
+    # One week of arrivals with a daily demand cycle
+    week_index = pd.MultiIndex.from_product([range(7), range(24), range(60)], names=['day_of_week', 'hour', 'minute'])
+    hours = week_index.get_level_values('hour').values
+    test_df = pd.Series(6000 + 5000 * np.sin(hours / 24 * 2 * np.pi), index=week_index)
+
+    ts = time()
+    stream = PoissonArrivalStream(test_df, start=0.5)
+    week = stream.generate(0.5, MINUTES_PER_WEEK)
+    print(f'Generated {len(week):,} arrivals for one week in {time() - ts:.4f}s')
+
+    expected = test_df.sum() / 60
+    assert abs(len(week) - expected) < 5 * np.sqrt(expected), 'Number of arrivals deviates from the expected number'
+    assert np.all(np.diff(week) >= 0) and week[0] >= 0.5
+
+    chunks = iter(stream)
+    first, second = next(chunks), next(chunks)
+    assert first[-1] < 0.5 + 24 * 60 <= second[0]
+    print('Chunked arrivals are consecutive.')
@@ -1,29 +1,38 @@
-import pandas as pd
-from typing import List
-import random
+from typing import List, Iterable, Dict
 from simpy.core import Environment
-from simpy.resources.store import FilterStore
+from simpy.events import Event
 from .arrival_process import ArrivalProcess
-from src.simulation.elements import Driver
-from src.simulation.params import PICKUP_DROPOFF_PATH, DRIVER_PATH, UBER_MARKET_SHARE, \
-                                  STALL_DRIVERS, MARKET_FORCE_SUPPLY
+from src.simulation.elements import Driver, FastDriver, AvailabilityRegistry, DriverStore, RegionBoundary, DriverHandoff
+from src.simulation.config import SimulationConfig
+from src.simulation.simulation_data import SimulationData
+from src.utils import RandomStreams, profiled
 
 class DriverProcess(ArrivalProcess):
-    def __init__(self, env: Environment, store: FilterStore, collection: List, initial_drivers: int,
-                 num_active_drivers: List, num_active_riders: List, arrival_df: pd.DataFrame, geo_df: pd.DataFrame,
-                 verbose: bool = True, debug: bool = False):
-        super().__init__(env, store, collection, verbose, debug)
+    def __init__(self, env: Environment, registry: AvailabilityRegistry, collection: List, store: DriverStore,
+                 initial_drivers: int, num_active_drivers: List, num_active_riders: List, data: SimulationData,
+                 config: SimulationConfig, streams: RandomStreams, verbose: bool = True, debug: bool = False,
+                 boundary: RegionBoundary = None):
+        super().__init__(env, registry, collection, verbose, debug)
+        self.store = store
         self.initial_drivers = initial_drivers
-        self.geo_df = geo_df
+        self.data = data
+        self.config = config
+        self.streams = streams
+        self.boundary = boundary
         self.driver_number = 0
-        self.arrival_df = arrival_df
+        self.arrival_df = data.arrival_df
         self.__num_active_drivers = num_active_drivers
         self.__num_active_riders = num_active_riders
         self.drivers = []
 
+        # Drivers are SimPy processes or state machines of the event kernel
+        self.driver_class = Driver
+        if config.engine == 'fast':
+            self.driver_class = FastDriver
+            FastDriver.register(env, store)
+
         # Load driver supply data
-        self.num_driver_df = pd.read_csv(DRIVER_PATH, index_col=['hour', 'minute'])
-        self.num_driver_df *= UBER_MARKET_SHARE
+        self.num_driver_df = data.num_driver_df * config.uber_market_share
 
         # Check if initial driver number set
         if self.initial_drivers is None:
@@ -36,16 +45,9 @@ class DriverProcess(ArrivalProcess):
         if self.debug:
             self.num_driver_df /= 10
 
-        if STALL_DRIVERS:
+        if self.config.stall_drivers:
             self.num_driver_df /= 10
 
-        # Load trip endpoint data
-        self.trip_endpoint_data = pd.read_csv(PICKUP_DROPOFF_PATH, index_col=['day_of_week', 'hour'])
-
-        # Spawn initial drivers
-        print('Generating initial drivers ...')
-        self.spawn_initial_drivers()
-
     
     @property
     def num_active_drivers(self):
@@ -55,7 +57,14 @@ class DriverProcess(ArrivalProcess):
     def num_active_riders(self):
         return self.__num_active_riders[0]
 
+    @property
+    def target_supply(self) -> float:
+        """Target number of active drivers at the current minute.
+        """
+        return self.num_driver_df.at[(int(self.env.now / 60 % 24), int(self.env.now % 60)), 'n_drivers']
+
 
+    @profiled('supply')
     def dispatch_drivers(self, n: int):
         """Dispatches n drivers.
 
@@ -63,34 +72,81 @@ class DriverProcess(ArrivalProcess):
             n (int): number of drivers to dispatch
         """
         for _ in range(n):
-            Driver(self.driver_number, self.trip_endpoint_data, self.geo_df, self.num_driver_df, self.env,
-                   self.store, self.collection, self.__num_active_drivers, self.__num_active_riders,
-                   self.verbose)
+            self.driver_class(self.driver_number, self.store, self.data.driver_endpoint_sampler, self.data.geometry_sampler,
+                              self.num_driver_df, self.env, self.registry, self.collection, self.__num_active_drivers,
+                              self.__num_active_riders, self.config, self.streams, self.verbose, self.boundary)
+            self.driver_number += 1
+
+
+    def receive_drivers(self, handoffs: Iterable[DriverHandoff]):
+        """Dispatches drivers handed off by neighbouring regions where they left off.
+
+        Args:
+            handoffs (Iterable[DriverHandoff]): state of the drivers.
+        """
+        for handoff in handoffs:
+            driver = self.driver_class(self.driver_number, self.store, self.data.driver_endpoint_sampler,
+                                       self.data.geometry_sampler, self.num_driver_df, self.env, self.registry,
+                                       self.collection, self.__num_active_drivers, self.__num_active_riders, self.config,
+                                       self.streams, self.verbose, self.boundary, start_pos=handoff.taz,
+                                       start_point=handoff.point)
+            driver.oos_wait = handoff.oos_wait + (self.env.now - handoff.time) # idle until the handoff arrived
+            driver.oos_drive = handoff.oos_drive
+            driver.trip_total = handoff.trip_total
+            driver.num_trips = handoff.num_trips
             self.driver_number += 1
 
 
+    def restore_driver(self, num: int, wake: Event) -> Driver:
+        """Recreates an online driver from its state in the driver store.
+
+        Args:
+            num (int): driver number.
+            wake (Event): event the driver waits for in its current phase.
+
+        Returns:
+            Driver: the driver, whose jobs still have to be restored.
+        """
+        return self.driver_class(num, self.store, self.data.driver_endpoint_sampler, self.data.geometry_sampler,
+                                 self.num_driver_df, self.env, self.registry, self.collection, self.__num_active_drivers,
+                                 self.__num_active_riders, self.config, self.streams, self.verbose, self.boundary,
+                                 wake=wake)
+
+
+    def get_state(self) -> Dict:
+        return {'driver_number': self.driver_number}
+
+
+    def set_state(self, state: Dict):
+        self.driver_number = state['driver_number']
+
+
     def spawn_initial_drivers(self):
         """Spawns initial drivers
         """
+        print('Generating initial drivers ...')
         n_drivers = self.initial_drivers if self.debug == False else int(self.initial_drivers / 10)
-        n_drivers = n_drivers if STALL_DRIVERS == False else int(n_drivers / 10)
+        n_drivers = n_drivers if self.config.stall_drivers == False else int(n_drivers / 10)
         self.dispatch_drivers(n_drivers)
         if self.verbose:
             print(f'Spawned {n_drivers:,} drivers')
 
 
-    def run(self):
+    def run(self, wake: Event=None):
         """
         Simulates the arrival process of drivers throughout the city.
+        A process restored from a checkpoint waits for "wake" before its next dispatch.
         """
         # Offset
-        yield self.env.timeout(0.5)
+        if wake is None:
+            yield self.env.timeout(0.5)
 
         # Dispath drivers as necessary
         while True:
             
             # Operate every minute
-            yield self.env.timeout(1)
+            yield self.env.timeout(1) if wake is None else wake
+            wake = None
             
             # Determine minute, hour of day
             minute = int(self.env.now % 60)   
@@ -102,8 +158,10 @@ class DriverProcess(ArrivalProcess):
             target_uber_supply = self.num_driver_df.loc[(hour_of_day, minute), 'n_drivers']
             # mean_riders = int(self.arrival_df.loc[(weekday, hour_of_day, minute)])
             num_active = self.num_active_drivers
+            if self.boundary is not None:
+                num_active = self.boundary.active_drivers(target_uber_supply, num_active)
             
-            if MARKET_FORCE_SUPPLY:
+            if self.config.market_force_supply:
                 raise NotImplementedError() # TODO: Implement
 
                 # If current supply is not high enough, dispatch drivers
@@ -121,5 +179,5 @@ class DriverProcess(ArrivalProcess):
             # Don't add drivers otherwise
             else:
                 deficit = int(target_uber_supply - num_active)
-                drivers_to_spawn = int(random.uniform(0, 0.25) * deficit)
+                drivers_to_spawn = int(self.streams.supply.uniform(0, 0.25) * deficit)
                 self.dispatch_drivers(drivers_to_spawn)
\ No newline at end of file
@@ -1,27 +1,37 @@
-from typing import List
-import random
-import pandas as pd
+import numpy as np
+from typing import List, Dict
 from simpy.core import Environment
-from simpy.resources.store import FilterStore
+from simpy.events import Event
 from .arrival_process import ArrivalProcess
-from src.simulation.params import UBER_MARKET_SHARE, PICKUP_DROPOFF_PATH
-from src.simulation.elements import Rider
+from .arrival_stream import PoissonArrivalStream
+from src.simulation.config import SimulationConfig
+from src.simulation.simulation_data import SimulationData
+from src.simulation.elements import Rider, FastRider, AvailabilityRegistry, RiderStore
+from src.utils import RandomStreams, profiled
 
 class RiderProcess(ArrivalProcess):
-    def __init__(self, env: Environment, store: FilterStore, collection: List, arrival_df: pd.DataFrame,
-                 geo_df: pd.DataFrame, num_active_requests: List, verbose: bool = True, debug: bool = False):
+    def __init__(self, env: Environment, registry: AvailabilityRegistry, collection: List, store: RiderStore,
+                 data: SimulationData, config: SimulationConfig, streams: RandomStreams, num_active_requests: List,
+                 verbose: bool = True, debug: bool = False):
         """
         Simulates the arrival process of rider pools throughout the city.
         """
-        super().__init__(env, store, collection, verbose, debug)
-        self.arrival_df = arrival_df
-        self.trip_endpoint_data = pd.read_csv(PICKUP_DROPOFF_PATH, index_col=['day_of_week', 'hour'])
-        self.geo_df = geo_df
+        super().__init__(env, registry, collection, verbose, debug)
+        self.store = store
+        self.data = data
+        self.config = config
+        self.streams = streams
         self.num_active_requests = num_active_requests
         self.rider_number = 0
 
+        # Riders are SimPy processes or state machines of the event kernel
+        self.rider_class = Rider
+        if config.engine == 'fast':
+            self.rider_class = FastRider
+            FastRider.register(env, store)
+
         # Adjust for Uber market share
-        self.arrival_df *= UBER_MARKET_SHARE
+        self.arrival_df = data.arrival_df * config.uber_market_share
 
         # Adjust for debug
         if self.debug:
@@ -34,32 +44,68 @@ class RiderProcess(ArrivalProcess):
         weekday = int((self.env.now / 60 / 24) % 7)
         self.initial_riders = int(self.arrival_df.loc[(weekday, hour_of_day, minute)] / 4) # Get 15-min equivalent of riders
 
-        # Spawn intitial riders
+        # Arrival times of all later riders, generated one chunk at a time
+        self.arrival_stream = PoissonArrivalStream(self.arrival_df, start=self.env.now, rng=streams.arrivals)
+        self.arrivals = np.array([])
+        self.next_arrival = 0
+
+
+    def spawn_initial_riders(self):
+        """Spawns initial riders
+        """
         print('Generating initial riders ...')
         self.spawn_riders(n=self.initial_riders)
 
 
+    @profiled('arrivals')
     def spawn_riders(self, n: int=1):
         for _ in range(n):
-            Rider(self.rider_number, self.trip_endpoint_data, self.geo_df, self.env, self.store, self.collection,
-                  self.num_active_requests, self.verbose)
+            self.rider_class(self.rider_number, self.store, self.data.endpoint_sampler, self.data.geometry_sampler, self.data.travel_times,
+                             self.env, self.registry, self.collection,
+                             self.num_active_requests, self.streams, self.verbose)
             self.rider_number += 1
         
 
-    def run(self):
+    def restore_rider(self, num: int, wake: Event) -> Rider:
+        """Recreates an active rider from its state in the rider store.
+
+        Args:
+            num (int): rider number.
+            wake (Event): event the rider waits for in its current phase.
+
+        Returns:
+            Rider: the rider.
+        """
+        return self.rider_class(num, self.store, self.data.endpoint_sampler, self.data.geometry_sampler, self.data.travel_times,
+                                self.env, self.registry, self.collection, self.num_active_requests, self.streams,
+                                self.verbose, wake=wake)
+
+
+    def get_state(self) -> Dict:
+        return {'rider_number': self.rider_number, 'chunk_start': self.arrival_stream.chunk_start,
+                'arrivals': self.arrivals, 'next_arrival': self.next_arrival}
+
+
+    def set_state(self, state: Dict):
+        self.rider_number = state['rider_number']
+        self.arrival_stream.chunk_start = state['chunk_start']
+        self.arrivals = state['arrivals']
+        self.next_arrival = state['next_arrival']
+
+
+    def run(self, wake: Event=None):
+        """
+        Spawns riders at the pre-generated arrival times of the non-homogeneous Poisson process.
+        A process restored from a checkpoint waits for "wake" before the pending arrival.
+        """
         while True:
-            
-            # Determine minute, hour of day and weekday
-            minute = int(self.env.now % 60)   
-            hour = self.env.now / 60
-            hour_of_day = int(hour % 24)
-            weekday = int((self.env.now / 60 / 24) % 7)
-            
-            # Simulate Poission arrival
-            rate = self.arrival_df.loc[(weekday, hour_of_day, minute)] / 60
+            while self.next_arrival < len(self.arrivals):
+                arrival_time = self.arrivals[self.next_arrival]
+                yield self.env.timeout(arrival_time - self.env.now) if wake is None else wake
+                wake = None
+                self.next_arrival += 1
                 
-            t = random.expovariate(rate)
-            yield self.env.timeout(t)
-            
-            # Instantiate new rider pool
-            self.spawn_riders()
+                # Instantiate new rider pool
+                self.spawn_riders()
+
+            self.arrivals, self.next_arrival = self.arrival_stream.next_chunk(), 0
\ No newline at end of file
@@ -0,0 +1,289 @@
+import os
+import glob
+import heapq
+import hashlib
+import pickle
+import numpy as np
+from typing import Dict, Tuple
+from simpy.core import Environment
+from simpy.events import Event, Process, NORMAL
+from src.simulation.config import SimulationConfig
+from src.simulation.simulation_data import SimulationData
+from src.simulation.elements import Job, EntityStore
+from src.simulation.matcher import IncrementalMatcher
+
+CHECKPOINT_DIR = 'checkpoints'
+
+# Parameters which shape the market state of a warm-up
+WARMUP_PARAMS = ['uber_market_share', 'initial_drivers', 'max_driver_job_queue', 'dynamic_supply',
+                 'market_force_supply', 'debug', 'stall_drivers', 'batch_frequency', 'prioritize_wait_times',
+                 'solver_backend', 'candidate_max_travel_time', 'candidate_k_nearest',
+                 'warmup_time']
+
+def snapshot_file(config: SimulationConfig, data: SimulationData) -> str:
+    """Returns the warm-up snapshot of a run, keyed by start time, data version and market and matching parameters.
+
+    Args:
+        config (SimulationConfig): parameters of the run.
+        data (SimulationData): input data of the run.
+
+    Returns:
+        str: file of the snapshot.
+    """
+    market = hashlib.sha256(repr([getattr(config, name) for name in WARMUP_PARAMS]).encode()).hexdigest()[:8]
+    return os.path.join(config.warmup_dir, f'warmup_{config.initial_time:g}_{data.version}_{market}.pkl')
+
+
+def find_snapshot(config: SimulationConfig, data: SimulationData) -> Dict:
+    """Loads the warm-up snapshot of a run.
+
+    Args:
+        config (SimulationConfig): parameters of the run.
+        data (SimulationData): input data of the run.
+
+    Returns:
+        Dict: state of the snapshot or None if there is none.
+    """
+    if config.warmup_dir is None:
+        return None
+
+    file = snapshot_file(config, data)
+    if not os.path.exists(file):
+        print(f'No warm-up snapshot {file}, starting cold.')
+        return None
+
+    print(f'Starting from warm-up snapshot: {file}')
+    return load_checkpoint(file)
+
+
+def __pending_wake(process: Process, queued: Dict[int, Tuple[float, int]]) -> Tuple[float, int]:
+    """Follows a process through the processes it waits for to its scheduled event.
+
+    Returns:
+        Tuple[float, int]: time and event id of the scheduled event.
+    """
+    target = process.target
+    while isinstance(target, Process):
+        target = target.target
+
+    if id(target) not in queued:
+        raise RuntimeError(f'Process {process} does not wait for a scheduled event and cannot be checkpointed.')
+
+    return queued[id(target)]
+
+
+def __schedule_at(env: Environment, time: float) -> Event:
+    """Schedules an event at exactly "time", which may be infinite.
+    """
+    event = Event(env)
+    event._ok = True
+    event._value = None
+    heapq.heappush(env._queue, (time, NORMAL, next(env._eid), event))
+    return event
+
+
+def __job_state(job: Job) -> Tuple:
+    return None if job is None else (job.to_rider, job.to_dest, job.exp_completion)
+
+
+def __store_state(store: EntityStore) -> Dict:
+    columns = {name: store.column(name).copy() for name in store.fields if name != 'action'}
+    if 'jobs' in columns:
+        for num in range(len(store)):
+            jobs = columns['jobs'][num]
+            columns['jobs'][num] = None if jobs is None else [__job_state(job) for job in jobs]
+            columns['curr_job'][num] = __job_state(columns['curr_job'][num])
+
+    return {'size': len(store), 'columns': columns}
+
+
+def __restore_store(store: EntityStore, state: Dict, env: Environment):
+    if state['size'] > 0:
+        store.allocate(state['size'] - 1)
+
+    for name, column in state['columns'].items():
+        getattr(store, name)[:state['size']] = column
+
+    if 'jobs' in state['columns']:
+        for num in range(state['size']):
+            jobs = store.jobs[num]
+            store.jobs[num] = None if jobs is None else [Job.restore(env, *job) for job in jobs]
+            if store.curr_job[num] is not None:
+                store.curr_job[num] = Job.restore(env, *store.curr_job[num])
+
+
+def checkpoint_state(simulation) -> Dict:
+    """Captures the complete state of a running simulation.
+
+    Note:
+    SimPy processes cannot be pickled, so every live process is saved as the time and event id
+    of the timeout it waits for. Riders and drivers are saved as their rows in the entity stores,
+    which include the phase of their process, and all periodic processes as their explicit state.
+    Result tables are flushed up to the checkpoint, so rows written later can be discarded when
+    the run is resumed. The simulation must be stopped by "run", before any event of the current
+    time is processed.
+
+    Args:
+        simulation (Simulation): simulation stopped at the checkpoint time.
+
+    Returns:
+        Dict: picklable state.
+    """
+    assert simulation.config.engine == 'simpy', 'Only runs of the SimPy engine can be checkpointed.'
+    env = simulation.env
+    riders, drivers = simulation.rider_store, simulation.driver_store
+    queued = {id(event): (time, eid) for time, _, eid, event in env._queue}
+
+    # Event every process waits for, in scheduling order
+    waits = []
+    for name, process in simulation.processes.items():
+        # The incremental matcher waits for additions and is simply restarted
+        if name == 'matcher' and isinstance(simulation.matcher, IncrementalMatcher):
+            continue
+        waits.append((*__pending_wake(process, queued), 'process', name))
+
+    active_riders = np.flatnonzero(~(riders.column('cancelled') | riders.column('completed')))
+    for num in active_riders:
+        waits.append((*__pending_wake(riders.action[num], queued), 'rider', int(num)))
+
+    for num in sorted(drivers.active):
+        waits.append((*__pending_wake(drivers.action[num], queued), 'driver', num))
+
+    waits.sort(key=lambda wait: wait[1])
+
+    return {
+        'time': env.now,
+        'next_checkpoint': simulation.next_checkpoint,
+        'config': simulation.config,
+        'streams': simulation.streams,
+        'riders': __store_state(riders),
+        'drivers': __store_state(drivers),
+        'active_drivers': sorted(drivers.active),
+        'num_active_requests': simulation.num_active_requests[0],
+        'num_active_drivers': simulation.num_active_drivers[0],
+        'registry': simulation.registry.get_state(),
+        'rider_process': simulation.rider_process.get_state(),
+        'driver_process': simulation.driver_process.get_state(),
+        'analytics': simulation.da.get_state(),
+        'clock': None if simulation.clock is None else list(simulation.clock.data),
+        'clock_telemetry': None if simulation.clock is None else list(simulation.clock.telemetry),
+        'batches': simulation.matcher.batches,
+        'stream': simulation.stream.get_state(),
+        'waits': waits,
+    }
+
+
+def write_state(state: Dict, file: str):
+    """Pickles a state atomically, so an interrupted write never replaces an intact file.
+    """
+    with open(file + '.tmp', 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(file + '.tmp', file)
+
+
+def save_checkpoint(simulation) -> str:
+    """Writes the complete state of a running simulation to its run directory.
+
+    Note:
+    Only the latest checkpoint is kept.
+
+    Args:
+        simulation (Simulation): simulation stopped at the checkpoint time.
+
+    Returns:
+        str: file of the checkpoint.
+    """
+    state = checkpoint_state(simulation)
+
+    # Write atomically, then remove older checkpoints
+    path = os.path.join(simulation.run_dir, CHECKPOINT_DIR)
+    os.makedirs(path, exist_ok=True)
+    file = os.path.join(path, f'checkpoint_{simulation.next_checkpoint:05d}.pkl')
+    write_state(state, file)
+    for old in glob.glob(os.path.join(path, 'checkpoint_*.pkl')):
+        if old != file:
+            os.remove(old)
+
+    print(f'Saved checkpoint: {file}')
+    return file
+
+
+def latest_checkpoint(run_dir: str) -> str:
+    """Returns the latest checkpoint of a run.
+
+    Args:
+        run_dir (str): directory of the run.
+
+    Returns:
+        str: file of the checkpoint.
+    """
+    files = sorted(glob.glob(os.path.join(run_dir, CHECKPOINT_DIR, 'checkpoint_*.pkl')))
+    if len(files) == 0:
+        raise FileNotFoundError(f'No checkpoint found in {run_dir}.')
+
+    return files[-1]
+
+
+def load_checkpoint(file: str) -> Dict:
+    with open(file, 'rb') as f:
+        return pickle.load(f)
+
+
+def restore_checkpoint(simulation, state: Dict, results: bool=True):
+    """Restores the state of a checkpoint into a freshly built simulation.
+
+    Note:
+    The environment of the simulation must start at the checkpoint time. Riders, drivers and
+    periodic processes are recreated in the order of the events they waited for, so events at
+    the same time are processed in the same order as in the uninterrupted run.
+
+    Without "results", only the market is restored: riders, drivers, the registry and the
+    arrival processes. The matcher, solver, analytics, clock and result stream start afresh
+    with the config of the simulation and its results start at the checkpoint time, e.g. when
+    starting from a warm-up snapshot.
+
+    Args:
+        simulation (Simulation): simulation built without starting its processes.
+        state (Dict): state from "load_checkpoint".
+        results (bool, optional): whether to restore the results and all periodic processes. Defaults to True.
+    """
+    env = simulation.env
+    assert env.now == state['time'], 'Environment must start at the checkpoint time.'
+    assert simulation.boundary is None, 'Checkpoints are not supported in partitioned runs.'
+
+    __restore_store(simulation.rider_store, state['riders'], env)
+    __restore_store(simulation.driver_store, state['drivers'], env)
+    simulation.driver_store.active = set(state['active_drivers'])
+    simulation.num_active_requests[0] = state['num_active_requests']
+    simulation.num_active_drivers[0] = state['num_active_drivers']
+    simulation.rider_process.set_state(state['rider_process'])
+    simulation.driver_process.set_state(state['driver_process'])
+    if results:
+        simulation.next_checkpoint = state['next_checkpoint']
+        simulation.da.set_state(state['analytics'])
+        if simulation.clock is not None:
+            simulation.clock.data = state['clock']
+            simulation.clock.telemetry = state['clock_telemetry']
+            simulation.matcher.batches = state['batches']
+        simulation.stream.set_state(state['stream'])
+    else:
+        simulation.stream.exclude_history()
+
+    if isinstance(simulation.matcher, IncrementalMatcher) or not results:
+        simulation.start_process('matcher')
+
+    riders, drivers = {}, {}
+    for time, _, kind, key in state['waits']:
+        wake = __schedule_at(env, time)
+        if kind == 'rider':
+            riders[key] = simulation.rider_process.restore_rider(key, wake)
+        elif kind == 'driver':
+            drivers[key] = simulation.driver_process.restore_driver(key, wake)
+        elif results or (key in ['riders', 'drivers'] and key in simulation.periodic):
+            simulation.start_process(key, wake)
+
+    simulation.registry.set_state(state['registry'], drivers, riders)
+
+    for name in simulation.periodic:
+        if name not in simulation.processes:
+            simulation.start_process(name)
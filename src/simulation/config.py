@@ -0,0 +1,77 @@
+from dataclasses import dataclass, fields, replace
+from typing import Dict, Tuple, Union
+from src.simulation.params import *
+
+@dataclass(frozen=True)
+class SimulationConfig:
+    """Runtime configuration of one simulation run.
+
+    Note:
+    Defaults are the constants in params.py, so SimulationConfig() reproduces a run of
+    simulate.py. Scenario sweeps pass one config per run instead of editing module globals.
+    Data files, START_DATE and MIN_TRIP_TIME are shared by all runs and stay in params.py.
+    """
+    uber_market_share: float = UBER_MARKET_SHARE
+    initial_drivers: int = INITIAL_DRIVERS
+    initial_time: float = INITIAL_TIME
+    run_delta: float = RUN_DELTA
+    batch_frequency: float = BATCH_FREQUENCY
+    max_driver_job_queue: int = MAX_DRIVER_JOB_QUEUE
+    dynamic_supply: bool = DYNAMIC_SUPPLY
+    market_force_supply: bool = MARKET_FORCE_SUPPLY
+    prioritize_wait_times: bool = PRIORITIZE_WAIT_TIMES
+    solver_backend: str = SOLVER_BACKEND
+    candidate_max_travel_time: float = CANDIDATE_MAX_TRAVEL_TIME
+    candidate_k_nearest: int = CANDIDATE_K_NEAREST
+    seed: int = SEED
+    replication: int = REPLICATION
+    partitions: int = PARTITIONS
+    partition_sync_interval: float = PARTITION_SYNC_INTERVAL
+    engine: str = ENGINE
+    visualization_points: str = VISUALIZATION_POINTS
+    verbose: bool = VERBOSE
+    profile: bool = PROFILE
+    debug: bool = DEBUG
+    stall_drivers: bool = STALL_DRIVERS
+    clock_log_time: float = CLOCK_LOG_TIME
+    result_format: str = RESULT_FORMAT
+    result_chunk_size: int = RESULT_CHUNK_SIZE
+    result_flush_interval: float = RESULT_FLUSH_INTERVAL
+    checkpoint_interval: float = CHECKPOINT_INTERVAL
+    warmup_dir: str = WARMUP_DIR
+    warmup_window: float = WARMUP_WINDOW
+    warmup_tolerance: float = WARMUP_TOLERANCE
+    warmup_time: float = WARMUP_TIME
+
+    @classmethod
+    def from_overrides(cls, overrides: Dict[str, object]) -> 'SimulationConfig':
+        """Creates a config from the defaults and overridden parameters.
+
+        Args:
+            overrides (Dict[str, object]): parameter values keyed by field or params.py name,
+                                           e.g. 'batch_frequency' or 'BATCH_FREQUENCY'.
+
+        Returns:
+            SimulationConfig: the config.
+        """
+        return cls().replace(**overrides)
+
+    def replace(self, **overrides) -> 'SimulationConfig':
+        names = {field.name for field in fields(self)}
+        changes = {key.lower(): value for key, value in overrides.items()}
+        unknown = set(changes) - names
+        if unknown:
+            raise KeyError(f'Unknown simulation parameters: {sorted(unknown)}')
+
+        return replace(self, **changes)
+
+    @property
+    def spawn_key(self) -> Tuple[int, ...]:
+        """Returns the key of the random streams of the run below its root seed.
+        """
+        return () if self.replication is None else (self.replication,)
+
+    def to_dict(self) -> Dict[str, Union[str, int, float, bool, None]]:
+        """Returns all parameters keyed by their params.py names.
+        """
+        return {field.name.upper(): getattr(self, field.name) for field in fields(self)}
@@ -0,0 +1,175 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from datetime import datetime
+from functools import cached_property
+from typing import Dict
+from shapely import wkb
+from src.utils.travel_times import TravelTimeOracle
+from src.utils.endpoint_sampler import EndpointSampler
+
+BUNDLE_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+
+def sha256_checksum(path: str) -> str:
+    """Returns the SHA-256 checksum of a file.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def compile_bundle(data, output_dir: str) -> Dict:
+    """Compiles all datasets of a SimulationData context into a bundle of memory-mappable files.
+
+    Note:
+    Numeric tables are stored as one .npy file per index level and column, the travel time
+    oracle and the endpoint sampler as their compiled arrays and the TAZ geometries as WKB.
+    The manifest records the bundle version, the sources and the SHA-256 checksum of every file.
+
+    Args:
+        data (SimulationData): data context reading the source files.
+        output_dir (str): directory of the bundle.
+
+    Returns:
+        Dict: the manifest.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    files = []
+
+    def save(name: str, array: np.ndarray):
+        np.save(os.path.join(output_dir, name + '.npy'), np.ascontiguousarray(array), allow_pickle=False)
+        files.append(name + '.npy')
+
+    def save_frame(prefix: str, df: pd.DataFrame) -> Dict:
+        for level in df.index.names:
+            save(f'{prefix}.index.{level}', df.index.get_level_values(level).values)
+        for column in df.columns:
+            values = df[column].values
+            save(f'{prefix}.{column}', values.astype(str) if values.dtype == object else values)
+
+        return {'index': list(df.index.names), 'columns': list(df.columns)}
+
+    tables = {
+        'arrival': save_frame('arrival', data.arrival_df.to_frame()),
+        'driver': save_frame('driver', data.num_driver_df),
+        'geo': save_frame('geo', data.geo_df.drop('geometry', axis=1)),
+    }
+
+    for name, array in data.travel_times.to_arrays().items():
+        save(f'travel_times.{name}', array)
+
+    for name, array in data.endpoint_sampler.to_arrays().items():
+        save(f'endpoints.{name}', array)
+
+    # Geometries as concatenated WKB with offsets
+    geometries = [wkb.dumps(geometry) for geometry in data.geo_df['geometry'].values]
+    with open(os.path.join(output_dir, 'geo.geometry.wkb'), 'wb') as f:
+        f.write(b''.join(geometries))
+    files.append('geo.geometry.wkb')
+    save('geo.geometry.offsets', np.cumsum([0] + [len(g) for g in geometries]))
+
+    sources = {
+        'arrival': data.arrival_path,
+        'driver': data.driver_path,
+        'travel_times': data.travel_times_path,
+        'pickup_dropoff': data.pickup_dropoff_path,
+        'taz_geometry': data.taz_geometry_path,
+    }
+    manifest = {
+        'version': BUNDLE_VERSION,
+        'created': datetime.now().isoformat(),
+        'travel_time_fill': data.travel_time_fill,
+        'tables': tables,
+        'sources': {name: {'path': path, 'sha256': sha256_checksum(path)} for name, path in sources.items()},
+        'files': {name: {'sha256': sha256_checksum(os.path.join(output_dir, name))} for name in files},
+    }
+
+    with open(os.path.join(output_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=4)
+
+    return manifest
+
+
+class DataBundle(object):
+    def __init__(self, path: str, verify: bool=False):
+        """Memory-maps a bundle compiled by "compile_bundle".
+
+        Note:
+        Arrays are memory-mapped read-only, so parallel workers loading the same bundle share
+        the pages through the OS cache.
+
+        Args:
+            path (str): directory of the bundle.
+            verify (bool, optional): whether to check the checksums of all files. Defaults to False.
+        """
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+
+        if self.manifest['version'] != BUNDLE_VERSION:
+            raise ValueError(f'Data bundle version {self.manifest["version"]} is not supported, '
+                             f'recompile it with compile_data.py (version {BUNDLE_VERSION}).')
+
+        if verify:
+            self.verify()
+
+    def verify(self):
+        """Checks the checksums of all files in the bundle.
+        """
+        for name, info in self.manifest['files'].items():
+            if sha256_checksum(os.path.join(self.path, name)) != info['sha256']:
+                raise ValueError(f'Checksum mismatch of "{name}" in data bundle {self.path}')
+
+    def array(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, name + '.npy'), mmap_mode='r', allow_pickle=False)
+
+    def __frame(self, prefix: str) -> pd.DataFrame:
+        table = self.manifest['tables'][prefix]
+        levels = [self.array(f'{prefix}.index.{level}') for level in table['index']]
+        if len(levels) == 1:
+            index = pd.Index(levels[0], name=table['index'][0])
+        else:
+            index = pd.MultiIndex.from_arrays(levels, names=table['index'])
+
+        return pd.DataFrame({column: self.array(f'{prefix}.{column}') for column in table['columns']}, index=index)
+
+    @property
+    def travel_time_fill(self):
+        return self.manifest['travel_time_fill']
+
+    @cached_property
+    def arrival_df(self) -> pd.Series:
+        return self.__frame('arrival')['pickups']
+
+    @cached_property
+    def num_driver_df(self) -> pd.DataFrame:
+        return self.__frame('driver')
+
+    @cached_property
+    def travel_times(self) -> TravelTimeOracle:
+        names = ['taz_ids', 'mean', 'log_geo_mean', 'log_geo_std', 'num_missing']
+        return TravelTimeOracle.from_arrays({name: self.array(f'travel_times.{name}') for name in names},
+                                            fill=self.travel_time_fill)
+
+    @cached_property
+    def endpoint_sampler(self) -> EndpointSampler:
+        names = ['sizes', 'taz_ids', 'prob', 'alias']
+        return EndpointSampler.from_arrays({name: self.array(f'endpoints.{name}') for name in names})
+
+    @cached_property
+    def geo_df(self) -> pd.DataFrame:
+        geo_df = self.__frame('geo')
+        offsets = self.array('geo.geometry.offsets')
+        with open(os.path.join(self.path, 'geo.geometry.wkb'), 'rb') as f:
+            buffer = f.read()
+
+        geometries = [wkb.loads(buffer[start:end]) for start, end in zip(offsets[:-1], offsets[1:])]
+        geo_df['geometry'] = gpd.GeoSeries(geometries, index=geo_df.index)
+        return geo_df
@@ -1,4 +1,8 @@
 from .driver import Driver
 from .rider import Rider
 from .trip import Trip
-from .job import Job
\ No newline at end of file
+from .job import Job
+from .availability_registry import AvailabilityRegistry
+from .region_boundary import RegionBoundary, DriverHandoff
+from .entity_store import EntityStore, DriverStore, RiderStore
+from .state_machines import FastRider, FastDriver
\ No newline at end of file
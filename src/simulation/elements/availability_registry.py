@@ -0,0 +1,147 @@
+from collections import defaultdict
+from typing import Dict, List
+from simpy.core import Environment
+from simpy.events import Event
+
+class AvailabilityRegistry(object):
+    def __init__(self, env: Environment):
+        """Registry of all drivers and requests which are currently available for matching.
+
+        Note:
+        Drivers and riders push their own availability changes into the registry, so the
+        registry always holds the current pools and matchers never have to filter them.
+        Entities are keyed by their number, which makes adding and removing O(1). Drivers are
+        additionally bucketed by their anticipated TAZ and requests by their pickup TAZ.
+
+        Args:
+            env (Environment): simpy environment.
+        """
+        self.env = env
+        self.drivers = {}
+        self.requests = {}
+        self.drivers_by_taz = defaultdict(dict)
+        self.requests_by_taz = defaultdict(dict)
+
+        # TAZ each driver is bucketed under
+        self.__driver_taz = {}
+
+        # Wake-up of processes waiting for additions
+        self.__added = False
+        self.__waiting = None
+
+    @property
+    def available_drivers(self) -> List:
+        return list(self.drivers.values())
+
+    @property
+    def available_requests(self) -> List:
+        return list(self.requests.values())
+
+    def add_driver(self, driver):
+        """Adds a driver or moves it to the bucket of its current anticipated TAZ.
+
+        Args:
+            driver (Driver): driver which is available for jobs.
+        """
+        taz = driver.anticipated_pos
+        previous_taz = self.__driver_taz.get(driver.num)
+        if previous_taz is not None and previous_taz != taz:
+            self.__remove_from_bucket(self.drivers_by_taz, previous_taz, driver.num)
+
+        self.drivers[driver.num] = driver
+        self.drivers_by_taz[taz][driver.num] = driver
+        self.__driver_taz[driver.num] = taz
+        self.__notify()
+
+    def remove_driver(self, driver):
+        """Removes a driver if it is registered.
+
+        Args:
+            driver (Driver): driver which stopped accepting jobs.
+        """
+        if self.drivers.pop(driver.num, None) is not None:
+            taz = self.__driver_taz.pop(driver.num)
+            self.__remove_from_bucket(self.drivers_by_taz, taz, driver.num)
+
+    def add_request(self, rider):
+        """Adds the request of a rider.
+
+        Args:
+            rider (Rider): rider waiting for a match.
+        """
+        self.requests[rider.num] = rider
+        self.requests_by_taz[rider.pos][rider.num] = rider
+        self.__notify()
+
+    def remove_request(self, rider):
+        """Removes the request of a rider if it is registered.
+
+        Args:
+            rider (Rider): rider which got matched or cancelled.
+        """
+        if self.requests.pop(rider.num, None) is not None:
+            self.__remove_from_bucket(self.requests_by_taz, rider.pos, rider.num)
+
+    def get_state(self) -> Dict:
+        """Returns the numbers of all registered entities in registration order, e.g. for a checkpoint.
+        """
+        return {'drivers': list(self.drivers),
+                'requests': list(self.requests),
+                'drivers_by_taz': [(taz, list(bucket)) for taz, bucket in self.drivers_by_taz.items()],
+                'requests_by_taz': [(taz, list(bucket)) for taz, bucket in self.requests_by_taz.items()],
+                'driver_taz': list(self.__driver_taz.items()),
+                'added': self.__added}
+
+    def set_state(self, state: Dict, drivers: Dict, riders: Dict):
+        """Restores the registry from "get_state".
+
+        Note:
+        Entities are re-registered in their original order, so matchers see the pools in the
+        same order as in the uninterrupted run.
+
+        Args:
+            state (Dict): state of the registry.
+            drivers (Dict): restored drivers by number.
+            riders (Dict): restored riders by number.
+        """
+        self.drivers = {num: drivers[num] for num in state['drivers']}
+        self.requests = {num: riders[num] for num in state['requests']}
+        self.drivers_by_taz = defaultdict(dict, ((taz, {num: drivers[num] for num in bucket})
+                                                 for taz, bucket in state['drivers_by_taz']))
+        self.requests_by_taz = defaultdict(dict, ((taz, {num: riders[num] for num in bucket})
+                                                  for taz, bucket in state['requests_by_taz']))
+        self.__driver_taz = dict(state['driver_taz'])
+        self.__added = state['added']
+        self.__waiting = None
+
+    def wait_for_addition(self) -> Event:
+        """Returns an event which triggers once a driver or request is added.
+
+        Note:
+        Additions since the last call trigger the event immediately, so no addition is missed
+        while the waiting process is busy.
+
+        Returns:
+            Event: simpy event.
+        """
+        self.__waiting = self.env.event()
+        if self.__added:
+            self.__added = False
+            self.__waiting.succeed()
+
+        return self.__waiting
+
+    def __notify(self):
+        """Wakes up the waiting process or remembers the addition for the next wait.
+        """
+        if self.__waiting is None or self.__waiting.processed:
+            self.__added = True
+        elif not self.__waiting.triggered:
+            self.__waiting.succeed()
+
+    @staticmethod
+    def __remove_from_bucket(buckets: Dict, taz: int, num: int):
+        bucket = buckets[taz]
+        del bucket[num]
+        if len(bucket) == 0:
+            del buckets[taz]
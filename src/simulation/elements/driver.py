@@ -1,38 +1,98 @@
 from typing import List
 import numpy as np
 import pandas as pd
-import random
 import simpy
 from simpy.core import Environment
-from simpy.resources.store import FilterStore
+from simpy.events import Event
 from src.utils import cdate
-from src.simulation.params import INITIAL_TIME, MAX_DRIVER_JOB_QUEUE, DYNAMIC_SUPPLY, MARKET_FORCE_SUPPLY
-from src.utils.sampling import sample_point_in_geometry
+from src.simulation.config import SimulationConfig
+from src.utils.random_streams import RandomStreams
+from src.utils.endpoint_sampler import EndpointSampler
+from src.utils.geometry_sampler import GeometrySampler
+from .availability_registry import AvailabilityRegistry
+from .entity_store import DriverStore, column_property
+from .region_boundary import RegionBoundary
+
+# Phases of the drive process
+WAITING, TO_RIDER, ON_TRIP = range(3)
 
 class Driver(object):
-    def __init__(self, num: int, trip_endpoint_data: pd.DataFrame, geo_df: pd.DataFrame, num_driver_df: pd.DataFrame, env: Environment,
-                 driver_store: FilterStore, driver_collection: List, num_active_drivers: List, num_active_riders: List, verbose: bool=True):
+    __slots__ = ['num', 'store', 'env', 'registry', 'num_driver_df', 'num_active_drivers', 'num_active_riders',
+                 'config', 'streams', 'boundary', 'verbose']
+
+    # State stored in the columns of the driver store
+    start_pos = column_property('start_pos')
+    curr_pos = column_property('curr_pos')
+    oos_wait = column_property('oos_wait')
+    oos_drive = column_property('oos_drive')
+    trip_total = column_property('trip_total')
+    num_trips = column_property('num_trips')
+    online = column_property('online')
+    accepting_jobs = column_property('accepting_jobs')
+    ontrip = column_property('ontrip')
+    is_oos = column_property('is_oos')
+    will_head_home = column_property('will_head_home')
+    handed_off = column_property('handed_off')
+    start_time = column_property('start_time', optional=True)
+    patience = column_property('patience', optional=True)
+    num_jobs = column_property('num_jobs')
+    anticipated_pos = column_property('anticipated_pos')
+    last_coming_from = column_property('last_coming_from')
+    last_heading_to = column_property('last_heading_to')
+    phase = column_property('phase')
+    action = column_property('action')
+    jobs = column_property('jobs')
+    curr_job = column_property('curr_job')
+
+    def __init__(self, num: int, store: DriverStore, endpoint_sampler: EndpointSampler, geometry_sampler: GeometrySampler, num_driver_df: pd.DataFrame, env: Environment,
+                 registry: AvailabilityRegistry, driver_collection: List, num_active_drivers: List, num_active_riders: List,
+                 config: SimulationConfig, streams: RandomStreams, verbose: bool=True,
+                 boundary: RegionBoundary=None, start_pos: int=None, start_point=None, wake: Event=None):
         """Instantiates a driver element for the simulation.
 
+        Note:
+        The driver is a view on row "num" of the driver store, including its job queue. Only
+        references to the simulation are kept on the object itself, so a driver restored from
+        a checkpoint continues from its row and phase.
+
         Args:
             num (int): unique driver number
-            trip_endpoint_data (pd.DataFrame): dataframe to sample start location from
-            geo_df (pd.DataFrame): dataframe with geographic geometries to sample point within TAZ for visualization
+            store (DriverStore): columnar state of all drivers
+            endpoint_sampler (EndpointSampler): sampler of the start location
+            geometry_sampler (GeometrySampler): sampler of points within TAZs for visualization
             num_driver_df (pd.DataFrame): dataframe containing supply side data for uber drivers
             env (Environment): simpy environment
-            driver_store (FilterStore): container of all available drivers
+            registry (AvailabilityRegistry): registry of all available drivers
             driver_collection (List): list of all drivers
             num_active_drivers (List): list containing one number which is the current number of active drivers
             num_active_riders (List): list containing one number which is the current number of active riders
+            config (SimulationConfig): parameters of the run
+            streams (RandomStreams): random streams of the run
             verbose (bool, optional): verbose setting. Defaults to True.
+            boundary (RegionBoundary, optional): boundary of the simulated region. Defaults to None (whole city).
+            start_pos (int, optional): starting TAZ. Defaults to None (sampled from the dropoffs).
+            start_point (optional): starting point. Defaults to None (sampled within the starting TAZ).
+            wake (Event, optional): event a driver restored from a checkpoint waits for in its current phase.
+                                    Defaults to None (new driver).
         """
         self.num = num
+        self.store = store
         self.env = env
-        self.driver_store = driver_store
+        self.registry = registry
         self.num_driver_df = num_driver_df
         self.num_active_drivers = num_active_drivers
         self.num_active_riders = num_active_riders
+        self.config = config
+        self.streams = streams
+        self.boundary = boundary
         self.verbose = verbose
+
+        # Restored drivers continue their drive process from their phase in the store
+        if wake is not None:
+            self.action = self.start(wake)
+            return
+
+        store.allocate(num)
         
         # Determine hour of day and weekday
         hour = env.now / 60
@@ -40,14 +100,16 @@ class Driver(object):
         weekday = int((env.now / 60 / 24) % 7)
         
         # Sample starting position
-        probs = trip_endpoint_data.loc[(weekday, hour_of_day)]['dropoffs']
-        self.start_pos = np.random.choice(trip_endpoint_data.loc[(weekday, hour_of_day)]['MOVEMENT_ID_uber'], size=1, p=probs)[0]
+        if start_pos is None:
+            start_pos = endpoint_sampler.sample_dropoff(weekday, hour_of_day, rng=streams.endpoints)
+        self.start_pos = start_pos
         self.curr_pos = self.start_pos
+        self.anticipated_pos = self.start_pos
         
         # Variables to keep track off        
-        self.oos_wait = 0
-        self.oos_drive = 0
-        self.trip_total = 0
+        self.oos_wait = 0.
+        self.oos_drive = 0.
+        self.trip_total = 0.
         self.num_trips = 0
 
         # Status flags
@@ -62,19 +124,27 @@ class Driver(object):
         self.patience = None
 
         # Last known location
-        self.last_coming_from = sample_point_in_geometry(geo_df.loc[self.start_pos]['geometry'], 1)
+        if start_point is None:
+            start_point = geometry_sampler.sample_point(self.start_pos, streams.geometry)
+        self.last_coming_from = start_point
         self.last_heading_to = self.last_coming_from
         
         # Job queue
         self.jobs = []
         self.curr_job = None
         
-        # Save driver for analysis
-        driver_collection.append(self)
+        # Save driver for analysis (state is kept in the store regardless)
+        if driver_collection is not None:
+            driver_collection.append(self)
         
         # start the drive process when instance is created
-        self.action = env.process(self.drive())
+        self.action = self.start()
         
+    def start(self, wake: Event=None):
+        """Starts the drive process, which is interrupted once a waiting driver got a job.
+        """
+        return self.env.process(self.drive(wake))
+
     @property
     def available(self):
         return self.online and self.accepting_jobs and self.will_head_home == False
@@ -91,74 +161,78 @@ class Driver(object):
     def total_time_active(self):
         return self.oos_wait + self.oos_drive + self.trip_total
 
-    @property
-    def num_jobs(self):
-        n = len(self.jobs)
-        if self.curr_job is not None:
-            n += 1
-
-        return n
-
     @property
     def exp_time_to_availability(self):
-        if self.num_jobs == 0:
-            return 0
-
-        time_needed = np.sum([job.expected_time for job in self.jobs])
-        if self.curr_job is not None:
-            time_needed += self.curr_job.exp_time_to_completion
+        return self.store.exp_time_to_availability(self.num, self.env.now).item()
 
-        return time_needed
-
-    @property
-    def anticipated_pos(self):
-        if self.num_jobs == 0:
-            return self.curr_pos
-        elif self.curr_job is not None:
-            return self.curr_job.to_dest.taz
+    def sync_jobs(self):
+        """Writes the job queue summary read by the matchers to the driver store.
+        """
+        jobs, curr_job, store = self.jobs, self.curr_job, self.store
+        self.num_jobs = len(jobs) + (curr_job is not None)
+        store.queued_exp_time[self.num] = sum([job.expected_time for job in jobs]) # Queues are short, summed in order like np.sum
+        exp_completion = None if curr_job is None else curr_job.exp_completion
+        store.curr_exp_completion[self.num] = np.nan if exp_completion is None else exp_completion
+
+        if curr_job is not None:
+            self.anticipated_pos = curr_job.to_dest.taz
+        elif len(jobs) == 0:
+            self.anticipated_pos = self.curr_pos
         else:
-            return self.jobs[-1].to_dest.taz
+            self.anticipated_pos = jobs[-1].to_dest.taz
 
 
-    def drive(self):
+    def drive(self, wake: Event=None):
         """
         Driver starts servicing requests.
+
+        A driver restored from a checkpoint resumes its phase by waiting for "wake" instead.
         """
-        # Go online on app
-        self.go_online()
-        if self.env.now > INITIAL_TIME and self.verbose:
-            print(f'{cdate(self.env.now)}: Driver {self.num:5.0f} dispatched @ TAZ {self.start_pos}. Active drivers: {self.num_active_drivers[0]:,}')
+        if wake is None:
+            # Go online on app
+            self.go_online()
+            if self.env.now > self.config.initial_time and self.verbose:
+                print(f'{cdate(self.env.now)}: Driver {self.num:5.0f} dispatched @ TAZ {self.start_pos}. Active drivers: {self.num_active_drivers[0]:,}')
         
         while self.online:
             
-            # Signal not on trip with rider right now
-            self.is_oos = True
+            if wake is None:
+                # Signal not on trip with rider right now
+                self.is_oos = True
+                self.phase = WAITING if self.num_jobs == 0 else TO_RIDER
             
             # Wait for request if job queue is empty
-            if self.num_jobs == 0:
+            if self.phase == WAITING:
                 try:
-                    yield self.env.process(self.wait_for_request())
+                    yield self.env.process(self.wait_for_request(wake))
             
                 except simpy.Interrupt:
                     if self.verbose:
                         print(f'{cdate(self.env.now)}: Driver {self.num:5.0f} got request, waited for {self.oos_wait:2.2f} @ TAZ {self.curr_pos}')
+                wake = None
 
                 # Calculate the time spent waiting
                 wait_time = self.env.now - self.start_time
                 self.oos_wait += wait_time
+                self.phase = TO_RIDER
 
-
-            # Get job
-            self.curr_job = self.jobs.pop(0)
+            if self.phase == TO_RIDER:
+                if wake is None:
+                    # Get job
+                    self.curr_job = self.jobs.pop(0)
+                    self.sync_jobs()
             
-            # Drive to rider
-            yield self.env.process(self.oos_drive_to_rider(self.curr_job))
+                # Drive to rider
+                yield self.env.process(self.oos_drive_to_rider(self.curr_job, wake))
+                wake = None
+                self.phase = ON_TRIP
             
             # Complete trip
-            yield self.env.process(self.complete_trip(self.curr_job))
+            yield self.env.process(self.complete_trip(self.curr_job, wake))
+            wake = None
 
             # Decide if should head home
-            if DYNAMIC_SUPPLY or MARKET_FORCE_SUPPLY:
+            if self.config.dynamic_supply or self.config.market_force_supply:
                 self.should_head_home()
                 
             # Update accepting jobs
@@ -170,24 +244,35 @@ class Driver(object):
                 if self.verbose:
                     print(f'{cdate(self.env.now)}: Driver {self.num:5.0f} is heading home. Going offline. Active drivers: {self.num_active_drivers[0]:,}')
 
+            # Hand the driver over to the region its last trip ended in
+            elif self.num_jobs == 0 and self.boundary is not None and not self.boundary.contains(self.curr_pos):
+                self.boundary.hand_off(self)
+                if self.verbose:
+                    print(f'{cdate(self.env.now)}: Driver {self.num:5.0f} left the region @ TAZ {self.curr_pos}. Active drivers: {self.num_active_drivers[0]:,}')
+
     
     def update_accepting_jobs_status(self):
         """Updates whether driver can accept further jobs.
         """
         if self.will_head_home:
             self.accepting_jobs = False
+            self.registry.remove_driver(self)
             return
         
-        self.accepting_jobs = (self.num_jobs < MAX_DRIVER_JOB_QUEUE)
+        self.accepting_jobs = (self.num_jobs < self.config.max_driver_job_queue)
         if self.accepting_jobs:
-            self.driver_store.put((self.env.now, self))
+            self.registry.add_driver(self)
+        else:
+            self.registry.remove_driver(self)
 
 
     def go_offline(self):
         """Sets driver to offline.
         """
         self.online = False
+        self.store.active.discard(self.num)
         self.num_active_drivers[0] -= 1
+        self.registry.remove_driver(self)
 
     
     def go_online(self):
@@ -195,9 +280,10 @@ class Driver(object):
         """
         self.num_active_drivers[0] += 1
         self.online = True
+        self.store.active.add(self.num)
         
         # Signal availability
-        self.driver_store.put((self.env.now, self))
+        self.registry.add_driver(self)
 
     
     def should_head_home(self):
@@ -211,10 +297,10 @@ class Driver(object):
         hour = (self.env.now / 60)
         hour_of_day = int(hour % 24)
         minute = int(self.env.now % 60)
-        target_uber_supply = self.num_driver_df.loc[(hour_of_day, minute), 'n_drivers']
+        target_uber_supply = self.num_driver_df.at[(hour_of_day, minute), 'n_drivers']
 
         # Decide if to go home
-        if MARKET_FORCE_SUPPLY:
+        if self.config.market_force_supply:
             raise NotImplementedError() # TODO: Implement
             
             # ratio = self.num_active_drivers[0] / self.num_active_riders[0]
@@ -229,18 +315,25 @@ class Driver(object):
             #     return
 
         else:
-            surplus = self.num_active_drivers[0] - target_uber_supply
-            probability = min(1, surplus / (self.num_active_drivers[0] / 7.5)) # surplus should be gone within 8 minutes (1/7.5 hours)
+            num_active = self.num_active_drivers[0]
+            if self.boundary is not None:
+                num_active = self.boundary.active_drivers(target_uber_supply, num_active)
+            surplus = num_active - target_uber_supply
+            probability = min(1, surplus / (num_active / 7.5)) # surplus should be gone within 8 minutes (1/7.5 hours)
 
         # Head home if makes sense to do so
-        if random.random() < probability:  # self.num_trips > 0 and 
+        if self.streams.supply.random() < probability:  # self.num_trips > 0 and 
             self.will_head_home = True
 
 
-    def wait_for_request(self):
+    def wait_for_request(self, wake: Event=None):
         """
         Wait until a new request is received.
         """
+        if wake is not None:
+            yield wake
+            return
+
         # Wait until needed
         self.start_time = self.env.now
         if self.patience is None:
@@ -262,23 +355,26 @@ class Driver(object):
             job (Job): driving job to accept.
         """
         self.jobs.append(job)
+        self.sync_jobs()
         self.update_accepting_jobs_status()
         if self.verbose:
             print(f'{cdate(self.env.now)}: Driver {self.num:5.0f} accepted job # {self.num_jobs}: TAZ {job.to_rider.taz} -> TAZ {job.to_dest.taz}')
 
             
-    def oos_drive_to_rider(self, job):
+    def oos_drive_to_rider(self, job, wake: Event=None):
         """
         Out-of-service drive to pickup rider
         """
-        # Update headings
-        self.last_coming_from = self.last_heading_to
-        self.last_heading_to = job.to_rider.point
+        if wake is None:
+            # Update headings
+            self.last_coming_from = self.last_heading_to
+            self.last_heading_to = job.to_rider.point
 
-        # Drive
-        self.ontrip = True
-        job.start()
-        yield self.env.timeout(job.to_rider.time)
+            # Drive
+            self.ontrip = True
+            job.start()
+            self.sync_jobs()
+        yield self.env.timeout(job.to_rider.time) if wake is None else wake
 
         # Update flags and analytics
         self.curr_pos = job.to_rider.taz
@@ -288,20 +384,22 @@ class Driver(object):
             print(f'{cdate(self.env.now)}: Driver {self.num:5.0f} OOS-drive: TAZ {self.curr_pos} -> TAZ {job.to_rider.taz}')
 
     
-    def complete_trip(self, job):
+    def complete_trip(self, job, wake: Event=None):
         """
         Drive with passenger to location
         """
-        # Upodate headings
-        self.last_coming_from = self.last_heading_to
-        self.last_heading_to = job.to_dest.point
+        if wake is None:
+            # Upodate headings
+            self.last_coming_from = self.last_heading_to
+            self.last_heading_to = job.to_dest.point
 
         # Drive
-        yield self.env.timeout(job.to_dest.time)
+        yield self.env.timeout(job.to_dest.time) if wake is None else wake
 
         # Update flags and analytics
         self.curr_job = None
         self.curr_pos = job.to_dest.taz
+        self.sync_jobs()
         self.ontrip = False
         self.trip_total += job.to_dest.time
         self.num_trips += 1
@@ -0,0 +1,154 @@
+import numpy as np
+from typing import Dict, Tuple
+
+# Column name -> (dtype, value of unallocated entities)
+DRIVER_FIELDS = {
+    'start_pos': (np.int64, -1),
+    'curr_pos': (np.int64, -1),
+    'anticipated_pos': (np.int64, -1),
+    'oos_wait': (np.float64, 0.),
+    'oos_drive': (np.float64, 0.),
+    'trip_total': (np.float64, 0.),
+    'num_trips': (np.int64, 0),
+    'online': (np.bool_, False),
+    'accepting_jobs': (np.bool_, False),
+    'ontrip': (np.bool_, False),
+    'is_oos': (np.bool_, False),
+    'will_head_home': (np.bool_, False),
+    'handed_off': (np.bool_, False),
+    'excluded': (np.bool_, False),
+    'start_time': (np.float64, np.nan),
+    'patience': (np.float64, np.nan),
+    'num_jobs': (np.int64, 0),
+    'queued_exp_time': (np.float64, 0.),
+    'curr_exp_completion': (np.float64, np.nan),
+    'last_coming_from': (object, None),
+    'last_heading_to': (object, None),
+    'phase': (np.int64, -1),
+    'action': (object, None),
+    'jobs': (object, None),
+    'curr_job': (object, None),
+}
+
+RIDER_FIELDS = {
+    'pos': (np.int64, -1),
+    'des': (np.int64, -1),
+    'pos_point': (object, None),
+    'des_point': (object, None),
+    'matched_with_driver': (np.bool_, False),
+    'cancelled': (np.bool_, False),
+    'completed': (np.bool_, False),
+    'start_wait_time': (np.float64, np.nan),
+    'wait_time': (np.float64, 0.),
+    'driver_wait_time': (np.float64, 0.),
+    'ride_time': (np.float64, 0.),
+    'match_patience': (np.float64, np.nan),
+    'wait_patience': (np.float64, np.nan),
+    'phase': (np.int64, -1),
+    'action': (object, None),
+}
+
+class EntityStore(object):
+    def __init__(self, fields: Dict[str, Tuple[type, object]], capacity: int=1024):
+        """Structure-of-arrays storage of the state of all entities of one kind.
+
+        Note:
+        Every field is one NumPy column indexed by the entity number, so the state of all
+        entities can be read as array slices. Columns are reallocated with twice the capacity
+        when an entity number exceeds it, so entities must not hold on to column arrays.
+
+        Args:
+            fields (Dict[str, Tuple[type, object]]): dtype and initial value of every column.
+            capacity (int, optional): initial number of entities. Defaults to 1024.
+        """
+        self.fields = fields
+        self.capacity = capacity
+        self.size = 0
+        for name, (dtype, fill) in fields.items():
+            setattr(self, name, np.full(capacity, fill, dtype=dtype))
+
+    def __len__(self):
+        return self.size
+
+    def allocate(self, num: int):
+        """Reserves the rows of all entities up to number "num".
+
+        Args:
+            num (int): entity number.
+        """
+        if num >= self.capacity:
+            capacity = max(2 * self.capacity, num + 1)
+            for name, (dtype, fill) in self.fields.items():
+                column = np.full(capacity, fill, dtype=dtype)
+                column[:self.capacity] = getattr(self, name)
+                setattr(self, name, column)
+            self.capacity = capacity
+
+        self.size = max(self.size, num + 1)
+
+    def column(self, name: str) -> np.ndarray:
+        """Returns the values of all allocated entities.
+
+        Args:
+            name (str): field name.
+
+        Returns:
+            np.ndarray: view of the column.
+        """
+        return getattr(self, name)[:self.size]
+
+
+class DriverStore(EntityStore):
+    def __init__(self, capacity: int=1024):
+        super().__init__(DRIVER_FIELDS, capacity)
+
+        # Numbers of all online drivers, maintained by the drivers going online and offline
+        self.active = set()
+
+    def exp_time_to_availability(self, nums: np.ndarray, now: float) -> np.ndarray:
+        """Expected time until drivers have completed all their jobs.
+
+        Args:
+            nums (np.ndarray): driver numbers.
+            now (float): environment time.
+
+        Returns:
+            np.ndarray: expected times in minutes.
+        """
+        completion = self.curr_exp_completion[nums]
+        remaining = np.where(np.isnan(completion), 0., np.maximum(0., now - completion))
+        return self.queued_exp_time[nums] + remaining
+
+
+class RiderStore(EntityStore):
+    def __init__(self, capacity: int=1024):
+        super().__init__(RIDER_FIELDS, capacity)
+
+
+def column_property(name: str, optional: bool=False) -> property:
+    """Exposes a column of the entity store as an attribute of an entity view.
+
+    Args:
+        name (str): field name.
+        optional (bool, optional): whether the initial value of the column represents None. Defaults to False.
+
+    Returns:
+        property: attribute reading and writing the row of the entity.
+    """
+    def getter(self):
+        # "item" returns Python scalars of numeric columns without creating a NumPy scalar first
+        value = getattr(self.store, name).item(self.num)
+        if isinstance(value, np.generic):
+            value = value.item()
+        elif optional and (value != value or value == self.store.fields[name][1]):
+            return None
+
+        return value
+
+    def setter(self, value):
+        if optional and value is None:
+            value = self.store.fields[name][1]
+
+        getattr(self.store, name)[self.num] = value
+
+    return property(getter, setter)
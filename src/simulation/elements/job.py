@@ -2,27 +2,42 @@ from collections import namedtuple
 from simpy.core import Environment
 from .driver import Driver
 from src.utils import sample_random_trip_time
+from src.utils.travel_times import TravelTimeOracle
 
 TripLeg = namedtuple('TripLeg', 'taz point time exp_time')
 
 class Job(object):
-    def __init__(self, env: Environment, rider, driver: Driver):
+    def __init__(self, env: Environment, rider, driver: Driver, travel_times: TravelTimeOracle):
         self.env = env
         self.exp_completion = None
 
+        # Trip times are drawn from the trip time stream of the run
+        rng = driver.streams.trip_times
+
         # Calculate time needed for getting to rider
         hour_of_day = int((env.now / 60) % 24)
-        time_to_rider, exp_time_to_rider = sample_random_trip_time(hour_of_day, driver.curr_pos, \
-                                                                   rider.pos, get_expected=True)
+        time_to_rider, exp_time_to_rider = sample_random_trip_time(travel_times, hour_of_day, driver.curr_pos, \
+                                                                   rider.pos, get_expected=True, rng=rng)
         # Calculate time needed for trip (look ahead)
         hour_of_day_trip = int(((env.now + exp_time_to_rider) / 60) % 24)
-        time_to_destination, exp_to_destination = sample_random_trip_time(hour_of_day_trip, rider.pos, rider.des, \
-                                                                          is_trip=True, get_expected=True)
+        time_to_destination, exp_to_destination = sample_random_trip_time(travel_times, hour_of_day_trip, rider.pos, rider.des, \
+                                                                          is_trip=True, get_expected=True, rng=rng)
 
         self.to_rider = TripLeg(rider.pos, rider.pos_point, time_to_rider, exp_time_to_rider)
         self.to_dest = TripLeg(rider.des, rider.des_point, time_to_destination, exp_to_destination)
 
     
+    @classmethod
+    def restore(cls, env: Environment, to_rider: TripLeg, to_dest: TripLeg, exp_completion: float=None) -> 'Job':
+        """Recreates a job from its legs, e.g. from a checkpoint.
+        """
+        job = cls.__new__(cls)
+        job.env = env
+        job.to_rider = to_rider
+        job.to_dest = to_dest
+        job.exp_completion = exp_completion
+        return job
+
     @property
     def actual_time(self):
         return self.to_rider.time + self.to_dest.time
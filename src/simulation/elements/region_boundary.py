@@ -0,0 +1,67 @@
+import numpy as np
+from collections import namedtuple
+from typing import List
+
+# State of a driver which crossed into another region, carried over to its new region
+DriverHandoff = namedtuple('DriverHandoff', 'region time taz point oos_wait oos_drive trip_total num_trips')
+
+class RegionBoundary(object):
+    def __init__(self, region: int, region_of_taz: np.ndarray):
+        """Boundary of one region of a partitioned simulation.
+
+        Note:
+        Drivers whose trips end outside of the region are taken offline here and collected
+        as handoffs, which the coordinator delivers to the region they ended up in at the
+        end of the current synchronization window. Supply decisions compare the active drivers
+        of the whole city with its target, as in a single process: the coordinator sets
+        "supply_level", the ratio of both at the end of the last window, and the region acts
+        as if it had its target at that level. Otherwise regions which drivers flow into send
+        drivers home while the others dispatch new ones, and the city ends up oversupplied.
+
+        Args:
+            region (int): region number.
+            region_of_taz (np.ndarray): region number of every TAZ id (-1 for unknown TAZs).
+        """
+        self.region = region
+        self.region_of_taz = region_of_taz
+        self.num_handoffs = 0
+        self.supply_level = None
+        self.__outgoing = []
+
+    def contains(self, taz: int) -> bool:
+        return self.region_of_taz[taz] == self.region
+
+    def active_drivers(self, target: float, num_active: int) -> float:
+        """Number of active drivers supply decisions of the region are based on.
+
+        Args:
+            target (float): target number of active drivers of the region.
+            num_active (int): number of active drivers of the region.
+
+        Returns:
+            float: the target at the supply level of the city, or "num_active" before the first
+                   synchronization and while the region has no target.
+        """
+        if self.supply_level is None or target <= 0:
+            return num_active
+
+        return self.supply_level * target
+
+    def hand_off(self, driver):
+        """Takes a driver offline and records it for its new region.
+
+        Args:
+            driver (Driver): idle driver outside of the region.
+        """
+        driver.handed_off = True
+        driver.go_offline()
+        self.__outgoing.append(DriverHandoff(int(self.region_of_taz[driver.curr_pos]), driver.env.now, driver.curr_pos,
+                                             driver.last_heading_to, driver.oos_wait, driver.oos_drive,
+                                             driver.trip_total, driver.num_trips))
+        self.num_handoffs += 1
+
+    def take(self) -> List[DriverHandoff]:
+        """Returns and clears the handoffs since the last call.
+        """
+        outgoing, self.__outgoing = self.__outgoing, []
+        return outgoing
@@ -1,22 +1,57 @@
 from typing import List
-import numpy as np
-import pandas as pd
 import simpy
 from simpy.core import Environment
-from simpy.resources.store import FilterStore
-from src.utils import sample_point_in_geometry, sample_random_trip_time, cdate
+from simpy.events import Event
+from src.utils import sample_random_trip_time, cdate, EndpointSampler, GeometrySampler, TravelTimeOracle, RandomStreams
 from .job import Job
+from .availability_registry import AvailabilityRegistry
+from .entity_store import RiderStore, column_property
+
+# Phases of the request process
+REQUESTING, WAITING_FOR_PICKUP, RIDING = range(3)
 
 class Rider(object):
-    def __init__(self, num: int, trip_endpoint_data: pd.DataFrame, geo_df: pd.DataFrame, env: Environment,
-                 request_store: FilterStore, request_collection: List, num_active_requests: List, verbose: bool=True):
+    __slots__ = ['num', 'store', 'endpoint_sampler', 'geometry_sampler', 'travel_times', 'env', 'registry',
+                 'num_active_requests', 'streams', 'verbose']
+
+    # State stored in the columns of the rider store
+    pos = column_property('pos', optional=True)
+    pos_point = column_property('pos_point')
+    des = column_property('des', optional=True)
+    des_point = column_property('des_point')
+    matched_with_driver = column_property('matched_with_driver')
+    cancelled = column_property('cancelled')
+    completed = column_property('completed')
+    start_wait_time = column_property('start_wait_time', optional=True)
+    wait_time = column_property('wait_time')
+    driver_wait_time = column_property('driver_wait_time')
+    ride_time = column_property('ride_time')
+    match_patience = column_property('match_patience', optional=True)
+    wait_patience = column_property('wait_patience', optional=True)
+    phase = column_property('phase')
+    action = column_property('action')
+
+    def __init__(self, num: int, store: RiderStore, endpoint_sampler: EndpointSampler, geometry_sampler: GeometrySampler,
+                 travel_times: TravelTimeOracle, env: Environment,
+                 registry: AvailabilityRegistry, request_collection: List, num_active_requests: List,
+                 streams: RandomStreams, verbose: bool=True, wake: Event=None):
         self.num = num
-        self.trip_endpoint_data = trip_endpoint_data
-        self.geo_df = geo_df
+        self.store = store
+        self.endpoint_sampler = endpoint_sampler
+        self.geometry_sampler = geometry_sampler
+        self.travel_times = travel_times
         self.env = env
-        self.request_store = request_store
+        self.registry = registry
         self.num_active_requests = num_active_requests
+        self.streams = streams
         self.verbose = verbose
+
+        # Restored riders continue their request process from their phase in the store
+        if wake is not None:
+            self.action = self.start(wake)
+            return
+
+        store.allocate(num)
         
         # Variables to keep track off
         self.pos = None
@@ -26,14 +61,14 @@ class Rider(object):
         
         # Trip status
         self.matched_with_driver = False
-        self.__available = True
+        self.cancelled = False
         self.completed = False
         
         # Timing
         self.start_wait_time = None
-        self.wait_time = 0
-        self.driver_wait_time = 0
-        self.ride_time = 0
+        self.wait_time = 0.
+        self.driver_wait_time = 0.
+        self.ride_time = 0.
         
         # Determine patience (NONE for infinity)
         self.match_patience = 5
@@ -42,22 +77,24 @@ class Rider(object):
         # Initialize location
         self.initialize_location()
         
-        # Save request for analysis
-        request_collection.append(self)
+        # Save request for analysis (state is kept in the store regardless)
+        if request_collection is not None:
+            request_collection.append(self)
         
         # Start the request process when instance is created
-        self.action = env.process(self.request())
+        self.action = self.start()
         
+    def start(self, wake: Event=None):
+        """Starts the request process, which is interrupted once the rider got matched.
+        """
+        return self.env.process(self.request(wake))
+
     @property
     def available(self):
-        return self.__available and \
+        return self.cancelled == False and \
                self.matched_with_driver == False and \
                self.completed == False
         
-    @property
-    def cancelled(self):
-        return self.__available == False
-        
     @property
     def total_trip_time(self):
         return self.wait_time + self.driver_wait_time + self.ride_time
@@ -77,18 +114,17 @@ class Rider(object):
         # TODO: Given location, sample from TAZ s.t. average uber drive is 5.2 (or whatever) miles llong
         
         # Sample position
-        probs = self.trip_endpoint_data.loc[(weekday, hour_of_day)]['pickups']
-        self.pos = np.random.choice(self.trip_endpoint_data.loc[(weekday, hour_of_day)]['MOVEMENT_ID_uber'], size=1, p=probs)[0]
-        self.pos_point = sample_point_in_geometry(self.geo_df.loc[self.pos]['geometry'], 1)
+        self.pos = self.endpoint_sampler.sample_pickup(weekday, hour_of_day, rng=self.streams.endpoints)
+        self.pos_point = self.geometry_sampler.sample_point(self.pos, self.streams.geometry)
         
         # Sample destination - if < 1 minute, rather walk
-        probs = self.trip_endpoint_data.loc[(weekday, hour_of_day)]['dropoffs']
-        while self.des is None or sample_random_trip_time(hour_of_day, self.pos, self.des) < 1.:
-            self.des = np.random.choice(self.trip_endpoint_data.loc[(weekday, hour_of_day)]['MOVEMENT_ID_uber'], size=1, p=probs)[0]
-            self.des_point = sample_point_in_geometry(self.geo_df.loc[self.des]['geometry'], 1)
+        while self.des is None or sample_random_trip_time(self.travel_times, hour_of_day, self.pos, self.des,
+                                                          rng=self.streams.trip_times) < 1.:
+            self.des = self.endpoint_sampler.sample_dropoff(weekday, hour_of_day, rng=self.streams.endpoints)
+            self.des_point = self.geometry_sampler.sample_point(self.des, self.streams.geometry)
         
         
-    def request(self):
+    def request(self, wake: Event=None):
         """
         Rider pool requests a ride, given their randomly sampled position and destination.
         
@@ -97,40 +133,53 @@ class Rider(object):
             - Hour of Day
             - Geospatial pickup TAZ distribution
             - Geospatial dropoff TAZ destination
+
+        A rider restored from a checkpoint resumes its phase by waiting for "wake" instead.
         """
-        # Set status to active
-        self.num_active_requests[0] += 1
+        if wake is None:
+            # Set status to active
+            self.num_active_requests[0] += 1
 
-        # Wait for pickup
-        self.request_store.put((self.env.now, self))
-        if self.verbose:
-            print(f'{cdate(self.env.now)}: Rider {self.num:6.0f} requests: TAZ {self.pos} -> TAZ {self.des}')
-        
-        try:
-            yield self.env.process(self.wait_for_match())
-        except simpy.Interrupt:
-            pass
-        
-        self.wait_time = self.env.now - self.start_wait_time
-        if self.wait_time >= self.match_patience:
-            self.__available = False
-            self.num_active_requests[0] -= 1
+            # Wait for pickup
+            self.registry.add_request(self)
             if self.verbose:
-                print(f'{cdate(self.env.now)}: Rider {self.num:6.0f} waited too long for match -> cancelled')
-            return
-        
-        # Got matched with driver, waiting for driver arrival
-        self.matched_with_driver = True
-        if self.verbose:
-            print(f'{cdate(self.env.now)}: Rider {self.num:6.0f} got matched. Waited for {self.wait_time:2.2f} @ TAZ {self.pos}')
-        yield self.env.process(self.wait_for_pickup())
-        
-        # Driver arrived
-        if self.verbose:
-            print(f'{cdate(self.env.now)}: Rider {self.num:6.0f} starts trip. Waited for {self.driver_wait_time:2.2f} @ TAZ {self.pos}')
+                print(f'{cdate(self.env.now)}: Rider {self.num:6.0f} requests: TAZ {self.pos} -> TAZ {self.des}')
+            self.phase = REQUESTING
+
+        if self.phase == REQUESTING:
+            try:
+                yield self.env.process(self.wait_for_match(wake))
+            except simpy.Interrupt:
+                pass
+            wake = None
+
+            # No longer waiting for a match
+            self.registry.remove_request(self)
+            self.wait_time = self.env.now - self.start_wait_time
+            if self.wait_time >= self.match_patience:
+                self.cancelled = True
+                self.num_active_requests[0] -= 1
+                if self.verbose:
+                    print(f'{cdate(self.env.now)}: Rider {self.num:6.0f} waited too long for match -> cancelled')
+                return
+
+            # Got matched with driver, waiting for driver arrival
+            self.matched_with_driver = True
+            if self.verbose:
+                print(f'{cdate(self.env.now)}: Rider {self.num:6.0f} got matched. Waited for {self.wait_time:2.2f} @ TAZ {self.pos}')
+            self.phase = WAITING_FOR_PICKUP
+
+        if self.phase == WAITING_FOR_PICKUP:
+            yield self.env.process(self.wait_for_pickup(wake))
+            wake = None
+
+            # Driver arrived
+            if self.verbose:
+                print(f'{cdate(self.env.now)}: Rider {self.num:6.0f} starts trip. Waited for {self.driver_wait_time:2.2f} @ TAZ {self.pos}')
+            self.phase = RIDING
 
         # Complete trip
-        yield self.env.timeout(self.ride_time)
+        yield self.env.timeout(self.ride_time) if wake is None else wake
         self.completed = True
         self.num_active_requests[0] -= 1
         if self.verbose:
@@ -145,10 +194,14 @@ class Rider(object):
         self.ride_time = job.to_dest.time
 
         
-    def wait_for_match(self):
+    def wait_for_match(self, wake: Event=None):
         """
         Implements a wait process for driver match, optionally with a patience.
         """
+        if wake is not None:
+            yield wake
+            return
+
         self.start_wait_time = self.env.now
         if self.match_patience is None:
             yield self.env.timeout(simpy.core.Infinity)
@@ -156,16 +209,16 @@ class Rider(object):
             yield self.env.timeout(self.match_patience)
 
             
-    def wait_for_pickup(self):
+    def wait_for_pickup(self, wake: Event=None):
         """
         Implements a wait process for driver coming to rider, optionally with a patience.
         """
         #if self.wait_patience is not None and self.driver_wait_time > self.wait_patience:
         #    yield self.env.timeout(0.5) # wait 30 seconds and then decide to cancel
-        #    self.__available = False
+        #    self.cancelled = True
         #    if self.verbose:
         #        print(f'{cdate(self.env.now)}: Rider {self.num:5.0f} thinks wait time is too long -> cancelled')
         #    return
         #    # TODO: TELL DRIVER TO GET NEW REQUEST
         
-        yield self.env.timeout(self.driver_wait_time)
\ No newline at end of file
+        yield self.env.timeout(self.driver_wait_time) if wake is None else wake
\ No newline at end of file
@@ -0,0 +1,279 @@
+from simpy.events import Event, NORMAL, URGENT
+from src.utils import cdate
+from .rider import Rider, REQUESTING, WAITING_FOR_PICKUP, RIDING
+from .driver import Driver, WAITING, TO_RIDER, ON_TRIP
+
+# Record kinds of the rider state machine
+RIDER_START, RIDER_WAIT, RIDER_PATIENCE, RIDER_MATCH_END, RIDER_INTERRUPT, RIDER_PICKUP_START, RIDER_PICKUP, \
+    RIDER_PICKUP_END, RIDER_ARRIVE = range(9)
+
+# Record kinds of the driver state machine
+DRIVER_START, DRIVER_WAIT, DRIVER_PATIENCE, DRIVER_WAIT_END, DRIVER_INTERRUPT, DRIVER_DRIVE_START, DRIVER_PICKUP, \
+    DRIVER_PICKUP_END, DRIVER_TRIP_START, DRIVER_DROPOFF, DRIVER_DROPOFF_END = range(9, 20)
+
+class FastRider(Rider):
+    """Rider whose request process is a state machine driven by the records of an EventKernel.
+
+    Note:
+    Every handler is one step of "Rider.request" between two yields and schedules the record
+    of the next step with the priority and delay of the event SimPy would schedule, including
+    the zero-delay steps in which a subprocess ends. Riders are therefore processed in the same
+    order as with SimPy processes and produce the same results, as long as both are changed
+    together. "compare_engines" diffs the results of seeded runs of both engines. The rider is
+    its own action, so "Trip.perform" interrupts it like a process.
+    """
+    __slots__ = []
+
+    @classmethod
+    def register(cls, env, store):
+        """Registers the handlers of all rider records of "env" for the riders in "store".
+        """
+        for kind, handler in [(RIDER_START, cls.__on_start), (RIDER_WAIT, cls.__on_wait),
+                              (RIDER_PATIENCE, cls.__on_patience), (RIDER_MATCH_END, cls.__on_match_end),
+                              (RIDER_INTERRUPT, cls.__on_interrupt), (RIDER_PICKUP_START, cls.__on_pickup_start),
+                              (RIDER_PICKUP, cls.__on_pickup), (RIDER_PICKUP_END, cls.__on_pickup_end),
+                              (RIDER_ARRIVE, cls.__on_arrive)]:
+            env.register(kind, store, handler)
+
+    def start(self, wake: Event=None):
+        assert wake is None, 'Riders of the fast engine cannot be restored from checkpoints.'
+        self.env.schedule_record(RIDER_START, self.num, URGENT)
+        return self
+
+    def interrupt(self):
+        self.env.schedule_record(RIDER_INTERRUPT, self.num, URGENT)
+
+    @property
+    def waiting_for_match(self) -> bool:
+        return self.phase == REQUESTING and not self.cancelled
+
+    def __on_start(self):
+        # Set status to active
+        self.num_active_requests[0] += 1
+
+        # Wait for pickup
+        self.registry.add_request(self)
+        if self.verbose:
+            print(f'{cdate(self.env.now)}: Rider {self.num:6.0f} requests: TAZ {self.pos} -> TAZ {self.des}')
+        self.phase = REQUESTING
+        self.env.schedule_record(RIDER_WAIT, self.num, URGENT)
+
+    def __on_wait(self):
+        self.start_wait_time = self.env.now
+        if self.match_patience is not None:
+            self.env.schedule_record(RIDER_PATIENCE, self.num, NORMAL, self.match_patience)
+
+    def __on_patience(self):
+        # Outdated if the rider got matched in the meantime
+        if self.waiting_for_match:
+            self.env.schedule_record(RIDER_MATCH_END, self.num)
+
+    def __on_match_end(self):
+        if self.waiting_for_match:
+            self.__end_wait()
+
+    def __on_interrupt(self):
+        if self.waiting_for_match:
+            self.__end_wait()
+
+    def __end_wait(self):
+        # No longer waiting for a match
+        self.registry.remove_request(self)
+        self.wait_time = self.env.now - self.start_wait_time
+        if self.wait_time >= self.match_patience:
+            self.cancelled = True
+            self.num_active_requests[0] -= 1
+            if self.verbose:
+                print(f'{cdate(self.env.now)}: Rider {self.num:6.0f} waited too long for match -> cancelled')
+            return
+
+        # Got matched with driver, waiting for driver arrival
+        self.matched_with_driver = True
+        if self.verbose:
+            print(f'{cdate(self.env.now)}: Rider {self.num:6.0f} got matched. Waited for {self.wait_time:2.2f} @ TAZ {self.pos}')
+        self.phase = WAITING_FOR_PICKUP
+        self.env.schedule_record(RIDER_PICKUP_START, self.num, URGENT)
+
+    def __on_pickup_start(self):
+        self.env.schedule_record(RIDER_PICKUP, self.num, NORMAL, self.driver_wait_time)
+
+    def __on_pickup(self):
+        self.env.schedule_record(RIDER_PICKUP_END, self.num)
+
+    def __on_pickup_end(self):
+        # Driver arrived
+        if self.verbose:
+            print(f'{cdate(self.env.now)}: Rider {self.num:6.0f} starts trip. Waited for {self.driver_wait_time:2.2f} @ TAZ {self.pos}')
+        self.phase = RIDING
+        self.env.schedule_record(RIDER_ARRIVE, self.num, NORMAL, self.ride_time)
+
+    def __on_arrive(self):
+        # Complete trip
+        self.completed = True
+        self.num_active_requests[0] -= 1
+        if self.verbose:
+            print(f'{cdate(self.env.now)}: Rider {self.num:6.0f} arrived @ TAZ {self.des}')
+
+
+class FastDriver(Driver):
+    """Driver whose drive process is a state machine driven by the records of an EventKernel.
+
+    Note:
+    Every handler is one step of "Driver.drive" between two yields, see FastRider. A waiting
+    driver without patience has no record at all until it is interrupted.
+    """
+    __slots__ = []
+
+    @classmethod
+    def register(cls, env, store):
+        """Registers the handlers of all driver records of "env" for the drivers in "store".
+        """
+        for kind, handler in [(DRIVER_START, cls.__on_start), (DRIVER_WAIT, cls.__on_wait),
+                              (DRIVER_PATIENCE, cls.__on_patience), (DRIVER_WAIT_END, cls.__on_wait_end),
+                              (DRIVER_INTERRUPT, cls.__on_interrupt), (DRIVER_DRIVE_START, cls.__on_drive_start),
+                              (DRIVER_PICKUP, cls.__on_pickup), (DRIVER_PICKUP_END, cls.__on_pickup_end),
+                              (DRIVER_TRIP_START, cls.__on_trip_start), (DRIVER_DROPOFF, cls.__on_dropoff),
+                              (DRIVER_DROPOFF_END, cls.__on_dropoff_end)]:
+            env.register(kind, store, handler)
+
+    def start(self, wake: Event=None):
+        assert wake is None, 'Drivers of the fast engine cannot be restored from checkpoints.'
+        self.env.schedule_record(DRIVER_START, self.num, URGENT)
+        return self
+
+    def interrupt(self):
+        self.env.schedule_record(DRIVER_INTERRUPT, self.num, URGENT)
+
+    @property
+    def waiting(self) -> bool:
+        return self.online and self.phase == WAITING
+
+    def __on_start(self):
+        # Go online on app
+        self.go_online()
+        if self.env.now > self.config.initial_time and self.verbose:
+            print(f'{cdate(self.env.now)}: Driver {self.num:5.0f} dispatched @ TAZ {self.start_pos}. Active drivers: {self.num_active_drivers[0]:,}')
+        self.__next_job()
+
+    def __next_job(self):
+        if not self.online:
+            return
+
+        # Signal not on trip with rider right now
+        self.is_oos = True
+        self.phase = WAITING if self.num_jobs == 0 else TO_RIDER
+
+        # Wait for request if job queue is empty
+        if self.phase == WAITING:
+            self.env.schedule_record(DRIVER_WAIT, self.num, URGENT)
+        else:
+            self.__to_rider()
+
+    def __on_wait(self):
+        # Wait until needed
+        self.start_time = self.env.now
+        if self.patience is not None:
+            self.env.schedule_record(DRIVER_PATIENCE, self.num, NORMAL, self.patience)
+
+    def __on_patience(self):
+        # Outdated if the driver got a job or started another wait in the meantime
+        if self.waiting and self.env.now == self.start_time + self.patience:
+            self.env.schedule_record(DRIVER_WAIT_END, self.num)
+
+    def __on_wait_end(self):
+        if self.waiting:
+            self.__end_wait()
+
+    def __on_interrupt(self):
+        if self.waiting:
+            if self.verbose:
+                print(f'{cdate(self.env.now)}: Driver {self.num:5.0f} got request, waited for {self.oos_wait:2.2f} @ TAZ {self.curr_pos}')
+            self.__end_wait()
+
+    def __end_wait(self):
+        # Calculate the time spent waiting
+        wait_time = self.env.now - self.start_time
+        self.oos_wait += wait_time
+        self.phase = TO_RIDER
+        self.__to_rider()
+
+    def __to_rider(self):
+        # Get job
+        self.curr_job = self.jobs.pop(0)
+        self.sync_jobs()
+        self.env.schedule_record(DRIVER_DRIVE_START, self.num, URGENT)
+
+    def __on_drive_start(self):
+        job = self.curr_job
+
+        # Update headings
+        self.last_coming_from = self.last_heading_to
+        self.last_heading_to = job.to_rider.point
+
+        # Drive
+        self.ontrip = True
+        job.start()
+        self.sync_jobs()
+        self.env.schedule_record(DRIVER_PICKUP, self.num, NORMAL, job.to_rider.time)
+
+    def __on_pickup(self):
+        job = self.curr_job
+
+        # Update flags and analytics
+        self.curr_pos = job.to_rider.taz
+        self.oos_drive += job.to_rider.time
+        self.is_oos = False
+        if self.verbose:
+            print(f'{cdate(self.env.now)}: Driver {self.num:5.0f} OOS-drive: TAZ {self.curr_pos} -> TAZ {job.to_rider.taz}')
+        self.env.schedule_record(DRIVER_PICKUP_END, self.num)
+
+    def __on_pickup_end(self):
+        self.phase = ON_TRIP
+        self.env.schedule_record(DRIVER_TRIP_START, self.num, URGENT)
+
+    def __on_trip_start(self):
+        job = self.curr_job
+
+        # Upodate headings
+        self.last_coming_from = self.last_heading_to
+        self.last_heading_to = job.to_dest.point
+
+        # Drive
+        self.env.schedule_record(DRIVER_DROPOFF, self.num, NORMAL, job.to_dest.time)
+
+    def __on_dropoff(self):
+        job = self.curr_job
+
+        # Update flags and analytics
+        self.curr_job = None
+        self.curr_pos = job.to_dest.taz
+        self.sync_jobs()
+        self.ontrip = False
+        self.trip_total += job.to_dest.time
+        self.num_trips += 1
+
+        if self.verbose:
+            print(f'{cdate(self.env.now)}: Driver {self.num:5.0f} completed trip @ TAZ {job.to_dest.taz}')
+        self.env.schedule_record(DRIVER_DROPOFF_END, self.num)
+
+    def __on_dropoff_end(self):
+        # Decide if should head home
+        if self.config.dynamic_supply or self.config.market_force_supply:
+            self.should_head_home()
+
+        # Update accepting jobs
+        self.update_accepting_jobs_status()
+
+        # Go offline if necessary
+        if self.num_jobs == 0 and self.will_head_home:
+            self.go_offline()
+            if self.verbose:
+                print(f'{cdate(self.env.now)}: Driver {self.num:5.0f} is heading home. Going offline. Active drivers: {self.num_active_drivers[0]:,}')
+
+        # Hand the driver over to the region its last trip ended in
+        elif self.num_jobs == 0 and self.boundary is not None and not self.boundary.contains(self.curr_pos):
+            self.boundary.hand_off(self)
+            if self.verbose:
+                print(f'{cdate(self.env.now)}: Driver {self.num:5.0f} left the region @ TAZ {self.curr_pos}. Active drivers: {self.num_active_drivers[0]:,}')
+
+        self.__next_job()
@@ -4,9 +4,10 @@ from .driver import Driver
 from .rider import Rider
 from .job import Job
 from src.utils import cdate
+from src.utils.travel_times import TravelTimeOracle
 
 class Trip(object):
-    def __init__(self, env: Environment, rider: Rider, driver: Driver,
+    def __init__(self, env: Environment, rider: Rider, driver: Driver, travel_times: TravelTimeOracle,
                  trip_collection: List, verbose: bool=True):
         """
         Trip class which performs trips and saves information.
@@ -17,10 +18,11 @@ class Trip(object):
         self.verbose = verbose
 
         # Create job
-        self.job = Job(env, rider, driver)
+        self.job = Job(env, rider, driver, travel_times)
         
         # Save trip for analysis
-        trip_collection.append(self)
+        if trip_collection is not None:
+            trip_collection.append(self)
     
     @property
     def time_to_completion(self):
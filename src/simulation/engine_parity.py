@@ -0,0 +1,76 @@
+import os
+import pandas as pd
+from contextlib import redirect_stdout
+from typing import List
+from src.simulation.config import SimulationConfig
+from src.simulation.simulation_data import SimulationData
+from src.simulation.monitoring import create_new_run, read_result_table
+from src.simulation.runner import run_simulation
+from src.simulation.event_kernel import ENGINES
+
+# Tables which depend on the wall clock instead of the simulated market
+UNCOMPARED_TABLES = ['clock_telemetry']
+
+def __result_tables(run_dir: str) -> List[str]:
+    """Returns the names of all result tables of a run in either format.
+    """
+    tables = set()
+    for name in os.listdir(run_dir):
+        if name.endswith('.csv'):
+            tables.add(name[:-len('.csv')])
+        elif os.path.isdir(os.path.join(run_dir, name)):
+            tables.add(name)
+
+    return sorted(tables - set(UNCOMPARED_TABLES))
+
+
+def __metadata(run_dir: str) -> List[str]:
+    """Returns the lines of the metadata of a run except the engine.
+    """
+    with open(os.path.join(run_dir, 'metadata.txt')) as f:
+        return [line for line in f.read().splitlines() if not line.startswith('ENGINE:')]
+
+
+def compare_engines(config: SimulationConfig, data: SimulationData, output_dir: str=None) -> pd.DataFrame:
+    """Runs one seeded scenario with every engine and compares their results.
+
+    Note:
+    The 'fast' engine is experimental and only correct as long as it processes riders and
+    drivers in exactly the order of the SimPy processes, so all result tables and the metadata
+    (except the engine) must be identical. Every run writes its output to "log.txt" in its
+    directory below "output_dir".
+
+    Args:
+        config (SimulationConfig): parameters of the scenario, with a fixed seed.
+        data (SimulationData): input data of the scenario.
+        output_dir (str, optional): directory of the runs. Defaults to None (new timestamped directory in "runs").
+
+    Returns:
+        pd.DataFrame: rows of every table per engine and whether they equal the tables of the first engine.
+    """
+    assert config.seed is not None, 'Engines can only be compared with a fixed seed.'
+    output_dir = create_new_run(output_dir)
+    run_dirs = {}
+    for engine in ENGINES:
+        run_dir = os.path.join(output_dir, engine)
+        os.makedirs(run_dir, exist_ok=True)
+        engine_config = config.replace(engine=engine, checkpoint_interval=None, warmup_dir=None, partitions=None)
+        with open(os.path.join(run_dir, 'log.txt'), 'w') as f, redirect_stdout(f):
+            run_dirs[engine] = run_simulation(engine_config, data, run_dir)
+
+    reference, *others = ENGINES
+    rows = []
+    for table in __result_tables(run_dirs[reference]):
+        expected = read_result_table(run_dirs[reference], table)
+        for engine in others:
+            actual = read_result_table(run_dirs[engine], table)
+            rows.append({'table': table, 'engine': engine, 'rows': None if actual is None else len(actual),
+                         'reference_rows': len(expected), 'identical': actual is not None and actual.equals(expected)})
+
+    expected = __metadata(run_dirs[reference])
+    for engine in others:
+        actual = __metadata(run_dirs[engine])
+        rows.append({'table': 'metadata', 'engine': engine, 'rows': len(actual), 'reference_rows': len(expected),
+                     'identical': actual == expected})
+
+    return pd.DataFrame(rows)
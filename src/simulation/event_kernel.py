@@ -0,0 +1,80 @@
+from heapq import heappop, heappush
+from typing import Callable, Dict, Tuple
+from simpy.core import Environment
+from simpy.events import NORMAL
+
+ENGINES = ['simpy', 'fast']
+
+class CountingEnvironment(Environment):
+    def __init__(self, initial_time: float=0):
+        """SimPy environment which counts the events it processed.
+
+        Note:
+        The counter is incremented by "step", so it starts at zero for every environment,
+        including one restored from a checkpoint. Only differences of counts are meaningful.
+
+        Args:
+            initial_time (float, optional): simulated start time. Defaults to 0.
+        """
+        super().__init__(initial_time)
+        self.num_processed_events = 0
+
+    @property
+    def num_pending_events(self) -> int:
+        return len(self._queue)
+
+    def step(self):
+        # Counted first, as the event which stops "run" raises out of the step
+        self.num_processed_events += 1
+        super().step()
+
+
+class EventKernel(CountingEnvironment):
+    def __init__(self, initial_time: float=0):
+        """SimPy environment which also processes typed records of state machines.
+
+        Note:
+        A record is the tuple (kind, num) in place of an event in the heap of the environment,
+        so records and SimPy events share one clock, priorities and event ids and are processed
+        in the same order as the events of a process would be. A record is handled by calling
+        the handler registered for its kind with entity "num" of the registered store, without
+        creating events, generators or callbacks. Records cannot be cancelled, so handlers must
+        ignore records which are outdated by the time they are processed, and records of entities
+        whose action was released, e.g. once their records were exported, are dropped.
+        Processed records count as processed events.
+
+        Args:
+            initial_time (float, optional): simulated start time. Defaults to 0.
+        """
+        super().__init__(initial_time)
+        self.handlers: Dict[int, Tuple[object, Callable]] = {}
+
+    def register(self, kind: int, store, handler: Callable):
+        """Handles the records of "kind" by calling "handler" with the entity in the action column of "store".
+
+        Args:
+            kind (int): kind of the records.
+            store (EntityStore): store of the entities.
+            handler (Callable): function of an entity.
+        """
+        self.handlers[kind] = (store, handler)
+
+    def schedule_record(self, kind: int, num: int, priority: int=NORMAL, delay: float=0):
+        heappush(self._queue, (self._now + delay, priority, next(self._eid), (kind, num)))
+
+    def step(self):
+        """Processes all records up to the next event and the event itself.
+        """
+        queue = self._queue
+        handlers = self.handlers
+        records = 0
+        while queue and queue[0][3].__class__ is tuple:
+            self._now, _, _, (kind, num) = heappop(queue)
+            records += 1
+            store, handler = handlers[kind]
+            entity = store.action[num]
+            if entity is not None:
+                handler(entity)
+
+        self.num_processed_events += records
+        super().step()
@@ -2,6 +2,8 @@ from abc import ABC, abstractmethod
 from typing import List
 from simpy.core import Environment
 from src.simulation.algorithms import RideShareMatchingAlgorithm
+from src.simulation.elements import Trip
+from src.utils import cdate, span, PROFILER
 
 class Matcher(ABC):
     def __init__(self, env: Environment, algorithm: RideShareMatchingAlgorithm,
@@ -14,7 +16,33 @@ class Matcher(ABC):
         self.trip_collection = trip_collection
         self.verbose = verbose
 
+        # Sizes of the matching rounds (requests, drivers, matches), collected while a Clock drains them
+        self.batches = None
+
     @abstractmethod
     def perform_matching(self):
         pass
 
+    def match(self):
+        """Performs one matching round of all drivers and requests in the registry of the matcher.
+        """
+        with span('matching'):
+            # Get items and compute matches
+            requests, drivers = self.registry.available_requests, self.registry.available_drivers
+            PROFILER.count('requests', len(requests))
+            PROFILER.count('drivers', len(drivers))
+            matches = self.algorithm.create_matches(self.env.now, requests, drivers)
+            if self.verbose and len(self.algorithm.uncovered_requests) > 0:
+                print(f'{cdate(self.env.now)}: {len(self.algorithm.uncovered_requests)} requests without candidate drivers')
+
+            # Create trips with matches
+            with span('trip_creation'):
+                for match in matches:
+                    trip = Trip(self.env, match[0], match[1], self.algorithm.travel_times, self.trip_collection,
+                                self.verbose)
+                    trip.perform()
+            PROFILER.count('matches', len(matches))
+
+        if self.batches is not None:
+            self.batches.append((len(requests), len(drivers), len(matches)))
+
@@ -1,2 +1,4 @@
-from .monitoring import save_run
-from .driver_analytics import DriverAnalytics
\ No newline at end of file
+from .monitoring import save_run, create_new_run
+from .driver_analytics import DriverAnalytics
+from .result_writer import ResultWriter, read_result_table
+from .result_stream import ResultStream
\ No newline at end of file
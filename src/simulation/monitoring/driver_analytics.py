@@ -1,33 +1,97 @@
-from typing import List
+import numpy as np
+from typing import Dict
 from simpy.core import Environment
-from src.utils.formatting import cdate
+from simpy.events import Event
+from src.utils.profiling import profiled
+from src.simulation.elements import DriverStore
 
-KEPLER_STR = '%Y/%m/%d %H:%M:%S'
+# Snapshot column -> dtype
+SNAPSHOT_FIELDS = {
+    'time': np.float64,
+    'taz': np.int64,
+    'driver_id': np.int64,
+    'from_point': object,
+    'to_point': object,
+    'is_oos': np.bool_,
+    'ontrip': np.bool_,
+    'num_jobs': np.int64,
+}
 
 class DriverAnalytics(object):
-    def __init__(self, env: Environment, driver_collection: List):
+    def __init__(self, env: Environment, drivers: DriverStore, capacity: int=1 << 16):
+        """Periodically snapshots the state of all online drivers into column buffers.
+
+        Note:
+        Only the drivers in the active set of the driver store are read, as array slices, so
+        the cost of a snapshot depends on the number of online drivers only. Buffers are
+        reused after every "take" and doubled when full.
+
+        Args:
+            env (Environment): simpy environment.
+            drivers (DriverStore): columnar state of all drivers.
+            capacity (int, optional): initial number of buffered snapshot rows. Defaults to 65,536.
+        """
         self.env = env
-        self.driver_collection = driver_collection
-        self.analytics = []
+        self.drivers = drivers
+        self.size = 0
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in SNAPSHOT_FIELDS.items()}
+
+    def __len__(self):
+        return self.size
 
-    def analyse(self, period: int=5):
-        yield self.env.timeout(0.1) # Offset
+    def analyse(self, period: int=5, wake: Event=None):
+        if wake is None:
+            yield self.env.timeout(0.1) # Offset
         while True:
-            yield self.env.timeout(period)
+            yield self.env.timeout(period) if wake is None else wake
+            wake = None
             self.gather_driver_information()
-            
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        return {name: column[:self.size].copy() for name, column in self.columns.items()}
+
+    def set_state(self, state: Dict[str, np.ndarray]):
+        self.size = 0
+        self.__reserve(len(state['time']))
+        for name, column in state.items():
+            self.columns[name][:len(column)] = column
+        self.size = len(state['time'])
+
+    @profiled('analytics_snapshot')
     def gather_driver_information(self):
         """Generate snapshot of driver information.
         """
-        datetime = cdate(self.env.now, format_str=KEPLER_STR)
-        for driver in self.driver_collection:
-            if driver.offline:
-                continue
-
-            from_lon = driver.last_coming_from.coords.xy[0][0]
-            from_lat = driver.last_coming_from.coords.xy[1][0]
-            to_lon = driver.last_heading_to.coords.xy[0][0]
-            to_lat = driver.last_heading_to.coords.xy[1][0]
-
-            driver_data = [datetime, driver.curr_pos, driver.num, from_lon, from_lat, to_lon, to_lat, driver.is_oos, driver.ontrip, driver.num_jobs]
-            self.analytics.append(driver_data)
\ No newline at end of file
+        nums = np.sort(np.fromiter(self.drivers.active, dtype=np.int64, count=len(self.drivers.active)))
+        start, end = self.size, self.size + len(nums)
+        self.__reserve(end)
+
+        # Points are resolved to coordinates at export time
+        self.columns['time'][start:end] = self.env.now
+        self.columns['driver_id'][start:end] = nums
+        for name, field in [('taz', 'curr_pos'), ('from_point', 'last_coming_from'), ('to_point', 'last_heading_to'),
+                            ('is_oos', 'is_oos'), ('ontrip', 'ontrip'), ('num_jobs', 'num_jobs')]:
+            self.columns[name][start:end] = getattr(self.drivers, field)[nums]
+        self.size = end
+
+    def take(self) -> Dict[str, np.ndarray]:
+        """Returns all buffered snapshots and empties the buffers.
+
+        Returns:
+            Dict[str, np.ndarray]: snapshot columns.
+        """
+        snapshots = {name: column[:self.size].copy() for name, column in self.columns.items()}
+        self.columns['from_point'][:self.size] = None
+        self.columns['to_point'][:self.size] = None
+        self.size = 0
+        return snapshots
+
+    def __reserve(self, size: int):
+        capacity = len(self.columns['time'])
+        if size <= capacity:
+            return
+
+        capacity = max(2 * capacity, size)
+        for name, column in self.columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
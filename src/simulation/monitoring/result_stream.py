@@ -0,0 +1,117 @@
+import numpy as np
+from typing import Dict
+from simpy.core import Environment
+from simpy.events import Event
+from src.utils.clock import Clock
+from src.utils.profiling import profiled
+from src.utils.geometry_sampler import GeometrySampler
+from src.simulation.elements import DriverStore, RiderStore
+from .driver_analytics import DriverAnalytics
+from .result_writer import ResultWriter
+from .monitoring import extract_ride_information, extract_driver_snapshots, extract_driver_information, \
+                        save_clock_data, save_clock_telemetry
+
+class ResultStream(object):
+    def __init__(self, env: Environment, writer: ResultWriter, riders: RiderStore, drivers: DriverStore,
+                 da: DriverAnalytics=None, clock: Clock=None, geometry_sampler: GeometrySampler=None):
+        """Streams records to a result writer while the simulation runs.
+
+        Note:
+        Riders are written once they cancelled or completed their trip, and their points are
+        released from the rider store afterwards. Driver snapshots and clock rows are drained
+        from their gatherers, and every flush hands all buffered rows to the writer thread, so
+        every record reaches the disk within one flush interval, however few rows a table has.
+        Riders which are still active and the driver totals are written by "close".
+
+        Args:
+            env (Environment): simpy environment.
+            writer (ResultWriter): writer of the result tables.
+            riders (RiderStore): columnar state of all riders.
+            drivers (DriverStore): columnar state of all drivers.
+            da (DriverAnalytics, optional): driver snapshot gatherer. Defaults to None.
+            clock (Clock, optional): market thickness logger. Defaults to None.
+            geometry_sampler (GeometrySampler, optional): sampler resolving points to coordinates.
+                                                          Defaults to None (no coordinates).
+        """
+        self.env = env
+        self.writer = writer
+        self.riders = riders
+        self.drivers = drivers
+        self.da = da
+        self.clock = clock
+        self.geometry_sampler = geometry_sampler
+        self.__written = np.zeros(0, dtype=bool)
+
+    def run(self, interval: float, wake: Event=None):
+        while True:
+            yield self.env.timeout(interval) if wake is None else wake
+            wake = None
+            self.flush()
+
+    def get_state(self) -> Dict:
+        return {'written': self.__written, 'writer': self.writer.checkpoint()}
+
+    def set_state(self, state: Dict):
+        self.__written = state['written']
+        self.writer.restore(state['writer'])
+
+    def exclude_history(self):
+        """Starts the results at the current time, e.g. after restoring a warm-up snapshot.
+
+        Note:
+        Riders which already finished are never written, offline drivers are not reported and
+        the totals of online drivers restart at zero.
+        """
+        now = self.env.now
+        finished = self.riders.column('cancelled') | self.riders.column('completed')
+        self.__written = finished.copy()
+        self.riders.pos_point[:len(finished)][finished] = None
+        self.riders.des_point[:len(finished)][finished] = None
+
+        online = self.drivers.column('online')
+        self.drivers.column('excluded')[~online] = True
+        for name in ['oos_wait', 'oos_drive', 'trip_total', 'num_trips']:
+            self.drivers.column(name)[online] = 0
+        start_time = self.drivers.column('start_time')
+        start_time[online] = np.fmax(start_time[online], now)
+
+    @profiled('export')
+    def flush(self, final: bool=False):
+        """Hands all finished records to the writer.
+
+        Args:
+            final (bool, optional): whether to also write active riders. Defaults to False.
+        """
+        # Riders which cancelled or completed since the last flush
+        n = len(self.riders)
+        self.__written = np.concatenate([self.__written, np.zeros(n - len(self.__written), dtype=bool)])
+        finished = np.ones(n, dtype=bool) if final else \
+                   self.riders.column('cancelled') | self.riders.column('completed')
+        nums = np.flatnonzero(finished & ~self.__written)
+        if len(nums) > 0:
+            self.writer.write('ride_info', extract_ride_information(self.riders, self.geometry_sampler, nums))
+            self.__written[nums] = True
+            self.riders.pos_point[nums] = None
+            self.riders.des_point[nums] = None
+            self.riders.action[nums] = None
+
+        if self.da is not None and len(self.da) > 0:
+            self.writer.write('driver_snapshots', extract_driver_snapshots(self.da.take(), self.geometry_sampler))
+
+        if self.clock is not None and len(self.clock.data) > 0:
+            rows, self.clock.data = self.clock.data, []
+            self.writer.write('clock_info', save_clock_data(rows))
+
+        if self.clock is not None and len(self.clock.telemetry) > 0:
+            rows, self.clock.telemetry = self.clock.telemetry, []
+            self.writer.write('clock_telemetry', save_clock_telemetry(rows))
+
+        # Write partial chunks as well, the chunk size only caps the rows buffered in between
+        self.writer.flush()
+
+    def close(self):
+        """Writes all remaining records and the driver totals.
+        """
+        self.flush(final=True)
+        self.writer.write('driver_info', extract_driver_information(self.drivers))
+        self.writer.flush()
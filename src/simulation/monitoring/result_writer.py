@@ -0,0 +1,198 @@
+import os
+import glob
+import queue
+import threading
+import pandas as pd
+from typing import List, Dict
+
+RESULT_FORMATS = ['csv', 'parquet']
+
+def read_result_table(path: str, table: str, columns: List[str]=None) -> pd.DataFrame:
+    """Reads a result table of a finished run in either format.
+
+    Args:
+        path (str): directory of the run.
+        table (str): table name.
+        columns (List[str], optional): columns to read. Defaults to None (all columns).
+
+    Returns:
+        pd.DataFrame: the table or None if the run has no such table.
+    """
+    file = os.path.join(path, table + '.csv')
+    if os.path.exists(file):
+        return pd.read_csv(file, usecols=columns)
+
+    if os.path.isdir(os.path.join(path, table)):
+        return pd.read_parquet(os.path.join(path, table), columns=columns)
+
+    return None
+
+class ResultWriter(object):
+    def __init__(self, path: str, format: str='csv', chunk_size: int=100_000, max_queued_chunks: int=4):
+        """Writes result tables in fixed-size chunks from a background thread.
+
+        Note:
+        Rows are buffered per table until a chunk is full or "flush" is called, then handed to
+        the writer thread through a bounded queue, so the simulation only blocks if the disk
+        falls behind by more than "max_queued_chunks" chunks. Chunks therefore have at most
+        "chunk_size" rows. CSV tables are appended to "<table>.csv",
+        Parquet tables are written as "<table>/part-<n>.parquet" (requires pyarrow).
+
+        Args:
+            path (str): directory of the run.
+            format (str, optional): 'csv' or 'parquet'. Defaults to 'csv'.
+            chunk_size (int, optional): number of rows per chunk. Defaults to 100,000.
+            max_queued_chunks (int, optional): number of chunks waiting for the writer thread. Defaults to 4.
+        """
+        assert format in RESULT_FORMATS, f'Unknown result format "{format}", use one of {RESULT_FORMATS}.'
+        self.path = path
+        self.format = format
+        self.chunk_size = chunk_size
+        self.num_rows = {}
+        self.closed = False
+
+        self.__buffers = {}
+        self.__num_chunks = {}
+        self.__error = None
+        self.__queue = queue.Queue(maxsize=max_queued_chunks)
+        self.__thread = threading.Thread(target=self.__write_chunks, daemon=True)
+        self.__thread.start()
+
+    def write(self, table: str, df: pd.DataFrame):
+        """Appends rows to a table.
+
+        Args:
+            table (str): table name.
+            df (pd.DataFrame): rows with the same columns as all earlier rows of the table.
+        """
+        assert not self.closed, 'Result writer is closed.'
+        if df is None or df.empty:
+            return
+
+        buffer = self.__buffers.setdefault(table, [])
+        buffer.append(df)
+        self.num_rows[table] = self.num_rows.get(table, 0) + len(df)
+        if sum(len(part) for part in buffer) >= self.chunk_size:
+            self.flush(table)
+
+    def flush(self, table: str=None):
+        """Hands the buffered rows of a table, or of all tables, to the writer thread.
+
+        Args:
+            table (str, optional): table name. Defaults to None (all tables).
+        """
+        tables = list(self.__buffers) if table is None else [table]
+        for name in tables:
+            buffer = self.__buffers.pop(name, [])
+            if len(buffer) == 0:
+                continue
+
+            chunk = pd.concat(buffer, ignore_index=True)
+            number = self.__num_chunks.get(name, 0)
+            self.__num_chunks[name] = number + 1
+            self.__raise_error()
+            self.__queue.put((name, number, chunk))
+
+    def checkpoint(self) -> Dict:
+        """Writes all buffered rows and returns the position of every table, e.g. for a checkpoint.
+
+        Returns:
+            Dict: number of rows and chunks per table and the size of every CSV file.
+        """
+        self.flush()
+        self.__queue.join()
+        self.__raise_error()
+        sizes = {}
+        if self.format == 'csv':
+            sizes = {table: os.path.getsize(self.file(table)) for table in self.__num_chunks}
+
+        return {'num_rows': dict(self.num_rows), 'num_chunks': dict(self.__num_chunks), 'sizes': sizes}
+
+    def restore(self, state: Dict):
+        """Discards everything written after "checkpoint" and continues from there.
+
+        Args:
+            state (Dict): position of every table from "checkpoint".
+        """
+        assert len(self.__buffers) == 0 and len(self.__num_chunks) == 0, 'Results were written before restoring.'
+        if self.format == 'csv':
+            # Later chunks of tables without rows at the checkpoint are overwritten when written again
+            for table, size in state['sizes'].items():
+                with open(self.file(table), 'r+b') as file:
+                    file.truncate(size)
+        else:
+            for part in glob.glob(os.path.join(self.path, '*', 'part-*.parquet')):
+                table = os.path.basename(os.path.dirname(part))
+                if int(os.path.basename(part)[len('part-'):-len('.parquet')]) >= state['num_chunks'].get(table, 0):
+                    os.remove(part)
+
+        self.num_rows = dict(state['num_rows'])
+        self.__num_chunks = dict(state['num_chunks'])
+
+    def close(self):
+        """Flushes all tables and waits until the writer thread has written them.
+        """
+        if self.closed:
+            return
+
+        self.flush()
+        self.closed = True
+        self.__queue.put(None)
+        self.__thread.join()
+        self.__raise_error()
+
+    def file(self, table: str) -> str:
+        """Returns the file (CSV) or directory (Parquet) of a table.
+        """
+        if self.format == 'csv':
+            return os.path.join(self.path, table + '.csv')
+
+        return os.path.join(self.path, table)
+
+    def read(self, table: str, columns: List[str]=None) -> pd.DataFrame:
+        """Reads a table once the writer is closed.
+
+        Args:
+            table (str): table name.
+            columns (List[str], optional): columns to read. Defaults to None (all columns).
+
+        Returns:
+            pd.DataFrame: the table or None if no rows were written.
+        """
+        assert self.closed, 'Result writer must be closed before reading.'
+        if self.num_rows.get(table, 0) == 0:
+            return None
+
+        if self.format == 'csv':
+            return pd.read_csv(self.file(table), usecols=columns)
+
+        return pd.read_parquet(self.file(table), columns=columns)
+
+    def __write_chunks(self):
+        """Writes queued chunks until the writer is closed.
+        """
+        while True:
+            item = self.__queue.get()
+            if item is None:
+                self.__queue.task_done()
+                return
+
+            # Keep draining the queue after an error so the simulation never blocks
+            if self.__error is None:
+                table, number, chunk = item
+                try:
+                    if self.format == 'csv':
+                        chunk.to_csv(self.file(table), mode='w' if number == 0 else 'a', header=number == 0,
+                                     index=False)
+                    else:
+                        os.makedirs(self.file(table), exist_ok=True)
+                        chunk.to_parquet(os.path.join(self.file(table), f'part-{number:05d}.parquet'), index=False)
+                except Exception as e:
+                    self.__error = e
+
+            self.__queue.task_done()
+
+    def __raise_error(self):
+        if self.__error is not None:
+            raise RuntimeError(f'Writing results to {self.path} failed.') from self.__error
+
@@ -12,17 +12,36 @@ MAX_DRIVER_JOB_QUEUE = 2
 DYNAMIC_SUPPLY = True
 MARKET_FORCE_SUPPLY = False # TODO: Implement working DYNAMIC_SUPPLY = True mode
 PRIORITIZE_WAIT_TIMES = False
+SOLVER_BACKEND = 'hungarian' # Assignment solver: 'cvxpy', 'hungarian', 'jv' or 'auction'
+CANDIDATE_MAX_TRAVEL_TIME = None # Only match pairs within this many minutes (None for dense matching)
+CANDIDATE_K_NEAREST = None # Only match the k nearest drivers per rider (None for dense matching)
+TRAVEL_TIME_FILL = 'max' # Fill policy for TAZ pairs without travel times: 'max', 'mean' or seconds
+SEED = None # Root seed of the random streams of a run (None for fresh OS entropy, recorded in metadata)
+REPLICATION = None # Replication number, draws from an independent child of the SEED streams (None for the root streams)
+PARTITIONS = None # Number of regions simulated in parallel processes (None for a single process), biased if MAX_DRIVER_JOB_QUEUE > 1
+PARTITION_SYNC_INTERVAL = None # Minutes between driver handoffs of regions (None for BATCH_FREQUENCY, 1 if incremental)
+ENGINE = 'simpy' # Event engine: 'simpy' (a process per rider and driver) or 'fast' (experimental state machines on a typed event heap, see check_engines.py)
+VISUALIZATION_POINTS = 'lazy' # Points within TAZs for exports: 'eager', 'lazy' (sampled at export) or None (not exported)
 
 # Output control
-FUNCTION_TIMING = False
+PROFILE = False # Record spans of the hot paths and write profile.json to the run directory
 VERBOSE = False
 DEBUG = False
 STALL_DRIVERS = False
 CLOCK_LOG_TIME = 1
+RESULT_FORMAT = 'csv' # Streamed result tables: 'csv' or 'parquet' (requires pyarrow)
+RESULT_CHUNK_SIZE = 100_000 # Rows per chunk written by the background writer
+RESULT_FLUSH_INTERVAL = 60 # Minutes between handing finished records to the writer
+CHECKPOINT_INTERVAL = None # Simulated minutes between checkpoints of the complete state (None for no checkpoints)
+WARMUP_DIR = None # Directory of warm-up snapshots runs start from, created with warmup.py (None for cold starts)
+WARMUP_WINDOW = 30 # Minutes of driver/rider ratios which must be stable for a steady state
+WARMUP_TOLERANCE = 0.05 # Maximum coefficient of variation of the ratio within the window
+WARMUP_TIME = 240 # Simulated minutes of a warm-up, which ends at INITIAL_TIME
 
 # Files
 ARRIVAL_PATH = '/Users/lukashaas/Documents/Stanford/4 Senior/3 Spring/MS&E 230/Project/Code/data/processed_rider_arrival_rates.csv'
 DRIVER_PATH = '/Users/lukashaas/Documents/Stanford/4 Senior/3 Spring/MS&E 230/Project/Code/data/processed_driver_arrivals.csv'
 TRAVEL_TIMES_PATH = '/Users/lukashaas/Documents/Stanford/4 Senior/3 Spring/MS&E 230/Project/Code/data/processed_uber_time_data.csv'
 PICKUP_DROPOFF_PATH = '/Users/lukashaas/Documents/Stanford/4 Senior/3 Spring/MS&E 230/Project/Code/data/processed_pickups_dropoffs.csv'
-TAZ_GEOMETRY_PATH = '/Users/lukashaas/Documents/Stanford/4 Senior/3 Spring/MS&E 230/Project/Code/data/processed_taz_geometries.csv'
\ No newline at end of file
+TAZ_GEOMETRY_PATH = '/Users/lukashaas/Documents/Stanford/4 Senior/3 Spring/MS&E 230/Project/Code/data/processed_taz_geometries.csv'
+DATA_BUNDLE_PATH = None # Bundle compiled with compile_data.py, loaded instead of the files above if set
\ No newline at end of file
@@ -0,0 +1,322 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import multiprocessing
+from time import time
+from functools import cached_property
+from contextlib import redirect_stdout
+from typing import List
+from src.utils import RandomStreams, EndpointSampler
+from src.simulation.config import SimulationConfig
+from src.simulation.simulation_data import SimulationData
+from src.simulation.data_bundle import compile_bundle
+from src.simulation.elements import RegionBoundary
+from src.simulation.monitoring import save_run, create_new_run, ResultWriter, read_result_table
+from src.simulation.runner import Simulation, create_algorithm
+from src.simulation.replications import replication_metrics, REPLICATION_METRICS
+
+def partition_tazs(geo_df: pd.DataFrame, weights: np.ndarray, num_regions: int) -> np.ndarray:
+    """Splits the TAZs into compact regions of equal demand by recursive coordinate bisection.
+
+    Note:
+    The TAZs are repeatedly cut along the longer side of their bounding box at the weighted
+    median of their centroids. Compact regions keep most trips within one region, so few
+    drivers have to be handed off.
+
+    Args:
+        geo_df (pd.DataFrame): TAZ geometries indexed by TAZ id.
+        weights (np.ndarray): demand of every TAZ id.
+        num_regions (int): number of regions.
+
+    Returns:
+        np.ndarray: region number of every TAZ id (-1 for unknown TAZs).
+    """
+    taz_ids = geo_df.index.values.astype(np.int64)
+    assert 1 <= num_regions <= len(taz_ids), f'Cannot split {len(taz_ids)} TAZs into {num_regions} regions.'
+    centroids = np.array([(geometry.centroid.x, geometry.centroid.y) for geometry in geo_df['geometry'].values])
+
+    region_of_taz = np.full(max(taz_ids.max(), len(weights) - 1) + 1, -1, dtype=np.int64)
+    weights = np.append(weights, np.zeros(len(region_of_taz) - len(weights)))[taz_ids] + 1e-12 # Split TAZs without demand by count
+
+    parts = [(np.arange(len(taz_ids)), num_regions, 0)]
+    while parts:
+        rows, n, first_region = parts.pop()
+        if n == 1:
+            region_of_taz[taz_ids[rows]] = first_region
+            continue
+
+        n_left = n // 2
+        axis = np.argmax(np.ptp(centroids[rows], axis=0))
+        rows = rows[np.argsort(centroids[rows, axis], kind='stable')]
+        cumulative = np.cumsum(weights[rows])
+        split = np.searchsorted(cumulative, cumulative[-1] * n_left / n) + 1
+        split = min(max(split, n_left), len(rows) - (n - n_left))
+        parts.append((rows[:split], n_left, first_region))
+        parts.append((rows[split:], n - n_left, first_region + n_left))
+
+    return region_of_taz
+
+
+class RegionData(object):
+    def __init__(self, data: SimulationData, region: int, region_of_taz: np.ndarray):
+        """Input data of one region of a partitioned simulation.
+
+        Note:
+        Riders only request pickups within the region and drivers only start within it. Both
+        the rider arrival rates and the driver supply are scaled by the share of pickups within
+        the region, per (weekday, hour) for riders and per hour for drivers. Travel times and
+        geometries are shared with the whole city.
+
+        Args:
+            data (SimulationData): input data of the whole city.
+            region (int): region number.
+            region_of_taz (np.ndarray): region number of every TAZ id.
+        """
+        self.data = data
+        self.region = region
+        self.taz_ids = np.flatnonzero(region_of_taz == region)
+
+        # Share of all pickups within the region per (weekday, hour)
+        sampler = data.endpoint_sampler
+        inside = np.isin(sampler.taz_ids, self.taz_ids)
+        self.share = (sampler.probabilities('pickups') * inside).sum(axis=1).reshape(7, 24)
+
+    @property
+    def travel_times(self):
+        return self.data.travel_times
+
+    @property
+    def geo_df(self) -> pd.DataFrame:
+        return self.data.geo_df
+
+    @property
+    def geometry_sampler(self):
+        return self.data.geometry_sampler
+
+    @cached_property
+    def arrival_df(self) -> pd.Series:
+        arrival_df = self.data.arrival_df
+        weekdays = arrival_df.index.get_level_values('day_of_week').values.astype(np.int64)
+        hours = arrival_df.index.get_level_values('hour').values.astype(np.int64)
+        return arrival_df * self.share[weekdays, hours]
+
+    @cached_property
+    def num_driver_df(self) -> pd.DataFrame:
+        num_driver_df = self.data.num_driver_df
+        hours = num_driver_df.index.get_level_values('hour').values.astype(np.int64)
+        return num_driver_df.mul(self.share.mean(axis=0)[hours], axis=0)
+
+    @cached_property
+    def endpoint_sampler(self) -> EndpointSampler:
+        return self.data.endpoint_sampler.restrict('pickups', self.taz_ids)
+
+    @cached_property
+    def driver_endpoint_sampler(self) -> EndpointSampler:
+        return self.data.endpoint_sampler.restrict('dropoffs', self.taz_ids)
+
+
+def run_region(region: int, region_of_taz: np.ndarray, config: SimulationConfig, bundle_path: str,
+               run_dir: str, connection):
+    """Simulates one region in a worker process, one synchronization window at a time.
+
+    Note:
+    The coordinator sends the end of the next window together with the drivers handed off
+    to the region and the supply level of the city, and receives the drivers which left the
+    region during the window together with the active and target drivers of the region. The
+    output of the region is written to "log.txt" in its run directory.
+
+    Args:
+        region (int): region number.
+        region_of_taz (np.ndarray): region number of every TAZ id.
+        config (SimulationConfig): parameters of the run, with a fixed seed.
+        bundle_path (str): compiled data bundle.
+        run_dir (str): directory of the results of the region.
+        connection (Connection): pipe to the coordinator.
+    """
+    data = RegionData(SimulationData(bundle_path=bundle_path, lazy_points=config.visualization_points != 'eager'),
+                      region, region_of_taz)
+    boundary = RegionBoundary(region, region_of_taz)
+    streams = RandomStreams(config.seed, spawn_key=config.spawn_key + (region,))
+    os.makedirs(run_dir, exist_ok=True)
+    with open(os.path.join(run_dir, 'log.txt'), 'w') as f, redirect_stdout(f):
+        simulation = Simulation(config, data, run_dir, streams, boundary)
+        busy = 0.
+        while True:
+            message = connection.recv()
+            if message is None:
+                break
+
+            until, handoffs, boundary.supply_level = message
+            start = time()
+            simulation.driver_process.receive_drivers(handoffs)
+            simulation.run(until)
+            busy += time() - start
+            connection.send((boundary.take(), simulation.num_active_drivers[0], simulation.driver_process.target_supply))
+
+        simulation.close(aggregate=False)
+
+    connection.send({'region': region, 'tazs': len(data.taz_ids), 'pickup_share': data.share.mean(),
+                     'riders': len(simulation.rider_store), 'drivers': len(simulation.driver_store),
+                     'handoffs': boundary.num_handoffs, 'busy_time': busy})
+
+
+def merge_regions(region_dirs: List[str], num_drivers: List[int], writer: ResultWriter):
+    """Merges the result tables of all regions into the tables of one run.
+
+    Note:
+    Driver ids are made unique by offsetting them with the number of drivers of the
+    preceding regions. A driver keeps its totals but gets a new id when handed off.
+
+    Args:
+        region_dirs (List[str]): directories of the regions.
+        num_drivers (List[int]): number of drivers of every region.
+        writer (ResultWriter): writer of the merged tables.
+    """
+    offset = 0
+    clock_dfs = []
+    for region_dir, num in zip(region_dirs, num_drivers):
+        for table in ['ride_info', 'driver_info']:
+            writer.write(table, read_result_table(region_dir, table))
+
+        snapshot_df = read_result_table(region_dir, 'driver_snapshots')
+        if snapshot_df is not None:
+            snapshot_df['driver_id'] += offset
+            writer.write('driver_snapshots', snapshot_df)
+
+        offset += num
+        clock_dfs.append(read_result_table(region_dir, 'clock_info'))
+
+    # Market thickness of the whole city
+    clock_dfs = [df for df in clock_dfs if df is not None]
+    if len(clock_dfs) > 0:
+        clock_df = pd.concat(clock_dfs).groupby('time', sort=False)[['drivers', 'riders_and_requests']].sum()
+        clock_df['ratio'] = 100 * clock_df['drivers'] / clock_df['riders_and_requests'].where(clock_df['riders_and_requests'] > 0)
+        writer.write('clock_info', clock_df.reset_index())
+
+
+def run_partitioned(config: SimulationConfig, data: SimulationData, run_dir: str=None) -> str:
+    """Runs one simulation split into "config.partitions" regions, each in its own process.
+
+    Note:
+    Synchronization is conservative and windowed: all regions simulate the same window of
+    "config.partition_sync_interval" minutes (by default one batch) independently, then the
+    drivers whose trips ended in another region are handed over and rejoin the market there
+    at the start of the next window. Drivers are dispatched and sent home by the supply level
+    of the whole city, synchronized every window. Riders are only matched with drivers of their
+    pickup region. The regions' tables are merged into one run, and the regions' sizes, handoffs
+    and busy times are written to "partition.json".
+
+    Partitioned runs are biased when drivers queue jobs (MAX_DRIVER_JOB_QUEUE > 1): riders are
+    matched with drivers who are still on a trip far less often than in a single process, so
+    mean driver wait times are markedly shorter and more rides are completed at a higher
+    utilization. Without job queues, both agree closely. Check a scenario against a single
+    process with "compare_runs" before relying on its results.
+
+    Args:
+        config (SimulationConfig): parameters of the run.
+        data (SimulationData): input data of the whole city.
+        run_dir (str, optional): directory of the results. Defaults to None (new timestamped directory in "runs").
+
+    Returns:
+        str: directory of the results.
+    """
+    start = time()
+    run_dir = create_new_run(run_dir)
+
+    # Workers memory-map the input data from a bundle
+    if data.bundle is None:
+        print('Compiling data bundle ...')
+        compile_bundle(data, os.path.join(run_dir, 'data'))
+        data = SimulationData(bundle_path=os.path.join(run_dir, 'data'), lazy_points=data.lazy_points)
+
+    # All regions derive their random streams from the same root seed
+    config = config.replace(seed=np.random.SeedSequence(config.seed).entropy)
+    sync_interval = config.partition_sync_interval
+    if sync_interval is None:
+        sync_interval = config.batch_frequency if config.batch_frequency is not None else 1.
+
+    # Regions of equal demand
+    sampler = data.endpoint_sampler
+    demand = np.bincount(sampler.taz_ids.ravel(), weights=sampler.probabilities('pickups').ravel())
+    region_of_taz = partition_tazs(data.geo_df, demand, config.partitions)
+
+    # One worker process per region
+    region_dirs = [os.path.join(run_dir, 'regions', f'region_{region}') for region in range(config.partitions)]
+    connections, workers = [], []
+    for region, region_dir in enumerate(region_dirs):
+        connection, worker_connection = multiprocessing.Pipe()
+        worker = multiprocessing.Process(target=run_region, args=(region, region_of_taz, config, data.bundle.path,
+                                                                  region_dir, worker_connection))
+        worker.start()
+        worker_connection.close() # Only the worker holds its end, so a failed worker closes the pipe
+        connections.append(connection)
+        workers.append(worker)
+
+    print(f'Simulating {config.partitions} regions in windows of {sync_interval:.3f} minutes.')
+    print('=' * 80)
+    now, end = config.initial_time, config.initial_time + config.run_delta
+    inboxes = [[] for _ in region_dirs]
+    supply_level = None
+    num_windows = 0
+    regions = []
+    try:
+        while now < end:
+            now = min(now + sync_interval, end)
+            for connection, inbox in zip(connections, inboxes):
+                connection.send((now, inbox, supply_level))
+
+            inboxes = [[] for _ in region_dirs]
+            num_active, target = 0, 0.
+            for connection in connections:
+                handoffs, region_active, region_target = connection.recv()
+                for handoff in handoffs:
+                    inboxes[handoff.region].append(handoff)
+                num_active += region_active + len(handoffs) # Handed off drivers rejoin at the start of the next window
+                target += region_target
+            supply_level = num_active / target if target > 0 else None
+            num_windows += 1
+
+        for connection, worker in zip(connections, workers):
+            connection.send(None)
+            regions.append(connection.recv())
+            worker.join()
+
+    except (EOFError, BrokenPipeError) as e:
+        for worker in workers:
+            worker.terminate()
+        raise RuntimeError(f'A region failed at {now:.2f}, see the log.txt files in {os.path.dirname(region_dirs[0])}.') from e
+
+    # Merge the regions into one run
+    print('=' * 80)
+    writer = ResultWriter(run_dir, config.result_format, config.result_chunk_size)
+    merge_regions(region_dirs, [region['drivers'] for region in regions], writer)
+    save_run(run_dir, writer, data.geo_df, create_algorithm(config, data), config)
+
+    with open(os.path.join(run_dir, 'partition.json'), 'w') as f:
+        json.dump({'regions': regions, 'sync_interval': sync_interval, 'windows': num_windows,
+                   'wall_time': time() - start}, f, indent=4)
+    print('=' * 80)
+    return run_dir
+
+
+def compare_runs(run_dir: str, reference_dir: str) -> pd.DataFrame:
+    """Compares the output metrics of a partitioned run with a single-process reference run.
+
+    Note:
+    Besides match wait times, the driver wait times and completed shares reveal the bias of
+    partitioned runs, see "run_partitioned".
+
+    Args:
+        run_dir (str): directory of the partitioned run.
+        reference_dir (str): directory of the reference run.
+
+    Returns:
+        pd.DataFrame: value of every metric in both runs and their relative difference.
+    """
+    partitioned, reference = replication_metrics(run_dir), replication_metrics(reference_dir)
+    comparison = pd.DataFrame({'metric': REPLICATION_METRICS,
+                               'partitioned': [partitioned[metric] for metric in REPLICATION_METRICS],
+                               'reference': [reference[metric] for metric in REPLICATION_METRICS]})
+    comparison['relative_difference'] = (comparison['partitioned'] - comparison['reference']) / comparison['reference']
+    return comparison
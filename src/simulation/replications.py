@@ -0,0 +1,101 @@
+import os
+import numpy as np
+import pandas as pd
+from scipy import stats
+from typing import Dict, Tuple
+from src.simulation.monitoring import read_result_table
+from src.simulation.sweep import run_sweep, scenario_name
+
+REPLICATION_METRICS = ['match_wait_time', 'driver_wait_time', 'cancellation_share', 'completed_share',
+                       'driver_utilization']
+
+def replication_metrics(run_dir: str) -> Dict[str, float]:
+    """Computes the output metrics of one finished run.
+
+    Args:
+        run_dir (str): directory of the run.
+
+    Returns:
+        Dict[str, float]: mean match wait time of riders and mean wait for the driver of completed
+                          rides (minutes), shares of cancelled and completed riders and driver
+                          utilization (share of active time driving passengers).
+    """
+    rides = read_result_table(run_dir, 'ride_info', ['cancelled', 'completed', 'match_wait_time', 'driver_wait_time'])
+    drivers = read_result_table(run_dir, 'driver_info', ['service_drive', 'total_time_active'])
+
+    metrics = dict.fromkeys(REPLICATION_METRICS, np.nan)
+    if rides is not None and len(rides) > 0:
+        metrics['match_wait_time'] = rides['match_wait_time'].mean()
+        metrics['driver_wait_time'] = rides.loc[rides['completed'].astype(bool), 'driver_wait_time'].mean()
+        metrics['cancellation_share'] = rides['cancelled'].astype(bool).mean()
+        metrics['completed_share'] = rides['completed'].astype(bool).mean()
+
+    if drivers is not None and drivers['total_time_active'].sum() > 0:
+        metrics['driver_utilization'] = drivers['service_drive'].sum() / drivers['total_time_active'].sum()
+
+    return metrics
+
+
+def summarize_replications(replications: pd.DataFrame, confidence: float=0.95) -> pd.DataFrame:
+    """Computes means and t-based confidence intervals of the metrics across replications.
+
+    Args:
+        replications (pd.DataFrame): one row of metrics per replication.
+        confidence (float, optional): confidence level of the intervals. Defaults to 0.95.
+
+    Returns:
+        pd.DataFrame: mean, standard deviation, half width and bounds of the interval per metric.
+    """
+    rows = []
+    for metric in REPLICATION_METRICS:
+        values = replications[metric].dropna().values
+        n = len(values)
+        mean = values.mean() if n > 0 else np.nan
+        std = values.std(ddof=1) if n > 1 else np.nan
+        half_width = stats.t.ppf(0.5 + confidence / 2, n - 1) * std / np.sqrt(n) if n > 1 else np.nan
+        rows.append({'metric': metric, 'n': n, 'mean': mean, 'std': std, 'half_width': half_width,
+                     'lower': mean - half_width, 'upper': mean + half_width})
+
+    return pd.DataFrame(rows)
+
+
+def run_replications(overrides: Dict[str, object], num_replications: int, seed: int=0, workers: int=None,
+                     bundle_path: str=None, output_dir: str=None,
+                     confidence: float=0.95) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Runs independent replications of one scenario in parallel and summarizes them.
+
+    Note:
+    All replications share the root seed and replication i draws from its child streams with
+    spawn key (i,), the way regions of a partitioned run do. Unlike consecutive integer seeds,
+    spawned children cannot overlap, so the replications are independent and each one is
+    reproducible from the root seed and its number. The per-replication metrics and their
+    summary are written to "replications.csv" and "summary.csv" in the output directory.
+
+    Args:
+        overrides (Dict[str, object]): overridden parameters of the scenario (without SEED and REPLICATION).
+        num_replications (int): number of replications.
+        seed (int, optional): root seed of all replications. Defaults to 0.
+        workers (int, optional): number of worker processes. Defaults to None (number of CPUs).
+        bundle_path (str, optional): compiled data bundle. Defaults to None (compiled by run_sweep).
+        output_dir (str, optional): directory of the replications. Defaults to None (new timestamped directory in "runs").
+        confidence (float, optional): confidence level of the intervals. Defaults to 0.95.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: metrics per replication and their summary.
+    """
+    assert not {'SEED', 'REPLICATION'} & {key.upper() for key in overrides}, 'Seeds are set per replication.'
+    scenarios = [dict(overrides, SEED=seed, REPLICATION=i) for i in range(num_replications)]
+    run_dirs = run_sweep(scenarios, workers, bundle_path, output_dir)
+
+    rows = []
+    for i, scenario in enumerate(scenarios):
+        run_dir = run_dirs[scenario_name(scenario)]
+        rows.append(dict(seed=seed, replication=i, run_dir=run_dir, **replication_metrics(run_dir)))
+
+    replications = pd.DataFrame(rows)
+    summary = summarize_replications(replications, confidence)
+
+    output_dir = os.path.dirname(run_dirs[scenario_name(scenarios[0])])
+    replications.to_csv(os.path.join(output_dir, 'replications.csv'), index=False)
+    summary.to_csv(os.path.join(output_dir, 'summary.csv'), index=False)
+    return replications, summary
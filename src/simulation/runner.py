@@ -0,0 +1,284 @@
+import os
+import numpy as np
+from typing import Dict
+from simpy.events import Event
+from src.utils import Clock, RandomStreams, PROFILER, span
+from src.simulation.config import SimulationConfig
+from src.simulation.simulation_data import SimulationData
+from src.simulation.event_kernel import CountingEnvironment, EventKernel, ENGINES
+from src.simulation.algorithms import ShortestDistance, PrioritizeWaitTimes, CandidateGenerator, \
+                                      RideShareMatchingAlgorithm
+from src.simulation.matcher import IncrementalMatcher, BatchMatcher
+from src.simulation.arrivals import RiderProcess, DriverProcess
+from src.simulation.elements import AvailabilityRegistry, DriverStore, RiderStore, RegionBoundary
+from src.simulation.monitoring import save_run, create_new_run, DriverAnalytics, ResultWriter, ResultStream
+from src.simulation.checkpoint import save_checkpoint, restore_checkpoint, latest_checkpoint, load_checkpoint, \
+                                      find_snapshot
+
+def create_algorithm(config: SimulationConfig, data: SimulationData) -> RideShareMatchingAlgorithm:
+    """Instantiates the matching algorithm of a run.
+    """
+    candidates = None
+    if config.candidate_max_travel_time is not None or config.candidate_k_nearest is not None:
+        candidates = CandidateGenerator(data.travel_times, config.candidate_max_travel_time,
+                                        config.candidate_k_nearest)
+
+    if config.prioritize_wait_times:
+        return PrioritizeWaitTimes(travel_times=data.travel_times, solver_backend=config.solver_backend,
+                                   candidates=candidates)
+
+    return ShortestDistance(travel_times=data.travel_times, solver_backend=config.solver_backend,
+                            candidates=candidates)
+
+
+class Simulation(object):
+    def __init__(self, config: SimulationConfig, data: SimulationData, run_dir: str=None,
+                 streams: RandomStreams=None, boundary: RegionBoundary=None, checkpoint: Dict=None,
+                 snapshot: Dict=None):
+        """Sets up all processes of one simulation run.
+
+        Note:
+        The simulation can be advanced in steps with "run", e.g. to exchange drivers with
+        neighbouring regions in between. Records are streamed to the run directory while
+        it runs and the run is finalized by "close". With "config.checkpoint_interval", the
+        complete state is saved periodically and the run can be continued with "resume".
+        A run started from a warm-up snapshot begins with its market instead of an empty one,
+        the snapshot must end at "config.initial_time". With "config.profile", the spans of
+        the hot paths are recorded and written to "profile.json" by "close". With
+        "config.engine" 'fast' (experimental), riders and drivers are state machines of an
+        EventKernel instead of SimPy processes, which must give the same results, see check_engines.py.
+
+        Args:
+            config (SimulationConfig): parameters of the run.
+            data (SimulationData): input data of the run.
+            run_dir (str, optional): directory of the results. Defaults to None (new timestamped directory in "runs").
+            streams (RandomStreams, optional): random streams of the run. Defaults to None (derived from config.seed and config.replication).
+            boundary (RegionBoundary, optional): boundary of the simulated region. Defaults to None (whole city).
+            checkpoint (Dict, optional): state to continue from instead of starting the run. Defaults to None.
+            snapshot (Dict, optional): warm-up snapshot to start the market from. Defaults to None (cold start).
+        """
+        if config.checkpoint_interval is not None:
+            assert config.checkpoint_interval >= 1, 'Checkpoints must be at least one simulated minute apart.'
+            assert boundary is None, 'Checkpoints are not supported in partitioned runs.'
+        assert config.engine in ENGINES, f'Unknown engine "{config.engine}", choose one of {ENGINES}.'
+        if config.engine == 'fast':
+            assert config.checkpoint_interval is None and checkpoint is None and snapshot is None, \
+                'Checkpoints and warm-up snapshots are not supported by the fast engine.'
+            print('The fast engine is experimental, verify scenarios against SimPy with check_engines.py.')
+
+        # Analysis Containers (records are streamed to the run directory instead)
+        request_collection = None
+        driver_collection = None
+        trip_collection = None
+
+        if snapshot is not None:
+            assert snapshot['time'] == config.initial_time, \
+                f'Warm-up snapshot ends at {snapshot["time"]:g} instead of the start of the run {config.initial_time:g}, create it again.'
+
+        self.config = config
+        self.data = data
+        self.boundary = boundary
+        self.next_checkpoint = 0
+
+        # Independent random streams of the run, all derived from its seed
+        self.streams = RandomStreams(config.seed, config.spawn_key) if streams is None else streams
+        print(f'Random seed: {self.streams.seed}')
+
+        # Columnar state of all riders and drivers
+        self.rider_store = RiderStore()
+        self.driver_store = DriverStore()
+
+        # Creates a SimPy Environment, which also processes the records of the state machines of the fast engine
+        # and counts the processed events for the clock
+        environment = EventKernel if config.engine == 'fast' else CountingEnvironment
+        self.env = env = environment(initial_time=config.initial_time if checkpoint is None else checkpoint['time'])
+
+        # Measure hot paths by simulated hour
+        if config.profile:
+            PROFILER.enable(env)
+
+        # Create registry for available drivers and riders
+        self.registry = AvailabilityRegistry(env)
+
+        # Instantiate matching algorithm
+        self.algorithm = create_algorithm(config, data)
+
+        # Determine matching interval
+        if config.batch_frequency is None:
+            #algorithm = GreedyMatcher(uber_data=travel_time_df, distance_based=False)
+            self.matcher = IncrementalMatcher(env, self.algorithm, self.registry, trip_collection, config.verbose)
+        else:
+            self.matcher = BatchMatcher(env, self.algorithm, config.batch_frequency, self.registry, trip_collection,
+                                        config.verbose)
+
+        # Fider arrival process
+        self.num_active_requests = [0]
+        self.rider_process = RiderProcess(env, self.registry, request_collection, self.rider_store, data, config,
+                                          self.streams, self.num_active_requests, config.verbose, config.debug)
+
+        # Driver arrival process
+        self.num_active_drivers = [0]
+        self.driver_process = DriverProcess(env, self.registry, driver_collection, self.driver_store,
+                                            config.initial_drivers, self.num_active_drivers, self.num_active_requests,
+                                            data, config, self.streams, config.verbose, config.debug, boundary)
+
+        # Driver analytics
+        self.da = DriverAnalytics(env, self.driver_store)
+
+        # Clock
+        self.clock = None
+        if config.clock_log_time is not None:
+            self.clock = Clock(env, self.num_active_drivers, self.num_active_requests, config.clock_log_time,
+                               self.matcher, self.count_processes)
+
+        # Stream finished records to the run directory
+        self.run_dir = create_new_run(run_dir)
+        self.writer = ResultWriter(self.run_dir, config.result_format, config.result_chunk_size)
+        export_sampler = data.geometry_sampler if config.visualization_points is not None else None
+        self.stream = ResultStream(env, self.writer, self.rider_store, self.driver_store, self.da, self.clock,
+                                   export_sampler)
+
+        # Periodic processes by name, given the event a restored process waits for first
+        self.periodic = {'matcher': self.matcher.perform_matching, 'riders': self.rider_process.run}
+        if config.dynamic_supply:
+            self.periodic['drivers'] = self.driver_process.run
+        self.periodic['analytics'] = lambda wake=None: self.da.analyse(wake=wake)
+        if self.clock is not None:
+            self.periodic['clock'] = self.clock.run
+        self.periodic['stream'] = lambda wake=None: self.stream.run(config.result_flush_interval, wake)
+        self.processes = {}
+
+        if checkpoint is not None:
+            restore_checkpoint(self, checkpoint)
+        elif snapshot is not None:
+            restore_checkpoint(self, snapshot, results=False)
+        else:
+            self.start()
+
+    @classmethod
+    def resume(cls, run_dir: str, data: SimulationData) -> 'Simulation':
+        """Continues a run from its latest checkpoint.
+
+        Note:
+        The run continues with the config of the checkpoint and discards all results written
+        after it, so the resumed run produces the same results as an uninterrupted run.
+
+        Args:
+            run_dir (str): directory of the run.
+            data (SimulationData): input data of the run.
+
+        Returns:
+            Simulation: the simulation at the checkpoint time.
+        """
+        file = latest_checkpoint(run_dir)
+        print(f'Resuming from checkpoint: {file}')
+        checkpoint = load_checkpoint(file)
+        return cls(checkpoint['config'], data, run_dir, checkpoint['streams'], checkpoint=checkpoint)
+
+    def start(self):
+        """Spawns the initial riders and drivers and starts all periodic processes.
+        """
+        self.start_process('matcher')
+        self.rider_process.spawn_initial_riders()
+        self.start_process('riders')
+        self.driver_process.spawn_initial_drivers()
+        for name in self.periodic:
+            if name not in self.processes:
+                self.start_process(name)
+
+    def start_process(self, name: str, wake: Event=None):
+        """Starts a periodic process.
+
+        Args:
+            name (str): name of the process.
+            wake (Event, optional): event a restored process waits for first. Defaults to None (new process).
+        """
+        generator = self.periodic[name]() if wake is None else self.periodic[name](wake)
+        self.processes[name] = self.env.process(generator)
+
+    def count_processes(self) -> int:
+        """Number of live top-level processes: active riders, online drivers and periodic processes.
+        """
+        periodic = sum(process.is_alive for process in self.processes.values())
+        return self.num_active_requests[0] + len(self.driver_store.active) + periodic
+
+    @property
+    def checkpoint_times(self) -> np.ndarray:
+        interval = self.config.checkpoint_interval
+        if interval is None:
+            return np.array([])
+
+        return self.config.initial_time + interval * np.arange(1, int(np.ceil(self.config.run_delta / interval)))
+
+    @property
+    def end_time(self) -> float:
+        return self.config.initial_time + self.config.run_delta
+
+    def run(self, until: float=None):
+        """Advances the simulation.
+
+        Args:
+            until (float, optional): simulated time to run until. Defaults to None (end of the run).
+        """
+        until = self.end_time if until is None else until
+        times = self.checkpoint_times
+        while self.next_checkpoint < len(times) and times[self.next_checkpoint] < until:
+            self.env.run(until=times[self.next_checkpoint])
+            self.next_checkpoint += 1
+            save_checkpoint(self)
+
+        self.env.run(until=until)
+
+    def close(self, aggregate: bool=True) -> str:
+        """Writes all remaining records and finalizes the run directory.
+
+        Args:
+            aggregate (bool, optional): whether to compute the per-TAZ aggregates and metadata. Defaults to True.
+
+        Returns:
+            str: directory of the results.
+        """
+        with span('close'):
+            self.stream.close()
+            if aggregate:
+                save_run(self.run_dir, self.writer, self.data.geo_df, self.algorithm,
+                         self.config.replace(seed=self.streams.seed))
+            else:
+                self.writer.close()
+
+        if self.config.profile:
+            PROFILER.save(os.path.join(self.run_dir, 'profile.json'))
+            print(PROFILER.summary().to_string(index=False, float_format='%.3f'))
+            PROFILER.disable()
+
+        return self.run_dir
+
+
+def run_simulation(config: SimulationConfig, data: SimulationData, run_dir: str=None, resume: bool=False) -> str:
+    """Runs one simulation and saves its results.
+
+    Args:
+        config (SimulationConfig): parameters of the run (ignored when resuming).
+        data (SimulationData): input data of the run.
+        run_dir (str, optional): directory of the results. Defaults to None (new timestamped directory in "runs").
+        resume (bool, optional): whether to continue the run in "run_dir" from its latest checkpoint. Defaults to False.
+
+    Returns:
+        str: directory of the results.
+    """
+    assert not resume or run_dir is not None, 'Resuming requires the directory of the run.'
+    if resume:
+        simulation = Simulation.resume(run_dir, data)
+    else:
+        simulation = Simulation(config, data, run_dir, snapshot=find_snapshot(config, data))
+
+    # Run simulation
+    print('Starting simulation.')
+    print('=' * 80)
+    simulation.run()
+
+    # Save simulation data
+    print('=' * 80)
+    run_dir = simulation.close()
+    print('=' * 80)
+    return run_dir
@@ -0,0 +1,111 @@
+import hashlib
+import pandas as pd
+import geopandas as gpd
+from functools import cached_property
+from typing import Union
+from src.utils.travel_times import TravelTimeOracle
+from src.utils.endpoint_sampler import EndpointSampler
+from src.utils.geometry_sampler import GeometrySampler
+from src.simulation.data_bundle import DataBundle, sha256_checksum
+from src.simulation.params import ARRIVAL_PATH, DRIVER_PATH, TRAVEL_TIMES_PATH, PICKUP_DROPOFF_PATH, \
+                                  TAZ_GEOMETRY_PATH, TRAVEL_TIME_FILL, VISUALIZATION_POINTS, DATA_BUNDLE_PATH
+
+class SimulationData(object):
+    def __init__(self, arrival_path: str=ARRIVAL_PATH, driver_path: str=DRIVER_PATH,
+                 travel_times_path: str=TRAVEL_TIMES_PATH, pickup_dropoff_path: str=PICKUP_DROPOFF_PATH,
+                 taz_geometry_path: str=TAZ_GEOMETRY_PATH, travel_time_fill: Union[str, float]=TRAVEL_TIME_FILL,
+                 lazy_points: bool=VISUALIZATION_POINTS != 'eager', bundle_path: str=DATA_BUNDLE_PATH):
+        """Loads every dataset of the simulation at most once, on first access.
+
+        Note:
+        All datasets are shared between the algorithms, processes and samplers which receive
+        this object, so consumers must not modify them in place. If "bundle_path" is set, all
+        datasets are memory-mapped from a bundle compiled with compile_data.py instead of
+        parsing the files.
+
+        Args:
+            arrival_path (str, optional): rider arrival rates. Defaults to ARRIVAL_PATH.
+            driver_path (str, optional): driver supply. Defaults to DRIVER_PATH.
+            travel_times_path (str, optional): Uber Movement travel times. Defaults to TRAVEL_TIMES_PATH.
+            pickup_dropoff_path (str, optional): pickup and dropoff TAZ distributions. Defaults to PICKUP_DROPOFF_PATH.
+            taz_geometry_path (str, optional): TAZ geometries. Defaults to TAZ_GEOMETRY_PATH.
+            travel_time_fill (Union[str, float], optional): fill policy for missing travel times. Defaults to TRAVEL_TIME_FILL.
+            lazy_points (bool, optional): whether visualization points are sampled at export time.
+                                          Defaults to VISUALIZATION_POINTS != 'eager'.
+            bundle_path (str, optional): compiled data bundle. Defaults to DATA_BUNDLE_PATH.
+        """
+        self.arrival_path = arrival_path
+        self.driver_path = driver_path
+        self.travel_times_path = travel_times_path
+        self.pickup_dropoff_path = pickup_dropoff_path
+        self.taz_geometry_path = taz_geometry_path
+        self.travel_time_fill = travel_time_fill
+        self.lazy_points = lazy_points
+
+        self.bundle = None
+        if bundle_path is not None:
+            self.bundle = DataBundle(bundle_path)
+            if self.bundle.travel_time_fill != travel_time_fill:
+                raise ValueError(f'Data bundle was compiled with travel time fill "{self.bundle.travel_time_fill}", '
+                                 f'not "{travel_time_fill}".')
+
+    @cached_property
+    def version(self) -> str:
+        """Short checksum of the source files, identical for a bundle and the files it was compiled from.
+        """
+        if self.bundle is not None:
+            checksums = [source['sha256'] for source in self.bundle.manifest['sources'].values()]
+        else:
+            checksums = [sha256_checksum(path) for path in [self.arrival_path, self.driver_path,
+                                                            self.travel_times_path, self.pickup_dropoff_path,
+                                                            self.taz_geometry_path]]
+
+        digest = hashlib.sha256(''.join(checksums + [str(self.travel_time_fill)]).encode())
+        return digest.hexdigest()[:12]
+
+    @cached_property
+    def arrival_df(self) -> pd.Series:
+        if self.bundle is not None:
+            return self.bundle.arrival_df
+
+        return pd.read_csv(self.arrival_path, index_col=['day_of_week', 'hour', 'minute'])['pickups']
+
+    @cached_property
+    def num_driver_df(self) -> pd.DataFrame:
+        if self.bundle is not None:
+            return self.bundle.num_driver_df
+
+        return pd.read_csv(self.driver_path, index_col=['hour', 'minute'])
+
+    @cached_property
+    def travel_times(self) -> TravelTimeOracle:
+        if self.bundle is not None:
+            return self.bundle.travel_times
+
+        travel_time_df = pd.read_csv(self.travel_times_path, index_col=['hod', 'sourceid', 'dstid'])
+        return TravelTimeOracle(travel_time_df, fill=self.travel_time_fill)
+
+    @cached_property
+    def endpoint_sampler(self) -> EndpointSampler:
+        if self.bundle is not None:
+            return self.bundle.endpoint_sampler
+
+        return EndpointSampler(pd.read_csv(self.pickup_dropoff_path, index_col=['day_of_week', 'hour']))
+
+    @property
+    def driver_endpoint_sampler(self) -> EndpointSampler:
+        # Drivers start where trips end
+        return self.endpoint_sampler
+
+    @cached_property
+    def geo_df(self) -> pd.DataFrame:
+        if self.bundle is not None:
+            return self.bundle.geo_df
+
+        geo_df = pd.read_csv(self.taz_geometry_path, index_col=['MOVEMENT_ID_uber'])
+        geo_df['geometry'] = gpd.GeoSeries.from_wkt(geo_df['geometry'])
+        return geo_df
+
+    @cached_property
+    def geometry_sampler(self) -> GeometrySampler:
+        return GeometrySampler(self.geo_df['geometry'], lazy=self.lazy_points)
@@ -0,0 +1,140 @@
+import os
+import json
+import random
+import itertools
+import numpy as np
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List
+from src.simulation.config import SimulationConfig
+from src.simulation.simulation_data import SimulationData
+from src.simulation.data_bundle import compile_bundle
+from src.simulation.runner import run_simulation
+from src.simulation.checkpoint import snapshot_file
+from src.simulation.warmup import run_warmup
+
+def expand_grid(grid: Dict[str, List]) -> List[Dict[str, object]]:
+    """Expands a parameter grid into the list of all its scenarios.
+
+    Args:
+        grid (Dict[str, List]): values of every swept parameter.
+
+    Returns:
+        List[Dict[str, object]]: one parameter override dict per combination.
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*[grid[name] for name in names])]
+
+
+def scenario_name(overrides: Dict[str, object]) -> str:
+    """Names the run directory of a scenario after its overridden parameters.
+    """
+    if len(overrides) == 0:
+        return 'default'
+
+    return '_'.join(f'{key.lower()}={value}' for key, value in overrides.items()).replace(os.sep, '-')
+
+
+def run_scenario(overrides: Dict[str, object], bundle_path: str, run_dir: str) -> str:
+    """Runs one scenario in a worker process.
+
+    Note:
+    The input data is memory-mapped from the bundle, so all workers share its pages through
+    the OS cache. The output of the run is written to "log.txt" in its run directory.
+
+    Args:
+        overrides (Dict[str, object]): overridden parameters.
+        bundle_path (str): compiled data bundle.
+        run_dir (str): directory of the results.
+
+    Returns:
+        str: directory of the results.
+    """
+    # Forked workers inherit the random state of the parent
+    np.random.seed()
+    random.seed()
+
+    config = SimulationConfig.from_overrides(overrides)
+    data = SimulationData(bundle_path=bundle_path, lazy_points=config.visualization_points != 'eager')
+    os.makedirs(run_dir, exist_ok=True)
+    with open(os.path.join(run_dir, 'log.txt'), 'w') as f, redirect_stdout(f):
+        return run_simulation(config, data, run_dir)
+
+
+def warm_up_scenario(overrides: Dict[str, object], bundle_path: str) -> str:
+    """Creates the warm-up snapshot of a scenario in a worker process.
+
+    Args:
+        overrides (Dict[str, object]): overridden parameters.
+        bundle_path (str): compiled data bundle.
+
+    Returns:
+        str: file of the snapshot.
+    """
+    config = SimulationConfig.from_overrides(overrides)
+    data = SimulationData(bundle_path=bundle_path, lazy_points=config.visualization_points != 'eager')
+    with open(snapshot_file(config, data)[:-len('.pkl')] + '.log.txt', 'w') as f, redirect_stdout(f):
+        return run_warmup(config, data)
+
+
+def run_sweep(scenarios: List[Dict[str, object]], workers: int=None, bundle_path: str=None,
+              output_dir: str=None) -> Dict[str, str]:
+    """Runs scenarios across a process pool, each into its own run directory.
+
+    Note:
+    If scenarios set WARMUP_DIR, every missing warm-up snapshot is created once before the
+    scenarios start, so scenarios sharing a start time, market and matching share one warm-up.
+
+    Args:
+        scenarios (List[Dict[str, object]]): overridden parameters of every scenario.
+        workers (int, optional): number of worker processes. Defaults to None (number of CPUs).
+        bundle_path (str, optional): compiled data bundle. Defaults to None (compiled from the
+                                     files in params.py into the sweep directory).
+        output_dir (str, optional): directory of the sweep. Defaults to None (new timestamped directory in "runs").
+
+    Returns:
+        Dict[str, str]: run directory of every scenario, keyed by scenario name.
+    """
+    if output_dir is None:
+        output_dir = os.path.join(os.getcwd(), 'runs', 'sweep_' + datetime.now().strftime('%Y-%m-%d_%H-%M-%S'))
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Validate all scenarios before starting any
+    for overrides in scenarios:
+        SimulationConfig.from_overrides(overrides)
+
+    # Parse the input data once for all workers
+    if bundle_path is None:
+        bundle_path = os.path.join(output_dir, 'data')
+        print(f'Compiling data bundle {bundle_path} ...')
+        compile_bundle(SimulationData(bundle_path=None), bundle_path)
+
+    names = [scenario_name(overrides) for overrides in scenarios]
+    assert len(set(names)) == len(names), 'Scenarios must be distinct.'
+    with open(os.path.join(output_dir, 'sweep.json'), 'w') as f:
+        json.dump({'bundle': bundle_path, 'scenarios': dict(zip(names, scenarios))}, f, indent=4)
+
+    # Warm-up snapshots which do not exist yet, one per distinct snapshot
+    data = SimulationData(bundle_path=bundle_path)
+    warmups = {}
+    for overrides in scenarios:
+        config = SimulationConfig.from_overrides(overrides)
+        if config.warmup_dir is not None and not os.path.exists(snapshot_file(config, data)):
+            os.makedirs(config.warmup_dir, exist_ok=True)
+            warmups.setdefault(snapshot_file(config, data), overrides)
+
+    run_dirs = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for future in as_completed([pool.submit(warm_up_scenario, overrides, bundle_path)
+                                    for overrides in warmups.values()]):
+            print(f'Created warm-up snapshot {future.result()}')
+
+        futures = {pool.submit(run_scenario, overrides, bundle_path, os.path.join(output_dir, name)): name
+                   for name, overrides in zip(names, scenarios)}
+        for future in as_completed(futures):
+            name = futures[future]
+            run_dirs[name] = future.result()
+            print(f'Finished scenario {name} ({len(run_dirs)}/{len(scenarios)})')
+
+    return run_dirs
@@ -0,0 +1,192 @@
+import os
+import itertools
+import numpy as np
+import pandas as pd
+from typing import Dict, Tuple
+from scipy.spatial import Voronoi
+from shapely.geometry import Polygon, box
+
+SYNTHETIC_FILES = {
+    'arrival_path': 'rider_arrival_rates.csv',
+    'driver_path': 'driver_arrivals.csv',
+    'travel_times_path': 'uber_time_data.csv',
+    'pickup_dropoff_path': 'pickups_dropoffs.csv',
+    'taz_geometry_path': 'taz_geometries.csv',
+}
+LAYOUTS = ['grid', 'voronoi']
+KM_PER_DEGREE = 111.32
+
+def demand_profile(day_of_week: np.ndarray, hour: np.ndarray, minute: np.ndarray) -> np.ndarray:
+    """Relative rider demand per minute of the week, at most 1.
+
+    Note:
+    Weekdays (day_of_week 0-4) have a morning peak at 8:30 and an evening peak at 18:00,
+    weekends a broad afternoon peak and more demand late at night. The profile is smooth in
+    time, so minute-level rates do not jump at full hours.
+    """
+    t = np.asarray(hour) + np.asarray(minute) / 60
+    def peak(center, width):
+        return np.exp(-0.5 * ((t - center) / width) ** 2)
+
+    weekday = 0.15 + 0.85 * peak(8.5, 1.2) + 0.95 * peak(18, 1.8) + 0.45 * peak(13, 3)
+    weekend = 0.25 + 0.7 * peak(15, 4) + 0.5 * peak(23.5, 2) + 0.5 * peak(-0.5, 2)
+    profile = np.where(np.asarray(day_of_week) < 5, weekday, weekend)
+    return profile / max(weekday.max(), weekend.max())
+
+
+def congestion(hour: np.ndarray) -> np.ndarray:
+    """Factor by which travel times during an hour exceed free-flow travel times.
+    """
+    hour = np.asarray(hour)
+    return 1 + 0.6 * np.exp(-0.5 * ((hour - 8.5) / 1.5) ** 2) + 0.7 * np.exp(-0.5 * ((hour - 18) / 2) ** 2)
+
+
+def grid_layout(num_tazs: int, taz_size: float, rng: np.random.Generator) -> Tuple[np.ndarray, list]:
+    """Square TAZs in rows of ceil(sqrt(num_tazs)), the last row may be incomplete.
+
+    Returns:
+        Tuple[np.ndarray, list]: centroids in kilometres and polygons.
+    """
+    cols = int(np.ceil(np.sqrt(num_tazs)))
+    x, y = np.arange(num_tazs) % cols, np.arange(num_tazs) // cols
+    polygons = [box(i * taz_size, j * taz_size, (i + 1) * taz_size, (j + 1) * taz_size) for i, j in zip(x, y)]
+    return np.column_stack([x + 0.5, y + 0.5]) * taz_size, polygons
+
+
+def voronoi_layout(num_tazs: int, taz_size: float, rng: np.random.Generator) -> Tuple[np.ndarray, list]:
+    """Voronoi cells of random seeds in a square of num_tazs * taz_size^2 square kilometres.
+
+    Note:
+    The seeds are mirrored at the four sides of the square, which bounds every cell of an
+    original seed by the square.
+
+    Returns:
+        Tuple[np.ndarray, list]: centroids in kilometres and polygons.
+    """
+    side = np.sqrt(num_tazs) * taz_size
+    seeds = rng.uniform(0, side, (num_tazs, 2))
+    mirrored = [seeds, seeds * [-1, 1], seeds * [1, -1], seeds * [-1, 1] + [2 * side, 0],
+                seeds * [1, -1] + [0, 2 * side]]
+    diagram = Voronoi(np.concatenate(mirrored))
+
+    square = box(0, 0, side, side)
+    polygons = []
+    for region in diagram.point_region[:num_tazs]:
+        polygon = Polygon(diagram.vertices[diagram.regions[region]]).convex_hull.intersection(square)
+        polygons.append(polygon)
+
+    centroids = np.array([[polygon.centroid.x, polygon.centroid.y] for polygon in polygons])
+    return centroids, polygons
+
+
+def generate_synthetic_data(output_dir: str, num_tazs: int=100, layout: str='grid', demand_per_taz: float=20.0,
+                            supply_ratio: float=1.2, taz_size: float=1.0, speed: float=30.0,
+                            geometric_std: float=1.3, origin: Tuple[float, float]=(-122.45, 37.75),
+                            seed: int=0) -> Dict[str, str]:
+    """Writes the five input datasets of a synthetic city in the schemas of SimulationData.
+
+    Note:
+    City size is set by "num_tazs" and "taz_size", demand intensity by "demand_per_taz", the
+    hourly rider requests of an average TAZ at the busiest minute of the week. Pickups come
+    from the outskirts in the morning and from the center in the evening, dropoffs the other
+    way round. Travel times are lognormal with a geometric mean of the centroid distance at
+    "speed" times the hourly congestion and a fixed detour factor per TAZ pair. The driver
+    supply is the number of drivers busy with the demand of each minute times "supply_ratio".
+    Geometries are WKT in degrees around "origin", areas in square kilometres.
+
+    The travel time table has 24 * num_tazs^2 rows and is written one hour at a time.
+
+    Args:
+        output_dir (str): directory of the files.
+        num_tazs (int, optional): number of TAZs. Defaults to 100.
+        layout (str, optional): 'grid' or 'voronoi'. Defaults to 'grid'.
+        demand_per_taz (float, optional): peak hourly requests per TAZ. Defaults to 20.0.
+        supply_ratio (float, optional): drivers per driver needed to serve the demand. Defaults to 1.2.
+        taz_size (float, optional): side length of an average TAZ in kilometres. Defaults to 1.0.
+        speed (float, optional): free-flow speed in kilometres per hour. Defaults to 30.0.
+        geometric_std (float, optional): geometric standard deviation of free-flow travel times. Defaults to 1.3.
+        origin (Tuple[float, float], optional): longitude and latitude of the south-west corner.
+                                                Defaults to (-122.45, 37.75).
+        seed (int, optional): seed of the random layout and distributions. Defaults to 0.
+
+    Returns:
+        Dict[str, str]: written files keyed by the SimulationData argument, e.g. 'arrival_path'.
+    """
+    assert layout in LAYOUTS, f'Unknown layout "{layout}", choose one of {LAYOUTS}.'
+    rng = np.random.default_rng(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {name: os.path.join(output_dir, file) for name, file in SYNTHETIC_FILES.items()}
+    taz_ids = np.arange(1, num_tazs + 1)
+
+    # TAZ geometries
+    centroids, polygons = (grid_layout if layout == 'grid' else voronoi_layout)(num_tazs, taz_size, rng)
+    areas = np.array([polygon.area for polygon in polygons])
+    scale = np.array([1 / (KM_PER_DEGREE * np.cos(np.radians(origin[1]))), 1 / KM_PER_DEGREE])
+    wkt = [Polygon(np.asarray(polygon.exterior.coords) * scale + origin).wkt for polygon in polygons]
+    pd.DataFrame({'MOVEMENT_ID_uber': taz_ids, 'geometry': wkt, 'AREA': areas}).to_csv(
+        paths['taz_geometry_path'], index=False)
+
+    # Travel times, within a TAZ the average distance of two random points in a square
+    distances = np.sqrt(((centroids[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2))
+    distances[np.diag_indices(num_tazs)] = 0.52 * np.sqrt(areas)
+    detour = rng.lognormal(np.log(1.25), 0.1, (num_tazs, num_tazs))
+    free_flow = np.maximum(distances * detour / speed * 3600, 60)
+    sources, destinations = np.repeat(taz_ids, num_tazs), np.tile(taz_ids, num_tazs)
+    for hour in range(24):
+        geometric_mean = free_flow.ravel() * congestion(hour)
+        sigma = np.log(geometric_std) * np.sqrt(congestion(hour))
+        pd.DataFrame({
+            'hod': hour,
+            'sourceid': sources,
+            'dstid': destinations,
+            'mean_travel_time': geometric_mean * np.exp(sigma ** 2 / 2),
+            'geometric_mean_travel_time': geometric_mean,
+            'geometric_standard_deviation_travel_time': np.exp(sigma),
+        }).to_csv(paths['travel_times_path'], index=False, header=hour == 0, mode='w' if hour == 0 else 'a',
+                  float_format='%.2f')
+
+    # Rider arrival rates (requests per hour) per minute of the week
+    index = pd.DataFrame(list(itertools.product(range(7), range(24), range(60))),
+                         columns=['day_of_week', 'hour', 'minute'])
+    rates = num_tazs * demand_per_taz * demand_profile(index['day_of_week'], index['hour'], index['minute'])
+    index.assign(pickups=rates).to_csv(paths['arrival_path'], index=False, float_format='%.4f')
+
+    # Pickup and dropoff distributions, weighted by area
+    radius = np.sqrt(areas.sum()) / 2
+    center = np.sqrt(((centroids - centroids.mean(axis=0)) ** 2).sum(axis=1))
+    downtown = np.exp(-0.5 * (center / (0.5 * radius)) ** 2)
+    attraction = rng.lognormal(0, 0.3, num_tazs) * areas
+    rows = []
+    for day_of_week, hour in itertools.product(range(7), range(24)):
+        # 1 during the morning commute, -1 during the evening commute
+        commute = 0
+        if day_of_week < 5:
+            commute = np.exp(-0.5 * ((hour - 8.5) / 2) ** 2) - np.exp(-0.5 * ((hour - 18) / 2.5) ** 2)
+        pickups = attraction * (0.5 * (1 + downtown) - 0.4 * commute * downtown)
+        dropoffs = attraction * (0.5 * (1 + downtown) + 0.4 * commute * downtown)
+        rows.append(pd.DataFrame({'day_of_week': day_of_week, 'hour': hour, 'MOVEMENT_ID_uber': taz_ids,
+                                  'pickups': pickups / pickups.sum(), 'dropoffs': dropoffs / dropoffs.sum()}))
+    pd.concat(rows).to_csv(paths['pickup_dropoff_path'], index=False)
+
+    # Driver supply, drivers busy with the average demand of each minute of the day
+    weekly = rates.reshape(7, 24 * 60).mean(axis=0)
+    mean_trip = np.median(free_flow) / 60
+    trip_minutes = mean_trip * congestion(np.arange(24 * 60) / 60) + 5
+    supply = pd.DataFrame(list(itertools.product(range(24), range(60))), columns=['hour', 'minute'])
+    supply['n_drivers'] = np.ceil(supply_ratio * weekly / 60 * trip_minutes)
+    supply.to_csv(paths['driver_path'], index=False)
+
+    return paths
+
+
+if __name__ == "__main__":
+    import tempfile
+    from src.simulation.simulation_data import SimulationData
+
+    output_dir = tempfile.mkdtemp()
+    paths = generate_synthetic_data(output_dir, num_tazs=25, layout='voronoi')
+    data = SimulationData(**paths, bundle_path=None)
+    print(data.geo_df.head())
+    print(data.arrival_df.describe())
+    print(data.num_driver_df.describe())
+    print(data.travel_times.num_missing)
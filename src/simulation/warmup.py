@@ -0,0 +1,59 @@
+import os
+import numpy as np
+from src.simulation.config import SimulationConfig
+from src.simulation.simulation_data import SimulationData
+from src.simulation.checkpoint import checkpoint_state, write_state, snapshot_file
+from src.simulation.runner import Simulation
+
+def run_warmup(config: SimulationConfig, data: SimulationData) -> str:
+    """Runs a cold start up to the start of a run and saves the state as a snapshot.
+
+    Note:
+    The warm-up starts "config.warmup_time" minutes before "config.initial_time" and ends
+    exactly at it, so a run from the snapshot covers the configured period. The market is
+    steady once the driver/rider ratio logged by the clock varies by at most
+    "config.warmup_tolerance" within "config.warmup_window" minutes. A warm-up which is not
+    steady at its end is saved as well, with a warning to lengthen it. The results of the
+    warm-up are written to a run directory next to the snapshot.
+
+    Args:
+        config (SimulationConfig): parameters of the run, "config.warmup_dir" must be set.
+        data (SimulationData): input data of the run.
+
+    Returns:
+        str: file of the snapshot.
+    """
+    assert config.warmup_dir is not None, 'Set WARMUP_DIR to the directory of the snapshots.'
+    assert config.warmup_time > 0, 'Warm-ups must last at least one simulated minute.'
+    file = snapshot_file(config, data)
+    os.makedirs(config.warmup_dir, exist_ok=True)
+
+    clock_log_time = 1 if config.clock_log_time is None else config.clock_log_time
+    warmup_config = config.replace(initial_time=config.initial_time - config.warmup_time,
+                                   run_delta=config.warmup_time, clock_log_time=clock_log_time,
+                                   checkpoint_interval=None, warmup_dir=None)
+    simulation = Simulation(warmup_config, data, run_dir=file[:-len('.pkl')])
+
+    # Advance one clock log at a time up to the start of the run, noting when the ratio got stable
+    window = int(np.ceil(config.warmup_window / clock_log_time))
+    steady_time = None
+    while simulation.env.now < config.initial_time:
+        simulation.run(until=min(simulation.env.now + clock_log_time, config.initial_time))
+        steady = simulation.clock.is_steady(window, config.warmup_tolerance)
+        if steady and steady_time is None:
+            steady_time = simulation.env.now - warmup_config.initial_time
+        elif not steady:
+            steady_time = None
+
+    if steady_time is not None:
+        print(f'Market reached a steady state after {steady_time:.1f} of {config.warmup_time:g} minutes.')
+    else:
+        print(f'Market is not steady after {config.warmup_time:g} minutes, consider a longer WARMUP_TIME.')
+
+    state = checkpoint_state(simulation)
+    state.update(data_version=data.version, warmup_time=config.warmup_time, steady=steady_time is not None,
+                 steady_time=steady_time)
+    write_state(state, file)
+    simulation.close(aggregate=False)
+    print(f'Saved warm-up snapshot: {file}')
+    return file
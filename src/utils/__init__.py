@@ -1,4 +1,8 @@
 from .sampling import *
 from .formatting import *
-from .timing import *
-from .clock import Clock
\ No newline at end of file
+from .profiling import PROFILER, Profiler, span, profiled
+from .clock import Clock
+from .travel_times import TravelTimeOracle
+from .endpoint_sampler import EndpointSampler
+from .geometry_sampler import GeometrySampler
+from .random_streams import RandomStreams
@@ -1,26 +1,132 @@
-from typing import List
+import os
+import sys
+import numpy as np
+from time import perf_counter
+from typing import Callable, List
 from simpy.core import Environment
+from simpy.events import Event
 from src.utils.formatting import cdate
 
 KEPLER_STR = '%Y/%m/%d %H:%M:%S'
 
+def resident_memory() -> float:
+    """Resident memory of the process in megabytes.
+
+    Note:
+    Reads the current size from /proc on Linux and falls back to the peak size reported by
+    getrusage elsewhere (NaN where neither is available).
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return float('nan')
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
 class Clock(object):
     def __init__(self, env: Environment, num_active_drivers: List,
-                 num_active_requests: List, interval: float):
+                 num_active_requests: List, interval: float, matcher=None,
+                 count_processes: Callable[[], int]=None):
+        """Logs the market thickness and the speed of the simulation every "interval" minutes.
+
+        Note:
+        Every log appends a row of active drivers and riders to "data" and a row of telemetry
+        to "telemetry": wall time, simulated seconds per wall second, SimPy events processed
+        during the interval, pending events, live processes, the sizes of the matching rounds
+        of "matcher" during the interval and resident memory.
+
+        Args:
+            env (Environment): simulation environment, counting its events (see CountingEnvironment).
+            num_active_drivers (List): list containing the number of active drivers.
+            num_active_requests (List): list containing the number of active riders/requests.
+            interval (float): minutes between logs.
+            matcher (Matcher, optional): matcher whose round sizes are logged. Defaults to None.
+            count_processes (Callable[[], int], optional): returns the number of live processes. Defaults to None.
+        """
         self.env = env
         self.interval = interval
         self.__num_active_drivers = num_active_drivers
         self.__num_active_requests = num_active_requests
         self.data = []
+        self.ratios = []
 
-    def run(self):
+        self.matcher = matcher
+        if matcher is not None:
+            matcher.batches = []
+        self.count_processes = count_processes
+        self.telemetry = []
+
+    def run(self, wake: Event=None):
+        self.__start_wall = self.__last_wall = perf_counter()
+        self.__last_events = self.num_processed_events
         while True:
-            yield self.env.timeout(self.interval)
+            yield self.env.timeout(self.interval) if wake is None else wake
+            wake = None
             time_string = cdate(self.env.now)
             datetime = cdate(self.env.now, format_str=KEPLER_STR)
-            ratio = (100 * self.num_active_drivers) / self.num_active_requests
+            ratio = (100 * self.num_active_drivers) / self.num_active_requests if self.num_active_requests > 0 else float('nan')
             self.data.append([datetime, self.num_active_drivers, self.num_active_requests, ratio])
-            print(f'{time_string}: Active drivers: {self.num_active_drivers:,} <> {self.num_active_requests:,} active riders/requests. Ratio: {ratio:.1f} %')
+            self.ratios.append(ratio)
+            speed = self.log_telemetry(datetime)
+            print(f'{time_string}: Active drivers: {self.num_active_drivers:,} <> {self.num_active_requests:,} active riders/requests. Ratio: {ratio:.1f} % | Speed: {speed:,.0f}x')
+
+    def log_telemetry(self, datetime: str) -> float:
+        """Appends the telemetry of the interval which just ended.
+
+        Returns:
+            float: simulated seconds per wall second during the interval.
+        """
+        wall = perf_counter()
+        elapsed = wall - self.__last_wall
+        events = self.num_processed_events
+        batches = np.array(self.matcher.batches, dtype=np.float64).reshape(-1, 3) if self.matcher is not None \
+                  else np.zeros((0, 3))
+        if self.matcher is not None:
+            self.matcher.batches = []
+
+        speed = 60 * self.interval / elapsed if elapsed > 0 else float('nan')
+        self.telemetry.append([
+            datetime, wall - self.__start_wall, elapsed, speed, events - self.__last_events,
+            (events - self.__last_events) / elapsed if elapsed > 0 else float('nan'), self.env.num_pending_events,
+            self.count_processes() if self.count_processes is not None else float('nan'), len(batches),
+            *(batches.mean(axis=0) if len(batches) > 0 else [float('nan')] * 3),
+            *(batches.max(axis=0) if len(batches) > 0 else [float('nan')] * 3),
+            resident_memory()
+        ])
+        self.__last_wall, self.__last_events = wall, events
+        return speed
+
+    def is_steady(self, window: int, tolerance: float) -> bool:
+        """Whether the market has reached a steady state.
+
+        Note:
+        The market is steady once the coefficient of variation (standard deviation over mean)
+        of the driver/rider ratio of the last "window" logs is at most "tolerance".
+
+        Args:
+            window (int): number of logs.
+            tolerance (float): maximum coefficient of variation.
+
+        Returns:
+            bool: whether the ratio is stable.
+        """
+        ratios = np.array(self.ratios[-window:])
+        if len(ratios) < window or np.isnan(ratios).any():
+            return False
+
+        return ratios.std() <= tolerance * ratios.mean()
+
+    @property
+    def num_processed_events(self) -> int:
+        return self.env.num_processed_events
 
     @property
     def num_active_drivers(self):
@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Union
+from .profiling import profiled
+
+ENDPOINT_KINDS = ['pickups', 'dropoffs']
+
+class EndpointSampler(object):
+    def __init__(self, trip_endpoint_data: pd.DataFrame):
+        """Compiles the pickup and dropoff TAZ distributions into alias tables.
+
+        Note:
+        There is one alias table per (weekday, hour) and endpoint kind, padded to the largest
+        number of TAZs of any (weekday, hour). Every draw is O(1) and independent of the
+        number of TAZs: one uniform number selects a column and decides between the column
+        and its alias.
+
+        Args:
+            trip_endpoint_data (pd.DataFrame): TAZ probabilities indexed by ['day_of_week', 'hour']
+                                               with columns 'MOVEMENT_ID_uber', 'pickups' and 'dropoffs'.
+        """
+        weekdays = trip_endpoint_data.index.get_level_values('day_of_week').values.astype(np.int64)
+        hours = trip_endpoint_data.index.get_level_values('hour').values.astype(np.int64)
+        groups = weekdays * 24 + hours
+        order = np.argsort(groups, kind='stable')
+        groups = groups[order]
+
+        # Position of every row within its (weekday, hour)
+        self.sizes = np.bincount(groups, minlength=7 * 24)
+        offsets = np.concatenate([[0], np.cumsum(self.sizes)[:-1]])
+        positions = np.arange(len(groups)) - offsets[groups]
+
+        shape = (7 * 24, max(self.sizes.max(), 1))
+        self.taz_ids = np.zeros(shape, dtype=np.int64)
+        self.taz_ids[groups, positions] = trip_endpoint_data['MOVEMENT_ID_uber'].values[order]
+
+        self.prob = np.zeros((len(ENDPOINT_KINDS),) + shape)
+        self.alias = np.zeros((len(ENDPOINT_KINDS),) + shape, dtype=np.int64)
+        for k, kind in enumerate(ENDPOINT_KINDS):
+            weights = np.zeros(shape)
+            weights[groups, positions] = trip_endpoint_data[kind].values[order]
+            for g in np.flatnonzero(self.sizes):
+                self.prob[k, g, :self.sizes[g]], self.alias[k, g, :self.sizes[g]] = \
+                    EndpointSampler.__alias_table(weights[g, :self.sizes[g]])
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Returns the compiled alias tables, e.g. to store them in a data bundle.
+        """
+        return {'sizes': self.sizes, 'taz_ids': self.taz_ids, 'prob': self.prob, 'alias': self.alias}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> 'EndpointSampler':
+        """Restores a sampler from its compiled alias tables, e.g. from memory-mapped files.
+
+        Args:
+            arrays (Dict[str, np.ndarray]): arrays returned by "to_arrays".
+
+        Returns:
+            EndpointSampler: restored sampler.
+        """
+        sampler = cls.__new__(cls)
+        sampler.sizes = arrays['sizes']
+        sampler.taz_ids = arrays['taz_ids']
+        sampler.prob = arrays['prob']
+        sampler.alias = arrays['alias']
+        return sampler
+
+    @staticmethod
+    def __alias_table(weights: np.ndarray) -> tuple:
+        """Builds the alias table of one distribution with Vose's method.
+        """
+        n = len(weights)
+        if weights.sum() == 0:
+            weights = np.ones(n)
+
+        scaled = weights * n / weights.sum()
+        prob = np.ones(n)
+        alias = np.arange(n)
+        small = list(np.flatnonzero(scaled < 1))
+        large = list(np.flatnonzero(scaled >= 1))
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s], alias[s] = scaled[s], l
+            scaled[l] += scaled[s] - 1
+            if scaled[l] < 1:
+                small.append(l)
+            else:
+                large.append(l)
+
+        return prob, alias
+
+    def probabilities(self, kind: str) -> np.ndarray:
+        """Recovers the TAZ probabilities from the alias tables.
+
+        Note:
+        Every column of a (weekday, hour) carries 1 / n of the probability mass, split between
+        the column itself and its alias.
+
+        Args:
+            kind (str): 'pickups' or 'dropoffs'.
+
+        Returns:
+            np.ndarray: probability of every entry of "taz_ids", of shape (7 * 24, max TAZs).
+        """
+        k = ENDPOINT_KINDS.index(kind)
+        valid = np.arange(self.taz_ids.shape[1]) < self.sizes[:, None]
+        groups = np.broadcast_to(np.arange(len(self.sizes))[:, None], valid.shape)
+        probabilities = np.where(valid, self.prob[k], 0.)
+        np.add.at(probabilities, (groups[valid], self.alias[k][valid]), 1. - self.prob[k][valid])
+        return probabilities / np.maximum(self.sizes, 1)[:, None]
+
+    def to_frame(self) -> pd.DataFrame:
+        """Returns the TAZ distributions in the format of the pickup and dropoff data.
+        """
+        valid = np.arange(self.taz_ids.shape[1]) < self.sizes[:, None]
+        groups = np.broadcast_to(np.arange(len(self.sizes))[:, None], valid.shape)[valid]
+        df = pd.DataFrame({'day_of_week': groups // 24, 'hour': groups % 24, 'MOVEMENT_ID_uber': self.taz_ids[valid]})
+        for kind in ENDPOINT_KINDS:
+            df[kind] = self.probabilities(kind)[valid]
+
+        return df.set_index(['day_of_week', 'hour'])
+
+    def restrict(self, kind: str, taz_ids: np.ndarray) -> 'EndpointSampler':
+        """Creates a sampler whose pickups or dropoffs only fall into the given TAZs.
+
+        Note:
+        (weekday, hour)s without any probability mass within the TAZs sample all TAZs uniformly.
+
+        Args:
+            kind (str): 'pickups' or 'dropoffs', the other kind is kept as is.
+            taz_ids (np.ndarray): TAZ ids to restrict to.
+
+        Returns:
+            EndpointSampler: restricted sampler.
+        """
+        df = self.to_frame()
+        df.loc[~df['MOVEMENT_ID_uber'].isin(taz_ids).values, kind] = 0.
+        return EndpointSampler(df)
+
+    @profiled('endpoint_sampling')
+    def sample(self, kind: str, weekday: int, hour_of_day: int, size: int=None,
+               rng: np.random.Generator=None) -> Union[int, np.ndarray]:
+        """Samples TAZs of pickups or dropoffs.
+
+        Args:
+            kind (str): 'pickups' or 'dropoffs'.
+            weekday (int): day of the week.
+            hour_of_day (int): hour of the day.
+            size (int, optional): number of samples. Defaults to None (a single TAZ).
+            rng (np.random.Generator, optional): random stream. Defaults to None (global NumPy random state).
+
+        Returns:
+            Union[int, np.ndarray]: sampled TAZ or array of sampled TAZs.
+        """
+        k = ENDPOINT_KINDS.index(kind)
+        g = weekday * 24 + hour_of_day
+        n = self.sizes[g]
+        if n == 0:
+            raise KeyError(f'No {kind} data for weekday {weekday} and hour {hour_of_day}')
+
+        rng = np.random if rng is None else rng
+        u = rng.random(size) * n
+        columns = np.asarray(u, dtype=np.int64)
+        keep = (u - columns) < self.prob[k, g, columns]
+        taz = self.taz_ids[g, np.where(keep, columns, self.alias[k, g, columns])]
+        return int(taz) if size is None else taz
+
+    def sample_pickup(self, weekday: int, hour_of_day: int, size: int=None,
+                      rng: np.random.Generator=None) -> Union[int, np.ndarray]:
+        return self.sample('pickups', weekday, hour_of_day, size, rng)
+
+    def sample_dropoff(self, weekday: int, hour_of_day: int, size: int=None,
+                       rng: np.random.Generator=None) -> Union[int, np.ndarray]:
+        return self.sample('dropoffs', weekday, hour_of_day, size, rng)
+
+if __name__ == '__main__':
+    from time import time
+
+    # Random distributions over a varying number of TAZs per (weekday, hour)
+    rows = []
+    for weekday in range(7):
+        for hour in range(24):
+            n = np.random.randint(50, 300)
+            pickups, dropoffs = np.random.rand(n) ** 3, np.random.rand(n) ** 3
+            rows.append(pd.DataFrame({'day_of_week': weekday, 'hour': hour, 'MOVEMENT_ID_uber': np.arange(n) * 2 + 1,
+                                      'pickups': pickups / pickups.sum(), 'dropoffs': dropoffs / dropoffs.sum()}))
+
+    test_df = pd.concat(rows).set_index(['day_of_week', 'hour'])
+    sampler = EndpointSampler(test_df)
+
+    # Empirical frequencies match the probabilities
+    group = test_df.loc[(3, 17)]
+    samples = sampler.sample_pickup(3, 17, size=1_000_000)
+    frequencies = pd.Series(samples).value_counts(normalize=True).reindex(group['MOVEMENT_ID_uber'], fill_value=0)
+    assert np.abs(frequencies.values - group['pickups'].values).max() < 5e-3, 'Alias table frequencies deviate'
+    print('Alias table frequencies match the probabilities.')
+
+    ts = time()
+    for _ in range(10_000):
+        sampler.sample_dropoff(3, 17)
+    alias_time = time() - ts
+
+    ts = time()
+    for _ in range(10_000):
+        probs = test_df.loc[(3, 17)]['dropoffs']
+        np.random.choice(test_df.loc[(3, 17)]['MOVEMENT_ID_uber'], size=1, p=probs)[0]
+    pandas_time = time() - ts
+    print(f'10,000 single draws: {alias_time:.4f}s alias table vs. {pandas_time:.4f}s pandas')
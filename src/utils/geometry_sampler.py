@@ -0,0 +1,228 @@
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+from typing import Iterable, List, Union
+from shapely.geometry import Point, Polygon, MultiPolygon
+from shapely.ops import triangulate
+
+MAX_TRIANGULATION_DEPTH = 8
+
+LazyPoint = namedtuple('LazyPoint', 'taz seed')
+
+class GeometrySampler(object):
+    def __init__(self, geometries: pd.Series, lazy: bool=False):
+        """Triangulates TAZ geometries once to sample uniform points within them.
+
+        Note:
+        Every geometry is split into triangles which exactly cover it, including concave
+        parts and holes. A point is sampled by choosing a triangle with probability proportional
+        to its area and then a uniform point within the triangle, which requires no Shapely
+        predicate evaluation at sampling time.
+
+        Args:
+            geometries (pd.Series): shapely geometries indexed by TAZ id.
+            lazy (bool, optional): whether "sample_point" defers sampling to "coordinates". Defaults to False.
+        """
+        self.lazy = lazy
+
+        self.taz_ids = geometries.index.values.astype(np.int64)
+        self.__lookup = np.full(self.taz_ids.max() + 1, -1, dtype=np.int64)
+        self.__lookup[self.taz_ids] = np.arange(len(self.taz_ids))
+        self.geometries = geometries
+        self.triangles = None
+
+    def compile(self):
+        """Triangulates all geometries. Called on first use, so runs which never need
+        coordinates never triangulate.
+        """
+        triangles, counts = [], []
+        for geometry in self.geometries.values:
+            taz_triangles = GeometrySampler.__triangulate(geometry)
+            triangles.extend(taz_triangles)
+            counts.append(len(taz_triangles))
+
+        # Triangles of TAZ i are triangles[first[i]:first[i] + counts[i]]
+        self.triangles = np.array(triangles, dtype=np.float64).reshape((-1, 3, 2))
+        self.counts = np.array(counts, dtype=np.int64)
+        self.first = np.concatenate([[0], np.cumsum(self.counts)[:-1]])
+
+        a, b, c = self.triangles[:, 0], self.triangles[:, 1], self.triangles[:, 2]
+        areas = np.abs((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (c[:, 0] - a[:, 0]) * (b[:, 1] - a[:, 1])) / 2
+        self.cum_area = np.cumsum(areas)
+        lower = np.concatenate([[0], self.cum_area])
+        self.area_start = lower[self.first]
+        self.area = lower[self.first + self.counts] - self.area_start
+
+    @staticmethod
+    def __triangulate(geometry, depth: int=0) -> List[np.ndarray]:
+        """Splits a polygon into triangles by intersecting its Delaunay triangulation with the
+        polygon and triangulating the non-triangular remainders again.
+        """
+        triangles = []
+        for triangle in triangulate(geometry):
+            piece = triangle.intersection(geometry)
+            if piece.is_empty or piece.area == 0:
+                continue
+
+            if piece.area >= triangle.area * (1 - 1e-9) or depth == MAX_TRIANGULATION_DEPTH:
+                triangles.append(np.array(triangle.exterior.coords[:3]))
+                continue
+
+            parts = piece.geoms if hasattr(piece, 'geoms') else [piece]
+            for part in parts:
+                if isinstance(part, (Polygon, MultiPolygon)) and part.area > 0:
+                    triangles.extend(GeometrySampler.__triangulate(part, depth + 1))
+
+        return triangles
+
+    def index_of(self, taz_ids) -> np.ndarray:
+        """Maps TAZ ids to their rows.
+
+        Args:
+            taz_ids: a TAZ id or an array-like of TAZ ids.
+
+        Returns:
+            np.ndarray: row indices.
+        """
+        taz_ids = np.asarray(taz_ids, dtype=np.int64)
+        rows = self.__lookup[np.clip(taz_ids, 0, len(self.__lookup) - 1)]
+        unknown = (rows < 0) | (taz_ids != self.taz_ids[rows])
+        if unknown.any():
+            raise KeyError(f'Unknown TAZs: {np.unique(taz_ids[unknown])}')
+
+        return rows
+
+    def sample(self, taz_ids: Iterable, rng: np.random.Generator=None) -> np.ndarray:
+        """Samples one uniform point within every given TAZ.
+
+        Args:
+            taz_ids (Iterable): TAZ ids, may contain duplicates.
+            rng (np.random.Generator, optional): random stream. Defaults to None (global NumPy random state).
+
+        Returns:
+            np.ndarray: coordinates of shape (len(taz_ids), 2).
+        """
+        rng = np.random if rng is None else rng
+        rows = self.index_of(np.atleast_1d(taz_ids))
+        uniforms = rng.random((3, len(rows)))
+        return self.__sample_rows(rows, uniforms)
+
+    def sample_point(self, taz: int, rng: np.random.Generator=None) -> Union[Point, LazyPoint]:
+        """Samples a uniform point within one TAZ.
+
+        Note:
+        In lazy mode, only the TAZ and a random seed are stored. The coordinates are generated
+        deterministically from the seed by "coordinates", typically only at export time.
+
+        Args:
+            taz (int): TAZ id.
+            rng (np.random.Generator, optional): random stream. Defaults to None (global NumPy random state).
+
+        Returns:
+            Union[Point, LazyPoint]: sampled point, or TAZ and seed of the point in lazy mode.
+        """
+        if self.lazy:
+            rng = np.random if rng is None else rng
+            return LazyPoint(taz, int(rng.random() * 2 ** 53))
+
+        x, y = self.sample([taz], rng)[0]
+        return Point(x, y)
+
+    def coordinates(self, points: List) -> np.ndarray:
+        """Returns the coordinates of sampled points, generating all lazy points in one pass.
+
+        Args:
+            points (List): points or lazy points.
+
+        Returns:
+            np.ndarray: coordinates of shape (len(points), 2).
+        """
+        coords = np.full((len(points), 2), np.nan)
+        lazy = np.array([isinstance(point, LazyPoint) for point in points], dtype=bool)
+        if (~lazy).any():
+            coords[~lazy] = [(point.x, point.y) for point, is_lazy in zip(points, lazy) if not is_lazy]
+
+        if lazy.any():
+            taz_ids, seeds = zip(*[point for point, is_lazy in zip(points, lazy) if is_lazy])
+            rows = self.index_of(np.array(taz_ids))
+            seeds = np.array(seeds, dtype=np.uint64)
+            uniforms = np.stack([GeometrySampler.__seeded_uniforms(seeds * np.uint64(3) + np.uint64(i))
+                                 for i in range(3)])
+            coords[lazy] = self.__sample_rows(rows, uniforms)
+
+        return coords
+
+    def __sample_rows(self, rows: np.ndarray, uniforms: np.ndarray) -> np.ndarray:
+        """Maps three uniform numbers per row to a uniform point within the TAZ of the row.
+        """
+        if self.triangles is None:
+            self.compile()
+
+        # Area-weighted triangle choice within each TAZ
+        u = self.area_start[rows] + uniforms[0] * self.area[rows]
+        chosen = np.searchsorted(self.cum_area, u, side='right')
+        chosen = np.clip(chosen, self.first[rows], self.first[rows] + self.counts[rows] - 1)
+
+        # Uniform point within the triangle
+        r1, r2 = uniforms[1].copy(), uniforms[2].copy()
+        folded = r1 + r2 > 1
+        r1[folded], r2[folded] = 1 - r1[folded], 1 - r2[folded]
+        a, b, c = self.triangles[chosen, 0], self.triangles[chosen, 1], self.triangles[chosen, 2]
+        return a + r1[:, None] * (b - a) + r2[:, None] * (c - a)
+
+    @staticmethod
+    def __seeded_uniforms(seeds: np.ndarray) -> np.ndarray:
+        """Hashes seeds to uniform numbers in [0, 1) with SplitMix64.
+        """
+        z = seeds + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+        return (z >> np.uint64(11)).astype(np.float64) / 2 ** 53
+
+if __name__ == '__main__':
+    from time import time
+    import geopandas as gpd
+    from src.simulation.params import TAZ_GEOMETRY_PATH
+    from src.utils.sampling import sample_point_in_geometry
+
+    geo_df = pd.read_csv(TAZ_GEOMETRY_PATH, index_col=['MOVEMENT_ID_uber'])
+    geo_df['geometry'] = gpd.GeoSeries.from_wkt(geo_df['geometry'])
+
+    ts = time()
+    sampler = GeometrySampler(geo_df['geometry'])
+    sampler.compile()
+    print(f'Triangulated {len(geo_df):,} TAZs into {len(sampler.triangles):,} triangles in {time() - ts:.4f}s')
+
+    # Triangles cover the geometries exactly
+    areas = pd.Series(sampler.area, index=sampler.taz_ids)
+    assert np.allclose(areas.values, geo_df['geometry'].area.loc[sampler.taz_ids].values, rtol=1e-6), \
+        'Triangulation does not cover the TAZ geometries'
+
+    test_tazs = np.random.choice(geo_df.index.values, size=10_000)
+
+    ts = time()
+    for taz in test_tazs:
+        sample_point_in_geometry(geo_df.loc[taz]['geometry'], 1)
+    rejection_time = time() - ts
+
+    ts = time()
+    for taz in test_tazs:
+        sampler.sample_point(taz)
+    single_time = time() - ts
+
+    ts = time()
+    points = sampler.sample(test_tazs)
+    batch_time = time() - ts
+
+    for taz, (x, y) in zip(test_tazs[:1000], points[:1000]):
+        assert geo_df.loc[taz]['geometry'].buffer(1e-9).contains(Point(x, y)), f'Sampled point outside of TAZ {taz}'
+
+    lazy_sampler = GeometrySampler(geo_df['geometry'], lazy=True)
+    ts = time()
+    lazy_points = [lazy_sampler.sample_point(taz) for taz in test_tazs]
+    lazy_points = lazy_sampler.coordinates(lazy_points)
+    lazy_time = time() - ts
+
+    print(f'10,000 points: {rejection_time:.4f}s rejection sampling, {single_time:.4f}s single draws, '
+          f'{batch_time:.4f}s one batch, {lazy_time:.4f}s lazy')
@@ -0,0 +1,186 @@
+import json
+import numpy as np
+import pandas as pd
+from contextlib import nullcontext
+from functools import wraps
+from time import perf_counter, perf_counter_ns
+from typing import Callable, Dict
+
+NUM_BUCKETS = 64 # Latency buckets of [2^(b-1), 2^b) nanoseconds
+NULL_SPAN = nullcontext()
+
+class Span(object):
+    __slots__ = ['profiler', 'name', 'start']
+
+    def __init__(self, profiler: 'Profiler', name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        stack = self.profiler.stack
+        stack.append(stack[-1] + '/' + self.name if stack else self.name)
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = perf_counter_ns() - self.start
+        self.profiler.record(self.profiler.stack.pop(), elapsed)
+        return False
+
+
+class Profiler(object):
+    def __init__(self):
+        """Collects latencies of named spans and counters, nested by phase and bucketed by simulated hour.
+
+        Note:
+        A span measures a synchronous block of code and is nested in the spans open when it
+        starts, e.g. 'matching/create_matches/solver'. Spans must not be open across a yield
+        of a SimPy process, since other processes run in between. Every (span, simulated hour)
+        keeps its number of calls, total and maximum time and a histogram of power-of-two
+        nanosecond buckets. While disabled, "span" returns a shared no-op context and
+        "profiled" functions call through after checking one flag.
+        """
+        self.enabled = False
+        self.reset()
+
+    def reset(self, env=None):
+        """Discards all measurements.
+
+        Args:
+            env (Environment, optional): environment whose time buckets the measurements. Defaults to None (hour 0).
+        """
+        self.env = env
+        self.stack = []
+        self.spans = {}
+        self.counters = {}
+        self.start = perf_counter()
+
+    def enable(self, env=None):
+        self.reset(env)
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    @property
+    def hour(self) -> int:
+        return 0 if self.env is None else int(self.env.now // 60)
+
+    def span(self, name: str):
+        return Span(self, name) if self.enabled else NULL_SPAN
+
+    def record(self, path: str, elapsed: int):
+        key = (path, self.hour)
+        stats = self.spans.get(key)
+        if stats is None:
+            stats = self.spans[key] = [0, 0, 0, [0] * NUM_BUCKETS]
+        stats[0] += 1
+        stats[1] += elapsed
+        if elapsed > stats[2]:
+            stats[2] = elapsed
+        stats[3][min(elapsed.bit_length(), NUM_BUCKETS - 1)] += 1
+
+    def count(self, name: str, n: int=1):
+        """Adds "n" to a counter nested in the open spans.
+        """
+        if self.enabled:
+            key = (self.stack[-1] + '/' + name if self.stack else name, self.hour)
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def to_dict(self) -> Dict:
+        """Returns all measurements as a JSON-serializable profile.
+
+        Returns:
+            Dict: wall time in seconds, spans and counters by path with their totals and values per hour.
+        """
+        spans = {}
+        for (path, hour), (calls, total, maximum, histogram) in sorted(self.spans.items()):
+            span = spans.setdefault(path, {'calls': 0, 'total_s': 0., 'max_us': 0., 'histogram': [0] * NUM_BUCKETS,
+                                           'hours': {}})
+            span['calls'] += calls
+            span['total_s'] += total / 1e9
+            span['max_us'] = max(span['max_us'], maximum / 1e3)
+            span['histogram'] = [a + b for a, b in zip(span['histogram'], histogram)]
+            span['hours'][hour] = {'calls': calls, 'total_s': total / 1e9, 'max_us': maximum / 1e3}
+
+        counters = {}
+        for (path, hour), n in sorted(self.counters.items()):
+            counter = counters.setdefault(path, {'total': 0, 'hours': {}})
+            counter['total'] += n
+            counter['hours'][hour] = n
+
+        return {'wall_time_s': perf_counter() - self.start, 'bucket_upper_ns': [2 ** b for b in range(NUM_BUCKETS)],
+                'spans': spans, 'counters': counters}
+
+    def summary(self) -> pd.DataFrame:
+        """Summarizes every span over all hours, with percentiles estimated from the histograms.
+
+        Returns:
+            pd.DataFrame: calls, total seconds, share of the wall time and latencies in microseconds per span.
+        """
+        profile = self.to_dict()
+        upper_us = np.array(profile['bucket_upper_ns']) / 1e3
+        rows = []
+        for path, span in profile['spans'].items():
+            cumulative = np.cumsum(span['histogram']) / span['calls']
+            p50, p99 = (min(upper_us[np.searchsorted(cumulative, q)], span['max_us']) for q in [0.5, 0.99])
+            rows.append({'span': path, 'calls': span['calls'], 'total_s': span['total_s'],
+                         'share': span['total_s'] / profile['wall_time_s'],
+                         'mean_us': 1e6 * span['total_s'] / span['calls'], 'p50_us': p50, 'p99_us': p99,
+                         'max_us': span['max_us']})
+
+        return pd.DataFrame(rows, columns=['span', 'calls', 'total_s', 'share', 'mean_us', 'p50_us', 'p99_us',
+                                           'max_us'])
+
+    def save(self, file: str) -> Dict:
+        """Writes the profile to a JSON file.
+
+        Returns:
+            Dict: the written profile.
+        """
+        profile = self.to_dict()
+        with open(file, 'w') as f:
+            json.dump(profile, f, indent=4)
+
+        return profile
+
+
+# Profiler of the current process, enabled per run
+PROFILER = Profiler()
+
+def span(name: str):
+    """Measures a block of code as a span of the process profiler.
+    """
+    return Span(PROFILER, name) if PROFILER.enabled else NULL_SPAN
+
+
+def profiled(name: str) -> Callable:
+    """Measures every call of the decorated function as a span of the process profiler.
+    """
+    def decorator(f: Callable) -> Callable:
+        @wraps(f)
+        def wrap(*args, **kw):
+            if not PROFILER.enabled:
+                return f(*args, **kw)
+
+            with Span(PROFILER, name):
+                return f(*args, **kw)
+        return wrap
+    return decorator
+
+
+if __name__ == '__main__':
+    PROFILER.enable()
+    for _ in range(1000):
+        with span('outer'):
+            with span('inner'):
+                sum(range(100))
+            PROFILER.count('items', 100)
+    print(PROFILER.summary().to_string(index=False))
+
+    PROFILER.disable()
+    ts = perf_counter()
+    for _ in range(100_000):
+        with span('outer'):
+            pass
+    print(f'Disabled span: {1e9 * (perf_counter() - ts) / 100_000:.0f} ns')
@@ -0,0 +1,23 @@
+import numpy as np
+from typing import Tuple
+
+STREAM_NAMES = ['arrivals', 'endpoints', 'trip_times', 'supply', 'geometry']
+
+class RandomStreams(object):
+    def __init__(self, seed: int=None, spawn_key: Tuple[int, ...]=()):
+        """Independent random number generators of the simulation components.
+
+        Note:
+        Every component draws from its own stream, all spawned from one root seed, so a run
+        is reproducible from its seed and changing how often one component draws does not
+        shift the numbers drawn by the others.
+
+        Args:
+            seed (int, optional): root seed. Defaults to None (fresh entropy, recorded in "seed").
+            spawn_key (Tuple[int, ...], optional): key of an independent child of the root seed,
+                                                   e.g. the region of a partitioned run. Defaults to ().
+        """
+        root = np.random.SeedSequence(seed, spawn_key=spawn_key)
+        self.seed = root.entropy
+        for name, child in zip(STREAM_NAMES, root.spawn(len(STREAM_NAMES))):
+            setattr(self, name, np.random.default_rng(child))
@@ -3,9 +3,8 @@ import numpy as np
 import pandas as pd
 from typing import List
 from shapely.geometry import Polygon, Point
-from src.simulation.params import MIN_TRIP_TIME, TRAVEL_TIMES_PATH
-
-travel_time_df = pd.read_csv(TRAVEL_TIMES_PATH, index_col=['hod', 'sourceid', 'dstid'])
+from src.simulation.params import MIN_TRIP_TIME
+from .travel_times import TravelTimeOracle
 
 def sample_point_in_geometry(geometry: Polygon, num_samples: int) -> List[Polygon]:
     """Samples points in the given geometry
@@ -29,23 +28,23 @@ def sample_point_in_geometry(geometry: Polygon, num_samples: int) -> List[Polygo
     
     return points[0] if num_samples == 1 else points
 
-def sample_random_trip_time(hour_of_day: int, origin: int, destination: int, \
-                            is_trip: bool=False, get_expected: bool=False):
+def sample_random_trip_time(travel_times: TravelTimeOracle, hour_of_day: int, origin: int, destination: int, \
+                            is_trip: bool=False, get_expected: bool=False, rng: np.random.Generator=None):
     """
     Samples time needed from origin to destination by drawing from log-normal
     distribution based on the geometric mean and geometric standard deviation
-    travel times for the TAZ pair and hour of day.
+    travel times for the TAZ pair and hour of day, using "rng" (or the global
+    NumPy random state if None).
 
     Minimum time for trips is MIN_TRIP_TIME.
     """
-    TAZ_times = travel_time_df.loc[(hour_of_day, origin, destination)]   
-    geo_mean = TAZ_times['geometric_mean_travel_time']
-    geo_std = TAZ_times['geometric_standard_deviation_travel_time']
-    time = np.random.lognormal(np.log(geo_mean), np.log(geo_std)) / 60
+    rng = np.random if rng is None else rng
+    log_geo_mean, log_geo_std = travel_times.lognormal_parameters(hour_of_day, origin, destination)
+    time = rng.lognormal(log_geo_mean, log_geo_std) / 60
     if is_trip and time < MIN_TRIP_TIME:
         time = MIN_TRIP_TIME
     
     if get_expected == False:
         return time
 
-    return time, TAZ_times['mean_travel_time']
\ No newline at end of file
+    return time, travel_times.mean_travel_time(hour_of_day, origin, destination)
\ No newline at end of file
@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Union
+
+TRAVEL_TIME_COLUMNS = ['mean_travel_time', 'geometric_mean_travel_time', 'geometric_standard_deviation_travel_time']
+
+class TravelTimeOracle(object):
+    def __init__(self, travel_time_df: pd.DataFrame, taz_ids: Iterable=None, fill: Union[str, float]='max',
+                 dtype: type=np.float32):
+        """Compiles the Uber Movement travel times into dense (hod, src, dst) arrays.
+
+        Note:
+        TAZ pairs which are missing from the data are filled in two steps. First, the travel
+        time of the reverse direction (dst -> src) during the same hour is used if it exists.
+        Remaining gaps are filled according to "fill": 'max' uses the longest travel time
+        observed during that hour, 'mean' the average travel time during that hour and a
+        number is interpreted as a travel time in seconds. The geometric standard deviation
+        of filled pairs is the median of the hour.
+
+        Memory usage is 3 * 24 * n_taz^2 * itemsize bytes.
+
+        Args:
+            travel_time_df (pd.DataFrame): travel times indexed by ['hod', 'sourceid', 'dstid'].
+            taz_ids (Iterable, optional): additional TAZs to include, e.g. all TAZs from the
+                                          geometry data. Defaults to None.
+            fill (Union[str, float], optional): fill policy for missing TAZ pairs. Defaults to 'max'.
+            dtype (type, optional): dtype of the compiled arrays. Defaults to np.float32.
+        """
+        hod = travel_time_df.index.get_level_values('hod').values.astype(np.int64)
+        src = travel_time_df.index.get_level_values('sourceid').values.astype(np.int64)
+        dst = travel_time_df.index.get_level_values('dstid').values.astype(np.int64)
+
+        # Map TAZ ids to rows
+        ids = [src, dst]
+        if taz_ids is not None:
+            ids.append(np.asarray(list(taz_ids), dtype=np.int64))
+        self.taz_ids = np.unique(np.concatenate(ids))
+        self.__lookup = np.full(self.taz_ids.max() + 1, -1, dtype=np.int64)
+        self.__lookup[self.taz_ids] = np.arange(len(self.taz_ids))
+        self.fill = fill
+
+        # Compile tables
+        n = len(self.taz_ids)
+        shape = (24, n, n)
+        i, j = self.__lookup[src], self.__lookup[dst]
+        observed = np.zeros(shape, dtype=bool)
+        observed[hod, i, j] = True
+        self.num_missing = int((~observed).sum())
+
+        tables = []
+        for column in TRAVEL_TIME_COLUMNS:
+            table = np.full(shape, np.nan, dtype=dtype)
+            table[hod, i, j] = travel_time_df[column].values
+            tables.append(table)
+
+        self.mean, self.geo_mean, self.geo_std = tables
+        if self.num_missing > 0:
+            self.__fill_missing(observed)
+
+        # Parameters of the log-normal trip time distribution
+        self.log_geo_mean = np.log(self.geo_mean)
+        self.log_geo_std = np.log(self.geo_std)
+        del self.geo_mean, self.geo_std
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Returns the compiled arrays, e.g. to store them in a data bundle.
+        """
+        return {'taz_ids': self.taz_ids, 'mean': self.mean, 'log_geo_mean': self.log_geo_mean,
+                'log_geo_std': self.log_geo_std, 'num_missing': np.array(self.num_missing)}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], fill: Union[str, float]=None) -> 'TravelTimeOracle':
+        """Restores an oracle from its compiled arrays without recompiling, e.g. from memory-mapped files.
+
+        Args:
+            arrays (Dict[str, np.ndarray]): arrays returned by "to_arrays".
+            fill (Union[str, float], optional): fill policy the arrays were compiled with. Defaults to None.
+
+        Returns:
+            TravelTimeOracle: restored oracle.
+        """
+        oracle = cls.__new__(cls)
+        oracle.taz_ids = np.asarray(arrays['taz_ids'])
+        oracle.__lookup = np.full(oracle.taz_ids.max() + 1, -1, dtype=np.int64)
+        oracle.__lookup[oracle.taz_ids] = np.arange(len(oracle.taz_ids))
+        oracle.fill = fill
+        oracle.num_missing = int(arrays['num_missing'])
+        oracle.mean = arrays['mean']
+        oracle.log_geo_mean = arrays['log_geo_mean']
+        oracle.log_geo_std = arrays['log_geo_std']
+        return oracle
+
+    def __fill_missing(self, observed: np.ndarray):
+        """Fills TAZ pairs without travel time data according to the fill policy.
+
+        Args:
+            observed (np.ndarray): boolean array of observed (hod, src, dst) combinations.
+        """
+        # Reverse direction
+        reverse = ~observed & observed.transpose(0, 2, 1)
+        for table in (self.mean, self.geo_mean, self.geo_std):
+            table[reverse] = table.transpose(0, 2, 1)[reverse]
+
+        missing = ~(observed | reverse)
+        for h in range(24):
+            hour_missing = missing[h]
+            if not hour_missing.any():
+                continue
+
+            if self.fill == 'max':
+                value = np.nanmax(self.mean[h])
+                geo_value = np.nanmax(self.geo_mean[h])
+            elif self.fill == 'mean':
+                value = np.nanmean(self.mean[h])
+                geo_value = np.nanmean(self.geo_mean[h])
+            elif isinstance(self.fill, (int, float)):
+                value = geo_value = float(self.fill)
+            else:
+                raise ValueError(f'Invalid fill policy for missing travel times: {self.fill}')
+
+            self.mean[h][hour_missing] = value
+            self.geo_mean[h][hour_missing] = geo_value
+            self.geo_std[h][hour_missing] = np.nanmedian(self.geo_std[h])
+
+    def index_of(self, taz_ids) -> np.ndarray:
+        """Maps TAZ ids to their rows in the compiled arrays.
+
+        Args:
+            taz_ids: a TAZ id or an array-like of TAZ ids.
+
+        Returns:
+            np.ndarray: row indices.
+        """
+        taz_ids = np.asarray(taz_ids, dtype=np.int64)
+        rows = self.__lookup[np.clip(taz_ids, 0, len(self.__lookup) - 1)]
+        unknown = (rows < 0) | (taz_ids != self.taz_ids[rows])
+        if unknown.any():
+            raise KeyError(f'Unknown TAZs: {np.unique(taz_ids[unknown])}')
+
+        return rows
+
+    def cost_matrix(self, hour_of_day: int, origins: Iterable, destinations: Iterable) -> np.ndarray:
+        """Returns the mean travel times in seconds between all origins and destinations.
+
+        Args:
+            hour_of_day (int): hour of the day.
+            origins (Iterable): origin TAZs (rows).
+            destinations (Iterable): destination TAZs (columns).
+
+        Returns:
+            np.ndarray: matrix of shape (len(origins), len(destinations)).
+        """
+        o, d = self.index_of(origins), self.index_of(destinations)
+        return self.mean[hour_of_day][np.ix_(o, d)].astype(np.float64)
+
+    def mean_travel_time(self, hour_of_day: int, origin: int, destination: int) -> float:
+        """Returns the mean travel time in seconds for one TAZ pair.
+        """
+        o, d = self.index_of([origin, destination])
+        return float(self.mean[hour_of_day, o, d])
+
+    def lognormal_parameters(self, hour_of_day: int, origin: int, destination: int) -> tuple:
+        """Returns log of the geometric mean and log of the geometric standard deviation
+        of the travel time in seconds for one TAZ pair.
+        """
+        o, d = self.index_of([origin, destination])
+        return float(self.log_geo_mean[hour_of_day, o, d]), float(self.log_geo_std[hour_of_day, o, d])
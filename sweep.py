@@ -0,0 +1,32 @@
+import json
+import argparse
+from src.simulation.params import DATA_BUNDLE_PATH
+from src.simulation.sweep import expand_grid, run_sweep
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Runs a sweep of simulation scenarios in parallel.')
+    parser.add_argument('--grid', action='append', default=[], metavar='PARAM=VALUES',
+                        help='swept parameter and JSON list of values, e.g. BATCH_FREQUENCY=[0.333,1,null]')
+    parser.add_argument('--scenarios', help='JSON file with a list of parameter override dicts')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--output', default=None, help='directory of the sweep')
+    args = parser.parse_args()
+
+    scenarios = []
+    if args.scenarios is not None:
+        with open(args.scenarios) as f:
+            scenarios.extend(json.load(f))
+
+    if len(args.grid) > 0:
+        grid = {}
+        for item in args.grid:
+            name, values = item.split('=', 1)
+            grid[name] = json.loads(values)
+        scenarios.extend(expand_grid(grid))
+
+    if len(scenarios) == 0:
+        parser.error('No scenarios given, use --grid or --scenarios.')
+
+    run_dirs = run_sweep(scenarios, args.workers, DATA_BUNDLE_PATH, args.output)
+    for name, run_dir in sorted(run_dirs.items()):
+        print(f'{name}: {run_dir}')
@@ -0,0 +1,20 @@
+import argparse
+from src.simulation.config import SimulationConfig
+from src.simulation.simulation_data import SimulationData
+from src.simulation.warmup import run_warmup
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Warms up the market of params.py and saves it as a snapshot.')
+    parser.add_argument('--output', default=None, help='directory of the snapshots (defaults to WARMUP_DIR)')
+    args = parser.parse_args()
+
+    # Parameters are read from params.py
+    config = SimulationConfig()
+    if args.output is not None:
+        config = config.replace(warmup_dir=args.output)
+    assert config.warmup_dir is not None, 'Set WARMUP_DIR or --output to the directory of the snapshots.'
+
+    # Relevant data, loaded once on first access
+    data = SimulationData()
+
+    run_warmup(config, data)